@@ -0,0 +1,96 @@
+"""Action cache hit rate and latency with a fake LLM client.
+
+Replays a few days of typical questions (with rephrasings and Ukrainian
+variants) through ``ActionCache.get_or_generate`` in front of a fake
+``generate_actions`` that sleeps like a real completion and resolves
+relative dates itself. Every cached answer is checked against what the
+fake model would have produced for that day, and the cache is reloaded
+from disk halfway through to exercise persistence.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from common import percentile, use_service
+
+use_service("models")
+from action_cache import ActionCache  # noqa: E402
+
+QUESTIONS = [
+    ("What do I have tomorrow?", 1),
+    ("what do i have tomorrow", 1),
+    ("What do I have today?", 0),
+    ("Що в мене завтра?", 1),
+    ("Що в мене сьогодні", 0),
+    ("Any plans for the day after tomorrow?", 2),
+    ("Show my events yesterday", -1),
+]
+
+
+class FakeLLM:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+        self.today = None
+
+    def answer(self, question: str, today: date) -> dict:
+        offset = dict(QUESTIONS)[question]
+        day = (today + timedelta(days=offset)).isoformat()
+        return {
+            "actions": [
+                {
+                    "id": "action_1",
+                    "type": "select",
+                    "sql": f"SELECT * FROM event WHERE start_date::date = '{day}';",
+                    "weather": False,
+                }
+            ]
+        }
+
+    def generate_actions(self, question: str) -> dict:
+        self.calls += 1
+        time.sleep(self.latency)
+        return self.answer(question, self.today)
+
+
+def main(days: int, per_day: int, latency: float):
+    rng = random.Random(3)
+    llm = FakeLLM(latency)
+    path = os.path.join(tempfile.mkdtemp(), "action_cache.json")
+    cache = ActionCache(path=path)
+    latencies = []
+    start_day = date(2025, 12, 1)
+
+    for day_index in range(days):
+        today = start_day + timedelta(days=day_index)
+        llm.today = today
+        if day_index == days // 2:
+            cache = ActionCache(path=path)  # simulated restart
+        for _ in range(per_day):
+            question = rng.choice(QUESTIONS)[0]
+            start = time.perf_counter()
+            actions = cache.get_or_generate(question, llm.generate_actions, today)
+            latencies.append(time.perf_counter() - start)
+            assert actions == llm.answer(question, today), question
+
+    total = days * per_day
+    print(f"{total} questions over {days} days, {llm.calls} LLM calls")
+    print(cache.stats())
+    print(
+        f"p50 {percentile(latencies, 50) * 1000:.2f} ms  "
+        f"p99 {percentile(latencies, 99) * 1000:.2f} ms  "
+        f"(uncached {latency * 1000:.0f} ms per call)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--per-day", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+    main(args.days, args.per_day, args.latency)
@@ -0,0 +1,180 @@
+"""Answer prompt size and latency: JSON results vs. ``context.build_context``.
+
+For a few typical results of ``exec_sql_request`` (a busy month with
+recurring events and long descriptions, a week for a recommendation, a
+small write with a forecast) the answer prompt is built both ways:
+
+* ``json``: the old ``ANSWER_PROMPT`` + ``json.dumps(result, indent=2)``,
+* ``compact``: ``model.answer_input``, the static prompt as a prefix and
+  the compact context after it.
+
+Tokens are counted with ``context.count_tokens``. ``model.generate_answer``
+then runs against a stub OpenAI client that waits ``--prefill-ms`` per
+1000 input tokens before answering; tokens of the static prefix cost
+``--cached-share`` of that, as they would with the provider's prompt
+cache. Build time of the context is reported separately.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from common import Timer, use_service
+
+os.environ.setdefault("KEY", "stub")
+os.environ["ACTION_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "cache.json")
+os.chdir(use_service("models"))
+import model  # noqa: E402
+from context import build_context, count_tokens  # noqa: E402
+
+LOREM = (
+    "Quarterly planning with the product and platform teams. Agenda: review of the "
+    "roadmap, open incidents, hiring status, budget for the next quarter and the "
+    "migration of the reporting pipeline. Bring the updated estimates and the risks. "
+)
+
+
+def month_rows(count: int):
+    random.seed(21)
+    start = datetime(2025, 12, 1)
+    rows = []
+    for day in range(31):
+        date = start + timedelta(days=day)
+        if date.weekday() < 5:
+            rows.append(("Standup", date.replace(hour=9), 15, "Work", "Daily sync of the backend team, blockers first."))
+    while len(rows) < count:
+        date = start + timedelta(days=random.randrange(31), hours=random.randrange(8, 20))
+        category = random.choice(["Work", "Personal", "Sport", "Family"])
+        text = LOREM * random.randint(1, 3) if category == "Work" else random.choice(["", "Don't forget the keys.", LOREM])
+        rows.append((random.choice(["Review", "Call", "Gym", "Dinner", "Planning"]), date, random.choice([30, 60, 90]), category, text))
+    return [
+        {
+            "id": index + 1,
+            "name": name,
+            "start_date": date.isoformat() + "Z",
+            "end_date": (date + timedelta(minutes=minutes)).isoformat() + "Z",
+            "category": category,
+            "description": text,
+        }
+        for index, (name, date, minutes, category, text) in enumerate(rows)
+    ]
+
+
+def cases(month_size: int):
+    month = month_rows(month_size)
+    week = [row for row in month if row["start_date"] < "2025-12-08"]
+    weather = {"temp": 3.72, "weather": "scattered clouds", "datetime": "2025-12-02T18:00:00"}
+    return [
+        (
+            "busy month",
+            "What do I have in December?",
+            {"status": "success", "mode": "atomic", "touched": [],
+             "results": [{"id": "action_1", "type": "select", "status": "success", "fetched_data": month}]},
+        ),
+        (
+            "month, details",
+            "Give me the details of my work meetings in December",
+            {"status": "success", "mode": "atomic", "touched": [],
+             "results": [{"id": "action_1", "type": "select", "status": "success", "fetched_data": month}]},
+        ),
+        (
+            "recommendation",
+            "When should I go for a run this week?",
+            {"status": "success", "mode": "atomic", "touched": [],
+             "results": [{"id": "action_1", "type": "recommendation", "status": "success",
+                          "message": "reccomendation success", "fetched_data": week, "weather_info": weather}]},
+        ),
+        (
+            "small write",
+            "Move the dentist to Friday and add a picnic on Saturday",
+            {"status": "success", "mode": "atomic",
+             "touched": [["2025-12-05T10:00:00Z", "2025-12-05T11:00:00Z"]],
+             "results": [
+                 {"id": "action_1", "type": "update", "status": "success", "message": "Update executed. Rows affected: 1"},
+                 {"id": "action_2", "type": "create", "status": "success", "message": "Insert executed successfully",
+                  "weather_info": weather},
+             ]},
+        ),
+    ]
+
+
+def json_input(result: dict, question: str) -> list:
+    # the answer_input before the compact context
+    prompt = f"""{model.ANSWER_PROMPT}
+    User Input: {question}
+    Database Results:
+    {json.dumps(result, indent=2)}
+    """
+    return [
+        {"role": "system", "content": prompt},
+        {"role": "user", "content": "Please generate a friendly response for the user."},
+    ]
+
+
+class StubResponses:
+    """Waits for the prefill of the input; a cached prefix is cheaper."""
+
+    def __init__(self, prefill_ms: float, cached_share: float):
+        self.prefill_ms = prefill_ms
+        self.cached_share = cached_share
+        self.prefix = model.ANSWER_PROMPT
+
+    async def create(self, input, **kwargs):
+        text = "".join(message["content"] for message in input)
+        total = count_tokens(text)
+        cached = count_tokens(self.prefix) if text.startswith(self.prefix) else 0
+        cost = (total - cached) + cached * self.cached_share
+        await asyncio.sleep(cost / 1000 * self.prefill_ms / 1000)
+        return SimpleNamespace(output_text="ok")
+
+
+async def timed_answer(result, question, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await model.generate_answer(result, question)
+    return (time.perf_counter() - start) / rounds
+
+
+async def main(month_size: int, prefill_ms: float, cached_share: float, rounds: int):
+    model.client = SimpleNamespace(responses=StubResponses(prefill_ms, cached_share))
+    compact_input = model.answer_input
+    print(
+        f"static prefix {count_tokens(model.ANSWER_PROMPT)} tokens, budget "
+        f"{model.ANSWER_CONTEXT_TOKENS}, stub prefill {prefill_ms} ms per 1k tokens "
+        f"({cached_share:.0%} for the cached prefix)"
+    )
+    for label, question, result in cases(month_size):
+        tokens = {}
+        latency = {}
+        for name, build in (("json", json_input), ("compact", compact_input)):
+            messages = build(result, question)
+            tokens[name] = count_tokens("".join(message["content"] for message in messages))
+            model.answer_input = build
+            latency[name] = await timed_answer(result, question, rounds)
+        model.answer_input = compact_input
+
+        with Timer() as timer:
+            for _ in range(rounds):
+                build_context(result, question, budget=model.ANSWER_CONTEXT_TOKENS)
+        print(
+            f"{label:<15} tokens {tokens['json']:6d} -> {tokens['compact']:5d} "
+            f"({1 - tokens['compact'] / tokens['json']:4.0%} less)  "
+            f"answer {latency['json'] * 1000:6.1f} -> {latency['compact'] * 1000:6.1f} ms  "
+            f"build {timer.elapsed / rounds * 1e6:6.0f} us"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--month-size", type=int, default=250, help="events in the busy month")
+    parser.add_argument("--prefill-ms", type=float, default=150.0, help="per 1000 input tokens")
+    parser.add_argument("--cached-share", type=float, default=0.1)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.month_size, args.prefill_ms, args.cached_share, args.rounds))
@@ -0,0 +1,134 @@
+"""Time to first byte of /ask_text vs. the streamed /ask_text/stream.
+
+The OpenAI client is replaced by a local stub whose ``responses.create``
+emits the answer one token at a time with a fixed delay per token (or
+returns the whole text after all of them when not streaming); Django is a
+stub server. Action generation is stubbed out so only the answer stage
+differs. Reports, per endpoint, the time until the first response byte,
+until the first answer token and until the full answer. The service runs
+under uvicorn on a local port, since httpx's ASGI transport buffers whole
+responses.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import socket
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+import httpx
+import uvicorn
+
+from common import StubDjango, percentile, use_service
+
+ACTIONS = {"actions": [{"id": "action_1", "type": "select", "sql": "SELECT 1"}]}
+DB_RESULT = {"status": "success", "results": [{"id": "action_1", "status": "success"}]}
+ANSWER = "You have a dentist appointment at 10:00 and a team meeting at 14:00 tomorrow. " * 3
+
+
+class StubResponses:
+    def __init__(self, token_delay: float):
+        self.token_delay = token_delay
+        self.tokens = ANSWER.split(" ")
+
+    async def create(self, stream=False, **kwargs):
+        if not stream:
+            await asyncio.sleep(self.token_delay * len(self.tokens))
+            return SimpleNamespace(output_text=ANSWER)
+        return self.events()
+
+    async def events(self):
+        for index, token in enumerate(self.tokens):
+            await asyncio.sleep(self.token_delay)
+            text = token if index == 0 else " " + token
+            yield SimpleNamespace(type="response.output_text.delta", delta=text)
+        yield SimpleNamespace(type="response.completed")
+
+
+def summary(label: str, samples: dict):
+    print(
+        f"{label:<20} "
+        + "  ".join(
+            f"{name} p50 {percentile(values, 50) * 1000:7.1f} ms"
+            for name, values in samples.items()
+        )
+    )
+
+
+async def main(total: int, concurrency: int, token_delay: float):
+    with StubDjango({"/api/exec_sql_request/": DB_RESULT}, delay=0.02) as stub:
+        os.environ.setdefault("KEY", "stub")
+        os.environ["DJANGO_URL"] = f"{stub.url}/api/exec_sql_request/"
+        os.environ["ACTION_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "cache.json")
+        os.chdir(use_service("models"))
+        import main as service
+        import model
+
+        async def generate_actions(question):
+            return ACTIONS
+
+        model.client = SimpleNamespace(responses=StubResponses(token_delay))
+        model.generate_actions = generate_actions
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        server = uvicorn.Server(
+            uvicorn.Config(service.app, host="127.0.0.1", port=port, log_level="warning")
+        )
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            await asyncio.sleep(0.05)
+
+        try:
+            async with httpx.AsyncClient(
+                base_url=f"http://127.0.0.1:{port}", timeout=60
+            ) as client:
+                semaphore = asyncio.Semaphore(concurrency)
+
+                async def one(path, samples):
+                    async with semaphore:
+                        start = time.perf_counter()
+                        first_byte = first_token = None
+                        async with client.stream(
+                            "POST", path, json={"question": "what do I have tomorrow"}
+                        ) as response:
+                            response.raise_for_status()
+                            async for chunk in response.aiter_text():
+                                now = time.perf_counter() - start
+                                if first_byte is None:
+                                    first_byte = now
+                                if first_token is None and (
+                                    "event: token" in chunk or '"answer"' in chunk
+                                ):
+                                    first_token = now
+                        samples["ttfb"].append(first_byte)
+                        samples["first token"].append(first_token)
+                        samples["full"].append(time.perf_counter() - start)
+
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results = {}
+                    for path in ("/ask_text", "/ask_text/stream"):
+                        samples = {"ttfb": [], "first token": [], "full": []}
+                        await asyncio.gather(*(one(path, samples) for _ in range(total)))
+                        results[path] = samples
+                for path, samples in results.items():
+                    summary(path, samples)
+        finally:
+            server.should_exit = True
+            thread.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.token_delay))
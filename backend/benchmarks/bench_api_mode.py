@@ -0,0 +1,161 @@
+"""Full settings vs. the API-only profile.
+
+For ``smart_calendar.settings`` (admin, sessions, auth, messages, CSRF,
+clickjacking, security middleware) and ``smart_calendar.api_settings``
+(``api`` and ``db`` apps, CommonMiddleware only), in fresh processes:
+
+* startup: ``django.setup()`` plus building the ASGI and WSGI handlers,
+  and the number of modules imported by then,
+* per request: ``/api/recurrence_stats/`` and ``/api/sql_template_stats/``,
+  which never touch the database, called straight on the WSGI and ASGI
+  handlers, so what is left is the middleware chain, URL resolution and
+  the view call.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from common import BACKEND_DIR
+
+DJANGO_DIR = os.path.join(BACKEND_DIR, "django", "smart_calendar")
+PROFILES = ("smart_calendar.settings", "smart_calendar.api_settings")
+PATHS = ("/api/recurrence_stats/", "/api/sql_template_stats/")
+
+
+def wsgi_environ(path: str) -> dict:
+    return {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": path,
+        "QUERY_STRING": "",
+        "SERVER_NAME": "bench",
+        "SERVER_PORT": "80",
+        "HTTP_HOST": "bench",
+        "wsgi.input": io.BytesIO(),
+        "wsgi.errors": sys.stderr,
+        "wsgi.url_scheme": "http",
+    }
+
+
+def asgi_scope(path: str) -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+
+
+def child(rounds: int):
+    """Measure the profile of DJANGO_SETTINGS_MODULE and print JSON."""
+    start = time.perf_counter()
+    import django
+
+    django.setup()
+    from django.core.asgi import get_asgi_application
+    from django.core.wsgi import get_wsgi_application
+
+    wsgi = get_wsgi_application()
+    asgi = get_asgi_application()
+    startup = time.perf_counter() - start
+    modules = len(sys.modules)
+
+    def call_wsgi(path):
+        def start_response(status, headers):
+            assert status.startswith("200"), status
+
+        response = wsgi(wsgi_environ(path), start_response)
+        b"".join(response)
+        response.close()
+
+    async def call_asgi(path):
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            # no disconnect, Django cancels this wait once it has responded
+            await asyncio.Event().wait()
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                assert message["status"] == 200, message
+
+        await asgi(asgi_scope(path), receive, send)
+
+    async def asgi_rounds():
+        for _ in range(rounds):
+            for path in PATHS:
+                await call_asgi(path)
+
+    # warm up both handlers
+    for path in PATHS:
+        call_wsgi(path)
+    asyncio.run(asgi_rounds())
+
+    timings = {}
+    begin = time.perf_counter()
+    for _ in range(rounds):
+        for path in PATHS:
+            call_wsgi(path)
+    timings["wsgi_us"] = (time.perf_counter() - begin) / (rounds * len(PATHS)) * 1e6
+    begin = time.perf_counter()
+    asyncio.run(asgi_rounds())
+    timings["asgi_us"] = (time.perf_counter() - begin) / (rounds * len(PATHS)) * 1e6
+
+    print(json.dumps({"startup_ms": startup * 1000, "modules": modules, **timings}))
+
+
+def run(profile: str, rounds: int) -> dict:
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", "--rounds", str(rounds)],
+        cwd=DJANGO_DIR,
+        env={
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": profile,
+            "SECRET_DJANGO_KEY": "benchmark",
+            "PYTHONPATH": DJANGO_DIR,
+        },
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main(processes: int, rounds: int):
+    print(f"{processes} processes per profile, {rounds} rounds of {len(PATHS)} requests each")
+    for profile in PROFILES:
+        results = [run(profile, rounds) for _ in range(processes)]
+        median = {key: statistics.median(r[key] for r in results) for key in results[0]}
+        print(
+            f"{profile:<28} startup {median['startup_ms']:7.1f} ms  "
+            f"{median['modules']:5.0f} modules  "
+            f"wsgi {median['wsgi_us']:7.1f} us/req  asgi {median['asgi_us']:7.1f} us/req"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--processes", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.rounds)
+    else:
+        main(args.processes, args.rounds)
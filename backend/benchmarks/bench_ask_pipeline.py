@@ -0,0 +1,121 @@
+"""Load test of /ask_text: old sync chain vs. the async pipeline.
+
+The LLM is stubbed with coroutines that sleep for a typical completion
+time, Django and OpenWeatherMap are local stub servers with their own
+delays. ``sync`` replays the old handler (blocking calls one after the
+other on a 40-thread pool, like FastAPI's default threadpool); ``async``
+drives the real /ask_text route with the stubbed pipeline backends.
+Reports throughput and tail latency at the given concurrency. The
+threaded stub servers themselves saturate at a few hundred concurrent
+connections, so keep --concurrency around 100.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import requests
+
+from common import StubDjango, Timer, report, use_service
+
+ACTIONS = {
+    "actions": [
+        {"id": "action_1", "type": "select", "sql": "SELECT 1", "weather": False},
+        {"id": "action_2", "type": "create", "sql": "INSERT ...", "weather": "2025-12-03T18:00:00"},
+        {"id": "action_3", "type": "create", "sql": "INSERT ...", "weather": "2025-12-04T18:00:00"},
+    ]
+}
+DB_RESULT = {
+    "status": "success",
+    "results": [{"id": f"action_{i}", "status": "success"} for i in (1, 2, 3)],
+}
+FORECAST = {
+    "list": [
+        {"dt": 1_764_547_200 + i * 10_800, "main": {"temp": 3.5}, "weather": [{"description": "clear sky"}]}
+        for i in range(40)
+    ]
+}
+
+
+def old_handler(django_url, weather_url, llm_actions, llm_answer):
+    time.sleep(llm_actions)
+    requests.post(django_url, json=ACTIONS).json()
+    for action in ACTIONS["actions"]:
+        if action["weather"]:
+            requests.get(weather_url, params={"q": "Košice"}).json()
+    time.sleep(llm_answer)
+
+
+async def main(total: int, concurrency: int, llm_actions: float, llm_answer: float):
+    routes = {"/api/exec_sql_request/": DB_RESULT, "/data/2.5/forecast": FORECAST}
+    with StubDjango(routes, delay=0.05) as stub:
+        django_url = f"{stub.url}/api/exec_sql_request/"
+        weather_url = f"{stub.url}/data/2.5/forecast"
+
+        def timed_old(_):
+            start = time.perf_counter()
+            old_handler(django_url, weather_url, llm_actions, llm_answer)
+            return time.perf_counter() - start
+
+        with ThreadPoolExecutor(40) as pool, Timer() as timer:
+            latencies = list(pool.map(timed_old, range(total)))
+        report("sync chain (40 threads)", latencies, timer.elapsed)
+
+        os.environ.setdefault("KEY", "stub")
+        os.environ["OPENWEATHER_URL"] = weather_url
+        os.environ["ACTION_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "cache.json")
+        os.chdir(use_service("models"))
+        import main as service
+        import model
+        from pipeline import Pipeline
+
+        async def generate_actions(question):
+            await asyncio.sleep(llm_actions)
+            return ACTIONS
+
+        async def generate_answer(result, question):
+            await asyncio.sleep(llm_answer)
+            return "You have 3 events."
+
+        async with service.app.router.lifespan_context(service.app):
+            service.app.state.pipeline = Pipeline(
+                generate_actions=generate_actions,
+                generate_answer=generate_answer,
+                get_weather=model.get_weather,
+                http=service.app.state.http,
+                django_url=django_url,
+            )
+            transport = httpx.ASGITransport(app=service.app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://models", timeout=60
+            ) as client:
+                semaphore = asyncio.Semaphore(concurrency)
+                latencies = []
+
+                async def one(i):
+                    async with semaphore:
+                        start = time.perf_counter()
+                        response = await client.post("/ask_text", json={"question": f"q{i}"})
+                        response.raise_for_status()
+                        latencies.append(time.perf_counter() - start)
+
+                # keep the service's per-request prints out of the report
+                with Timer() as timer, contextlib.redirect_stdout(io.StringIO()):
+                    await asyncio.gather(*(one(i) for i in range(total)))
+                report(f"async pipeline ({concurrency} in flight)", latencies, timer.elapsed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--llm-actions", type=float, default=0.3)
+    parser.add_argument("--llm-answer", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.llm_actions, args.llm_answer))
@@ -0,0 +1,126 @@
+"""Throughput of /ask_audio with many concurrent uploads.
+
+``old`` replays the previous handler (copy the upload to
+``temp/<filename>``, reopen it for transcription), ``new`` drives the real
+/ask_audio route, which hands the spooled upload buffer to transcription
+under the concurrency limit. The transcription client is a stub that
+reads the whole file and sleeps for ``--transcribe`` seconds, and the
+question pipeline is stubbed out, so only the upload path differs.
+Reports throughput, latency and the peak number of transcriptions that
+ran at the same time.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import time
+from types import SimpleNamespace
+
+import httpx
+from fastapi import FastAPI, File, UploadFile
+
+from common import Timer, report, use_service
+
+
+class StubTranscriptions:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.running = 0
+        self.peak = 0
+
+    async def create(self, model, file):
+        name, audio_file = file if isinstance(file, tuple) else ("", file)
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            while audio_file.read(64 * 1024):
+                pass
+            await asyncio.sleep(self.delay)
+        finally:
+            self.running -= 1
+        return SimpleNamespace(text="what do I have tomorrow")
+
+
+class StubPipeline:
+    async def ask(self, question):
+        return "Nothing planned."
+
+
+def old_app(transcribe, directory: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/ask_audio")
+    async def ask_audio(audio: UploadFile = File(...)):
+        filepath = os.path.join(directory, audio.filename)
+        with open(filepath, "wb") as buffer:
+            shutil.copyfileobj(audio.file, buffer)
+        with open(filepath, "rb") as audio_file:
+            question = await transcribe(audio_file)
+        return {"answer": question}
+
+    return app
+
+
+async def load(app, label: str, total: int, concurrency: int, payload: bytes):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://models", timeout=120
+    ) as client:
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def one(i):
+            async with semaphore:
+                start = time.perf_counter()
+                # the same file name for everyone, like phones recording voice-message.mp3
+                response = await client.post(
+                    "/ask_audio", files={"audio": ("voice-message.mp3", payload, "audio/mpeg")}
+                )
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        with Timer() as timer, contextlib.redirect_stdout(io.StringIO()):
+            await asyncio.gather(*(one(i) for i in range(total)))
+        return report(label, latencies, timer.elapsed)
+
+
+async def main(total: int, concurrency: int, size: int, transcribe: float, slots: int):
+    os.environ.setdefault("KEY", "stub")
+    os.environ["ACTION_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "cache.json")
+    os.environ["TRANSCRIBE_CONCURRENCY"] = str(slots)
+    os.chdir(use_service("models"))
+    import main as service
+    import model
+
+    payload = os.urandom(size)
+    transcriptions = StubTranscriptions(transcribe)
+    model.client = SimpleNamespace(audio=SimpleNamespace(transcriptions=transcriptions))
+
+    async def transcribe_path(audio_file):
+        return (await transcriptions.create(model="whisper-1", file=audio_file)).text
+
+    with tempfile.TemporaryDirectory() as directory:
+        await load(old_app(transcribe_path, directory), "temp file copy", total, concurrency, payload)
+    print(f"  peak concurrent transcriptions: {transcriptions.peak}")
+
+    transcriptions.peak = 0
+    async with service.app.router.lifespan_context(service.app):
+        service.app.state.pipeline = StubPipeline()
+        await load(service.app, f"spooled buffer ({slots} slots)", total, concurrency, payload)
+        print(f"  peak concurrent transcriptions: {transcriptions.peak}")
+        print(f"  {service.app.state.audio.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--size", type=int, default=2 * 1024 * 1024, help="upload size in bytes")
+    parser.add_argument("--transcribe", type=float, default=0.05, help="stub transcription time")
+    parser.add_argument("--slots", type=int, default=8, help="TRANSCRIBE_CONCURRENCY")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.size, args.transcribe, args.slots))
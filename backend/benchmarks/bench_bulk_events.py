@@ -0,0 +1,90 @@
+"""Single-item event routes vs. the bulk ones.
+
+Creates, updates and deletes N events once through ``create_event`` /
+``update_event`` / ``delete_event`` (one request per event) and once
+through ``bulk_create_events`` / ``bulk_update_events`` /
+``bulk_delete_events`` (one request per batch), in process through
+Django's test client, so the numbers leave out the network round trips
+the single-item routes would also pay in production. Reports events/sec.
+"""
+
+import argparse
+import json
+
+from common import Timer, setup_django
+
+
+def events(count: int):
+    return [
+        {
+            "name": f"Lecture {i}",
+            "start_date": f"2026-02-{i % 28 + 1:02d}T{8 + i % 10:02d}:00:00Z",
+            "end_date": f"2026-02-{i % 28 + 1:02d}T{9 + i % 10:02d}:00:00Z",
+            "description": "",
+            "category": "Study",
+        }
+        for i in range(count)
+    ]
+
+
+def line(label: str, count: int, elapsed: float):
+    print(f"{label:<24} {count:>6} events  {count / elapsed:>10.0f} events/s  {elapsed * 1000:>9.1f} ms")
+
+
+def main(count: int):
+    setup_django()
+    from db.models import Event
+    from django.test import Client
+
+    client = Client()
+    items = events(count)
+
+    # single-item routes
+    with Timer() as timer:
+        for item in items:
+            client.post("/api/create_event/", json.dumps(item), content_type="application/json")
+    line("create_event", count, timer.elapsed)
+    ids = list(Event.objects.values_list("id", flat=True))
+
+    with Timer() as timer:
+        for id in ids:
+            client.patch(f"/api/update_event/?id={id}", json.dumps({"category": "Exam"}),
+                         content_type="application/json")
+    line("update_event", count, timer.elapsed)
+
+    with Timer() as timer:
+        for id in ids:
+            client.delete(f"/api/delete_event/?id={id}")
+    line("delete_event", count, timer.elapsed)
+    assert not Event.objects.exists()
+
+    # bulk routes
+    with Timer() as timer:
+        response = client.post("/api/bulk_create_events/", json.dumps({"events": items}),
+                               content_type="application/json")
+    assert response.json()["status"] == "success", response.content[:500]
+    line("bulk_create_events", count, timer.elapsed)
+    ids = [result["id"] for result in response.json()["results"]]
+
+    with Timer() as timer:
+        response = client.patch(
+            "/api/bulk_update_events/",
+            json.dumps({"events": [{"id": id, "category": "Exam"} for id in ids]}),
+            content_type="application/json",
+        )
+    assert response.json()["status"] == "success"
+    line("bulk_update_events", count, timer.elapsed)
+
+    with Timer() as timer:
+        response = client.post("/api/bulk_delete_events/", json.dumps({"ids": ids}),
+                               content_type="application/json")
+    assert response.json()["status"] == "success"
+    line("bulk_delete_events", count, timer.elapsed)
+    assert not Event.objects.exists()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.events)
@@ -0,0 +1,79 @@
+"""Bulk conflict detection: one sweep vs. one overlap query per candidate.
+
+Fills the event table with N existing events and checks M candidate
+events against them:
+
+* ``per-candidate SQL``: ``Event.objects.filter(start_date__lt=end,
+  end_date__gt=start)`` for every candidate (what pre-write checks done
+  one event at a time cost),
+* ``sweep``: ``timeline.find_conflicts`` loads the covered window once and
+  finds every overlap in a single sweep line pass,
+* ``/api/check_conflicts/`` with the whole batch in one request.
+
+Both methods must report the same pairs.
+"""
+
+import argparse
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+from common import Timer, setup_django
+from bench_free_slots import fill
+
+START = datetime(2025, 1, 6, tzinfo=timezone.utc)
+SPAN = timedelta(days=20 * 365)
+
+
+def make_candidates(count: int):
+    random.seed(3)
+    candidates = []
+    for _ in range(count):
+        start = START + timedelta(minutes=15 * random.randrange(SPAN.days * 96))
+        candidates.append({"start_date": start, "end_date": start + timedelta(hours=1)})
+    return candidates
+
+
+def main(existing: int, count: int):
+    setup_django()
+    from api.timeline import find_conflicts
+    from db.models import Event
+    from django.test import Client
+
+    fill(existing)
+    candidates = make_candidates(count)
+
+    with Timer() as timer:
+        pairs = set()
+        for index, candidate in enumerate(candidates):
+            ids = Event.objects.filter(
+                start_date__lt=candidate["end_date"], end_date__gt=candidate["start_date"]
+            ).values_list("id", flat=True)
+            pairs.update((index, id) for id in ids)
+    print(f"per-candidate SQL   {timer.elapsed * 1000:9.1f} ms  ({len(pairs)} overlaps)")
+
+    with Timer() as timer:
+        conflicts = find_conflicts(Event.objects.all(), candidates)
+    print(f"sweep               {timer.elapsed * 1000:9.1f} ms  ({len(conflicts)} overlaps)")
+    assert {(candidate, row[0]) for candidate, row in conflicts} == pairs
+
+    body = json.dumps(
+        {
+            "events": [
+                {"start_date": c["start_date"].isoformat(), "end_date": c["end_date"].isoformat()}
+                for c in candidates
+            ]
+        }
+    )
+    with Timer() as timer:
+        response = Client().post("/api/check_conflicts/", body, content_type="application/json")
+    assert response.status_code == 200, response.content
+    print(f"/api/check_conflicts/ {timer.elapsed * 1000:7.1f} ms  ({len(response.content)} bytes)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--existing", type=int, default=100_000)
+    parser.add_argument("--candidates", type=int, default=1_000)
+    args = parser.parse_args()
+    main(args.existing, args.candidates)
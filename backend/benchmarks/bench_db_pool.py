@@ -0,0 +1,126 @@
+"""Django database connection settings under load, against Postgres.
+
+Runs the ASGI app under uvicorn three times, with the settings driven by
+the environment as in production:
+
+* ``per request``: ``DB_POOL=False DB_CONN_MAX_AGE=0``, a new Postgres
+  connection (and backend process) for every request, the old default,
+* ``persistent``: ``DB_POOL=False DB_CONN_MAX_AGE=60``, one connection kept
+  per thread; under ASGI every request gets a fresh thread, so it mostly
+  behaves like the first one and leaves idle connections behind,
+* ``pool``: ``DB_POOL=True``, a psycopg pool of ``--pool-size``.
+
+The load is ``get_event`` reads and ``exec_sql_request`` SELECTs from
+``--concurrency`` keep-alive clients. After each run the pool counters of
+``/api/db_stats/`` are printed.
+
+Needs a reachable Postgres and psycopg 3::
+
+    BENCH_POSTGRES=True POSTGRES_HOST=localhost python benchmarks/bench_db_pool.py
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+from common import BACKEND_DIR, free_port, keepalive_load, report, setup_django
+
+DJANGO_DIR = os.path.join(BACKEND_DIR, "django", "smart_calendar")
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIGS = (
+    ("per request", {"DB_POOL": "False", "DB_CONN_MAX_AGE": "0"}),
+    ("persistent", {"DB_POOL": "False", "DB_CONN_MAX_AGE": "60"}),
+    ("pool", {"DB_POOL": "True"}),
+)
+
+
+def serve(port: int, env: dict):
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "smart_calendar.asgi:application",
+            "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+        ],
+        cwd=DJANGO_DIR,
+        env={
+            **os.environ,
+            **env,
+            "DJANGO_SETTINGS_MODULE": "django_settings",
+            "PYTHONPATH": os.pathsep.join([DJANGO_DIR, BENCH_DIR]),
+        },
+    )
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError("uvicorn exited")
+            time.sleep(0.05)
+
+
+def requests(ids, count: int):
+    random.seed(18)
+    select = json.dumps(
+        {"actions": [{"id": "action_1", "type": "select", "sql": "SELECT id, name FROM event ORDER BY start_date LIMIT 20"}]}
+    ).encode()
+    for i in range(count):
+        if i % 2:
+            yield "/api/get_event/", {"id": random.choice(ids)}
+        else:
+            yield "/api/exec_sql_request/", {}, select
+
+
+def main(count: int, concurrency: int, pool_size: int):
+    if os.environ.get("BENCH_POSTGRES") != "True":
+        sys.exit("set BENCH_POSTGRES=True (and POSTGRES_HOST, ...) to run against Postgres")
+    setup_django()
+    from db.models import Event
+
+    created = Event.objects.bulk_create(
+        Event(
+            start_date=f"2026-03-{i % 28 + 1:02d}T09:00:00Z",
+            end_date=f"2026-03-{i % 28 + 1:02d}T10:00:00Z",
+            name=f"bench pool {i}",
+            description="",
+            category="Work",
+        )
+        for i in range(500)
+    )
+    ids = [event.id for event in created]
+    print(f"{count} requests per run, {concurrency} clients, pool of {pool_size}")
+
+    try:
+        for label, env in CONFIGS:
+            port = free_port()
+            env = {**env, "DB_POOL_MIN_SIZE": str(pool_size), "DB_POOL_MAX_SIZE": str(pool_size)}
+            process = serve(port, env)
+            try:
+                latencies, elapsed = asyncio.run(
+                    keepalive_load(port, requests(ids, count), concurrency)
+                )
+                report(label, latencies, elapsed)
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/db_stats/") as response:
+                    stats = json.load(response)
+                if stats["pool"]:
+                    print(f"{'':<32} pool: {stats['pool']}")
+            finally:
+                process.terminate()
+                process.wait()
+    finally:
+        Event.objects.filter(id__in=ids).delete()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--pool-size", type=int, default=10)
+    args = parser.parse_args()
+    main(args.requests, args.concurrency, args.pool_size)
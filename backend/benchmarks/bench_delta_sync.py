@@ -0,0 +1,118 @@
+"""What the calendar transfers to stay current: month refetch vs. delta sync.
+
+Fills one month with N events in a SQLite file and runs the gateway with
+its Django client pointed at the Django ASGI app in-process. After each
+of ``--rounds`` edits of one event through the gateway the client catches
+up three ways:
+
+* ``refetch``: ``GET /events/`` for the month, what the frontend did
+  after every write,
+* ``changes``: ``GET /events/changes?since=<version>``, only the edited
+  row,
+* ``revalidate``: ``GET /events/`` with the ETag of a month that did not
+  change, a 304 without a body.
+
+Reports the response body size and the mean latency of each.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from common import setup_django, use_service
+
+MONTH = {"year": 2025, "month": 12}
+
+
+def fill_month(count: int):
+    from db.models import Event
+
+    start = datetime(2025, 12, 1, tzinfo=timezone.utc)
+    step = timedelta(seconds=30 * 24 * 3600 // count)
+    Event.objects.bulk_create(
+        (
+            Event(
+                start_date=start + i * step,
+                end_date=start + i * step + timedelta(hours=1),
+                name=f"Event {i}",
+                description="Agenda in the shared folder.",
+                category="Work",
+            )
+            for i in range(count)
+        ),
+        batch_size=5000,
+    )
+    return Event.objects.values_list("id", flat=True).first()
+
+
+async def timed(front, path, **kwargs):
+    start = time.perf_counter()
+    response = await front.get(path, **kwargs)
+    return response, time.perf_counter() - start
+
+
+async def sync_rounds(event_id: int, rounds: int) -> dict:
+    from django.core.asgi import get_asgi_application
+
+    use_service("fastapi")
+    import main as gateway
+
+    django = httpx.ASGITransport(app=get_asgi_application())
+    results = {name: [0, 0.0] for name in ("refetch", "changes", "revalidate")}
+
+    async with gateway.app.router.lifespan_context(gateway.app):
+        gateway.app.state.client = httpx.AsyncClient(transport=django, base_url="http://django/api")
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=gateway.app), base_url="http://gateway"
+        ) as front:
+            # the first sync of a client is a reset to the current version
+            version = (await front.get("/events/changes", params={"since": 0})).json()["version"]
+            other = (await front.get("/events/", params={"year": 2026, "month": 1})).headers["ETag"]
+
+            for i in range(rounds):
+                response = await front.patch(f"/event/update/{event_id}", json={"name": f"Edit {i}"})
+                response.raise_for_status()
+
+                response, elapsed = await timed(front, "/events/", params=MONTH)
+                results["refetch"][0] += len(response.content)
+                results["refetch"][1] += elapsed
+
+                response, elapsed = await timed(front, "/events/changes", params={"since": version})
+                feed = response.json()
+                assert not feed["reset"] and len(feed["changed"]) == 1, feed
+                version = feed["version"]
+                results["changes"][0] += len(response.content)
+                results["changes"][1] += elapsed
+
+                response, elapsed = await timed(
+                    front, "/events/", params={"year": 2026, "month": 1},
+                    headers={"If-None-Match": other},
+                )
+                assert response.status_code == 304, response.status_code
+                results["revalidate"][0] += len(response.content)
+                results["revalidate"][1] += elapsed
+        await gateway.app.state.client.aclose()
+    return results
+
+
+def main(count: int, rounds: int):
+    os.environ["BENCH_SQLITE"] = os.path.join(tempfile.mkdtemp(), "bench.sqlite3")
+    setup_django()
+    results = asyncio.run(sync_rounds(fill_month(count), rounds))
+
+    print(f"{count} events in the month, {rounds} edits")
+    for name, (size, elapsed) in results.items():
+        print(f"{name:<11} {size / rounds:10.0f} bytes  {elapsed / rounds * 1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    main(args.events, args.rounds)
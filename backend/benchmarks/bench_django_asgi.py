@@ -0,0 +1,150 @@
+"""The Django API served over WSGI vs. ASGI.
+
+Serves the project from two forked processes, one port each:
+
+* ``wsgi``: ``smart_calendar.wsgi`` behind Django's threaded WSGI server,
+  what ``manage.py runserver`` ran (a thread per connection),
+* ``asgi``: ``smart_calendar.asgi`` under uvicorn, the async views and
+  the async ORM.
+
+Both answer the same load from ``--concurrency`` keep-alive clients, a mix of
+``get_event``, ``get_events`` for a month and ``list_events`` pages, over
+a SQLite file. ``--db-delay`` adds a fixed latency to every query (a
+database on another host) so the servers are compared on waiting, not on
+SQLite's speed.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import multiprocessing
+import random
+import socket
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import uvicorn
+
+from common import free_port, keepalive_load, report, setup_django
+
+
+def fill(count: int):
+    from db.models import Event
+
+    random.seed(17)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    events = []
+    for i in range(count):
+        begin = start + timedelta(minutes=30 * random.randrange(365 * 48))
+        events.append(
+            Event(
+                start_date=begin,
+                end_date=begin + timedelta(hours=1),
+                name=f"Event {i}",
+                description="Agenda in the shared folder.",
+                category="Work",
+            )
+        )
+    Event.objects.bulk_create(events, batch_size=5000)
+    return list(Event.objects.values_list("id", flat=True))
+
+
+def add_db_delay(delay: float):
+    """Sleep `delay` seconds before every query on every connection."""
+    from django.db.backends.signals import connection_created
+
+    def slow(execute, sql, params, many, context):
+        time.sleep(delay)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        # a thread's DatabaseWrapper reconnects for every request
+        if slow not in connection.execute_wrappers:
+            connection.execute_wrappers.append(slow)
+
+    connection_created.connect(install, weak=False)
+
+
+def serve_wsgi(port: int):
+    from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+    from django.core.wsgi import get_wsgi_application
+
+    class Server(ThreadedWSGIServer):
+        # the default backlog of 5 resets connections under load
+        request_queue_size = 1024
+
+    server = Server(("127.0.0.1", port), WSGIRequestHandler)
+    server.set_app(get_wsgi_application())
+    # get_wsgi_application() set up logging again, drop the access log
+    logging.getLogger("django.server").setLevel(logging.WARNING)
+    server.serve_forever()
+
+
+def serve_asgi(port: int):
+    from django.core.asgi import get_asgi_application
+
+    uvicorn.run(
+        get_asgi_application(), host="127.0.0.1", port=port,
+        log_level="warning", lifespan="off",
+    )
+
+
+def start(serve, port: int):
+    process = multiprocessing.get_context("fork").Process(target=serve, args=(port,), daemon=True)
+    process.start()
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+
+
+def requests(ids, count: int):
+    random.seed(4)
+    for i in range(count):
+        kind = i % 4
+        if kind < 2:
+            yield "/api/get_event/", {"id": random.choice(ids)}
+        elif kind == 2:
+            yield "/api/get_events/", {"year": 2026, "month": random.randrange(1, 13)}
+        else:
+            yield "/api/list_events/", {"view": "grid", "limit": 100}
+
+
+def main(events: int, count: int, concurrency, db_delay: float):
+    path = os.path.join(tempfile.mkdtemp(), "bench.sqlite3")
+    os.environ["BENCH_SQLITE"] = path
+    setup_django()
+    from django.db import connections
+
+    ids = fill(events)
+    add_db_delay(db_delay)
+    # the forked servers open their own connections
+    connections.close_all()
+    print(f"{events} events, {count} requests per run, {db_delay * 1000:.0f} ms per query")
+
+    servers = {}
+    for label, serve in (("wsgi", serve_wsgi), ("asgi", serve_asgi)):
+        port = free_port()
+        servers[label] = (port, start(serve, port))
+
+    for clients in concurrency:
+        for label, (port, _) in servers.items():
+            latencies, elapsed = asyncio.run(keepalive_load(port, requests(ids, count), clients))
+            report(f"{label}, {clients} clients", latencies, elapsed)
+
+    for _, process in servers.values():
+        process.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--db-delay", type=float, default=0.005, help="seconds per query")
+    args = parser.parse_args()
+    main(args.events, args.requests, args.concurrency, args.db_delay)
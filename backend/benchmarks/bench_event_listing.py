@@ -0,0 +1,114 @@
+"""Month view vs. keyset-paginated listing.
+
+Stores N events over a year, each with a paragraph of description, and
+for every month compares:
+
+* ``get_events``: the whole month in one response, ``{"model", "pk",
+  "fields"}`` objects with every column,
+* ``list_events grid``: the same events in pages of ``--limit`` with
+  ``view=grid`` (no description), following ``next_cursor``,
+* page 50 of the whole table, read with a cursor by ``list_page()`` and
+  with OFFSET on the same ordering, deeper pages cost OFFSET more.
+
+Reports bytes and milliseconds per month (per page for the deep pages).
+"""
+
+import argparse
+import random
+from datetime import datetime, timedelta, timezone
+
+from common import Timer, setup_django
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def fill(count: int):
+    from db.models import Event
+
+    random.seed(16)
+    events = []
+    for i in range(count):
+        start = START + timedelta(minutes=15 * random.randrange(365 * 96))
+        events.append(
+            Event(
+                start_date=start,
+                end_date=start + timedelta(minutes=random.choice((30, 60, 90))),
+                name=f"Event {i}",
+                description="Bring the slides and the printed agenda. " * 6,
+                category=random.choice(("Work", "Study", "Home")),
+            )
+        )
+    Event.objects.bulk_create(events, batch_size=5000)
+
+
+def month_params(month: int):
+    start = datetime(2026, month, 1, tzinfo=timezone.utc)
+    end = datetime(2026 + month // 12, month % 12 + 1, 1, tzinfo=timezone.utc)
+    return {"from": start.isoformat(), "to": end.isoformat()}
+
+
+def list_month(client, month: int, limit: int):
+    size = pages = 0
+    params = {**month_params(month), "view": "grid", "limit": limit}
+    while True:
+        response = client.get("/api/list_events/", params)
+        size += len(response.content)
+        pages += 1
+        cursor = response.json()["next_cursor"]
+        if cursor is None:
+            return size, pages
+        params["cursor"] = cursor
+
+
+def main(count: int, limit: int):
+    setup_django()
+    from api.listing import FIELDSETS, list_page
+    from db.models import Event
+    from django.test import Client
+
+    fill(count)
+    client = Client()
+    print(f"{count} events, pages of {limit}")
+
+    with Timer() as timer:
+        sizes = [
+            len(client.get("/api/get_events/", {"year": 2026, "month": month}).content)
+            for month in range(1, 13)
+        ]
+    print(f"{'get_events':<22} {timer.elapsed / 12 * 1000:8.2f} ms/month  {sum(sizes) / 12 / 1024:8.1f} KiB/month")
+
+    with Timer() as timer:
+        results = [list_month(client, month, limit) for month in range(1, 13)]
+    size = sum(size for size, _ in results)
+    pages = sum(pages for _, pages in results)
+    print(
+        f"{'list_events grid':<22} {timer.elapsed / 12 * 1000:8.2f} ms/month  {size / 12 / 1024:8.1f} KiB/month"
+        f"  ({pages / 12:.1f} pages)"
+    )
+
+    with Timer() as timer:
+        for month in range(1, 13):
+            client.get("/api/list_events/", {**month_params(month), "view": "grid", "limit": limit})
+    print(f"{'list_events 1st page':<22} {timer.elapsed / 12 * 1000:8.2f} ms/month")
+
+    # page 50 of the whole table: cursor vs. OFFSET
+    ordered = Event.objects.order_by("start_date", "id")
+    offset = 50 * limit
+    cursor = ordered.values_list("start_date", "id")[offset - 1]
+    rounds = 50
+    with Timer() as timer:
+        for _ in range(rounds):
+            list_page(Event.objects.all(), FIELDSETS["grid"], limit, cursor)
+    print(f"{'cursor, page 50':<22} {timer.elapsed / rounds * 1000:8.2f} ms/page (query and encoding)")
+    with Timer() as timer:
+        for _ in range(rounds):
+            list(ordered.values_list("id", *FIELDSETS["grid"])[offset:offset + limit + 1])
+    print(f"{'OFFSET, page 50':<22} {timer.elapsed / rounds * 1000:8.2f} ms/page (query only)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=50000)
+    parser.add_argument("--limit", type=int, default=200)
+    args = parser.parse_args()
+    main(args.events, args.limit)
@@ -0,0 +1,84 @@
+"""serializers.serialize + json.loads + JsonResponse vs. the direct path.
+
+Fills one month with N events and times building the ``get_events``
+response body both ways, plus the streaming variant.
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+from common import setup_django
+
+
+def fill_month(count: int):
+    from db.models import Event
+
+    Event.objects.all().delete()
+    start = datetime(2025, 12, 1, tzinfo=timezone.utc)
+    step = timedelta(seconds=30 * 24 * 3600 // count)
+    Event.objects.bulk_create(
+        (
+            Event(
+                start_date=start + i * step,
+                end_date=start + i * step + timedelta(hours=1),
+                name=f"Event {i}",
+                description="Lorem ipsum dolor sit amet " * 4,
+                category="Work",
+            )
+            for i in range(count)
+        ),
+        batch_size=5000,
+    )
+
+
+def old_path(events):
+    from api.serializers import EVENT_FIELDS
+    from django.core import serializers
+    from django.http import JsonResponse
+
+    # the fields get_events returns; version and updated_at are model fields
+    # since db.0005 but only the delta sync feed sends the version
+    result = json.loads(serializers.serialize("json", events, fields=EVENT_FIELDS))
+    return JsonResponse(result, safe=False).content
+
+
+def best_of(fn, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, body
+
+
+def main(sizes, repeat: int):
+    setup_django()
+    from api.serializers import events_response, serialize_events
+    from db.models import Event
+
+    for count in sizes:
+        fill_month(count)
+        events = Event.objects.filter(start_date__year=2025, start_date__month=12)
+
+        old, old_body = best_of(lambda: old_path(events), repeat)
+        new, new_body = best_of(lambda: serialize_events(events), repeat)
+        streamed, _ = best_of(
+            lambda: b"".join(events_response(events, stream=True)), repeat
+        )
+        assert json.loads(old_body) == json.loads(new_body)
+
+        print(
+            f"{count:>7} events  serialize+loads {old * 1000:>9.1f} ms  "
+            f"direct {new * 1000:>8.1f} ms ({old / new:.1f}x)  "
+            f"streaming {streamed * 1000:>8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    main(args.sizes, args.repeat)
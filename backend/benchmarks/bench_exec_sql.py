@@ -0,0 +1,89 @@
+"""Action-by-action autocommit execution vs. the transactional engine.
+
+Times ``exec_sql_request`` payloads of N actions (mostly INSERTs with a
+SELECT at the end, like a "plan my week" question) executed the old way,
+one cursor and one implicit transaction per action, and through
+``api.executor.execute_actions``.
+
+In-memory SQLite makes commits free, so run with BENCH_POSTGRES=True to
+see the per-transaction round trips and fsyncs the engine saves.
+"""
+
+import argparse
+import time
+
+from common import setup_django
+
+
+def payload(size: int):
+    actions = [
+        {
+            "id": f"action_{i + 1}",
+            "type": "create",
+            "sql": (
+                "INSERT INTO event (name, start_date, end_date, description, category) "
+                f"VALUES ('Event {i}', '2025-12-{i % 28 + 1:02d} 09:00:00+00', "
+                f"'2025-12-{i % 28 + 1:02d} 10:00:00+00', 'Planned', 'Work');"
+            ),
+        }
+        for i in range(size - 1)
+    ]
+    actions.append(
+        {
+            "id": f"action_{size}",
+            "type": "select",
+            "sql": "SELECT * FROM event WHERE start_date >= '2025-12-01' LIMIT 50;",
+        }
+    )
+    return actions
+
+
+def old_path(actions):
+    from api.executor import dictfetchall
+    from django.db import connection
+
+    result = {}
+    for action in actions:
+        with connection.cursor() as cursor:
+            cursor.execute(action["sql"])
+            if action["type"] == "select":
+                result["fetched_data"] = dictfetchall(cursor)
+            else:
+                result["message"] = "Insert executed successfully"
+    return result
+
+
+def measure(fn, actions, repeat: int):
+    from db.models import Event
+
+    samples = []
+    for _ in range(repeat):
+        Event.objects.all().delete()
+        start = time.perf_counter()
+        fn(actions)
+        samples.append(time.perf_counter() - start)
+    return min(samples)
+
+
+def main(sizes, repeat: int):
+    setup_django()
+    from api.executor import ATOMIC, BEST_EFFORT, execute_actions
+
+    for size in sizes:
+        actions = payload(size)
+        old = measure(old_path, actions, repeat)
+        atomic = measure(lambda a: execute_actions(a, ATOMIC), actions, repeat)
+        best = measure(lambda a: execute_actions(a, BEST_EFFORT), actions, repeat)
+        print(
+            f"{size:>4} actions  per-action autocommit {old * 1000:>8.2f} ms  "
+            f"atomic {atomic * 1000:>8.2f} ms ({old / atomic:.1f}x)  "
+            f"best_effort {best * 1000:>8.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2, 5, 20, 100])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main(args.sizes, args.repeat)
@@ -0,0 +1,121 @@
+"""Free-slot finder over 100k events: sorted-array index vs. a linear scan.
+
+Fills the event table with N events spread over twenty years (short
+meetings, some overlapping), then times:
+
+* loading the whole table into a ``Timeline`` (query + merge),
+* "first 5 free one-hour slots in working hours" at random points in
+  time, answered by the bisect-based index and by a linear scan over the
+  sorted events (what an ad-hoc SQL/Python loop does),
+* the ``/api/free_slots/`` endpoint for a one-week window.
+"""
+
+import argparse
+import random
+from datetime import datetime, timedelta, timezone
+
+from common import Timer, setup_django
+
+START = datetime(2025, 1, 6, tzinfo=timezone.utc)  # a Monday
+SPAN = timedelta(days=20 * 365)
+
+
+def fill(count: int):
+    from db.models import Event
+
+    Event.objects.all().delete()
+    random.seed(12)
+    events = []
+    for i in range(count):
+        start = START + timedelta(minutes=15 * random.randrange(SPAN.days * 96))
+        events.append(
+            Event(
+                start_date=start,
+                end_date=start + timedelta(minutes=random.choice((30, 45, 60, 90, 120))),
+                name=f"Event {i}",
+                description="",
+                category="Work",
+            )
+        )
+    Event.objects.bulk_create(events, batch_size=5000)
+
+
+def linear_first_free(intervals, start, end, duration, count, hours):
+    """First `count` slots by scanning every event from the beginning."""
+    from api.timeline import intersect
+
+    def free():
+        cursor = start
+        for busy_start, busy_end in intervals:
+            if busy_end <= cursor:
+                continue
+            if busy_start >= end:
+                break
+            if busy_start > cursor:
+                yield cursor, busy_start
+            cursor = max(cursor, busy_end)
+        if cursor < end:
+            yield cursor, end
+
+    slots = []
+    for gap_start, gap_end in intersect(free(), hours.windows(start, end)):
+        slot = -(-gap_start // 900) * 900
+        while slot + duration <= gap_end:
+            slots.append((slot, slot + duration))
+            if len(slots) == count:
+                return slots
+            slot += duration
+    return slots
+
+
+def main(count: int, queries: int):
+    setup_django()
+    from api.timeline import Timeline, WorkingHours, free_slots
+    from db.models import Event
+    from django.test import Client
+
+    with Timer() as timer:
+        fill(count)
+    print(f"inserted {count} events in {timer.elapsed:.1f} s")
+
+    with Timer() as load:
+        timeline = Timeline.load(Event.objects.all(), START, START + SPAN)
+    print(f"Timeline.load, whole table: {load.elapsed * 1000:.0f} ms ({len(timeline)} merged busy intervals)")
+
+    intervals = sorted(
+        (s.timestamp(), e.timestamp())
+        for s, e in Event.objects.values_list("start_date", "end_date")
+    )
+    hours = WorkingHours()
+    random.seed(7)
+    points = [
+        START.timestamp() + random.random() * (SPAN.total_seconds() - 30 * 86400)
+        for _ in range(queries)
+    ]
+
+    for label, find in (
+        ("bisect index", lambda t: free_slots(timeline, t, t + 30 * 86400, 3600, 5, hours)),
+        ("linear scan", lambda t: linear_first_free(intervals, t, t + 30 * 86400, 3600, 5, hours)),
+    ):
+        with Timer() as timer:
+            results = [find(t) for t in points]
+        print(f"{label:<14} {timer.elapsed / queries * 1e6:10.1f} us/query")
+    assert results == [free_slots(timeline, t, t + 30 * 86400, 3600, 5, hours) for t in points]
+
+    client = Client()
+    week = START + timedelta(days=365)
+    params = {"from": week.isoformat(), "to": (week + timedelta(days=7)).isoformat(), "count": 5}
+    client.get("/api/free_slots/", params)
+    with Timer() as timer:
+        for _ in range(100):
+            response = client.get("/api/free_slots/", params)
+    assert response.status_code == 200, response.content
+    print(f"/api/free_slots/ (one week)  {timer.elapsed / 100 * 1000:.2f} ms/request")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    main(args.events, args.queries)
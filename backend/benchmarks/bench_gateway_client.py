@@ -0,0 +1,88 @@
+"""Per-request httpx clients vs. the gateway's shared pooled client.
+
+Runs the gateway's ``GET /events/`` route against a local stub Django
+server, once with the old pattern (a new ``httpx.AsyncClient`` for every
+proxied call) and once through the app-lifetime client created in the
+lifespan hook. Reports requests/sec and p50/p99 latency for each.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from common import StubDjango, Timer, report, use_service
+
+MONTH = [
+    {
+        "model": "db.event",
+        "pk": pk,
+        "fields": {
+            "start_date": "2025-12-01T09:00:00Z",
+            "end_date": "2025-12-01T10:00:00Z",
+            "name": f"Event {pk}",
+            "description": "",
+            "category": "Work",
+        },
+    }
+    for pk in range(30)
+]
+
+
+async def run(call, total: int, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await call(i)
+            latencies.append(time.perf_counter() - start)
+
+    with Timer() as timer:
+        await asyncio.gather(*(one(i) for i in range(total)))
+    return latencies, timer.elapsed
+
+
+async def main(total: int, concurrency: int):
+    with StubDjango({"/api/get_events/": MONTH}) as stub:
+        os.environ["DJANGO_BACKEND_URL"] = f"{stub.url}/api"
+        use_service("fastapi")
+        import main as gateway
+
+        # old behaviour: one client (and one TCP connection) per call
+        async def per_request(i):
+            async with httpx.AsyncClient() as client:
+                response = await client.get(
+                    f"{stub.url}/api/get_events/",
+                    params={"year": 2025, "month": 12},
+                )
+            response.json()
+
+        latencies, elapsed = await run(per_request, total, concurrency)
+        report("new client per request", latencies, elapsed)
+
+        transport = httpx.ASGITransport(app=gateway.app)
+        async with gateway.app.router.lifespan_context(gateway.app):
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://gateway"
+            ) as front:
+
+                async def pooled(i):
+                    response = await front.get(
+                        "/events/", params={"year": 2025, "month": 12}
+                    )
+                    response.raise_for_status()
+
+                latencies, elapsed = await run(pooled, total, concurrency)
+                report("shared pooled client (gateway)", latencies, elapsed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
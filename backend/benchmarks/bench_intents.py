@@ -0,0 +1,162 @@
+"""Accuracy, hit rate and latency of the rule-based intent fast path.
+
+Runs ``intents.IntentParser`` over a fixture corpus of English and
+Ukrainian questions, each labelled with the intent and parameters it must
+resolve to (or ``None`` where the model has to answer), with "today"
+fixed to Wednesday 2025-12-03. Reports:
+
+* hit rate over the corpus and over the questions the fast path covers,
+* precision: hits with the right intent and dates/id,
+* false positives: hits on questions the model should have answered,
+* parse latency, and the mean time of the actions stage with and without
+  the fast path for a model call of ``--llm-ms``.
+"""
+
+import argparse
+from datetime import date
+
+from common import Timer, percentile, use_service
+
+use_service("models")
+from intents import IntentParser  # noqa: E402
+
+TODAY = date(2025, 12, 3)
+
+
+def day(d: int, month: int = 12, year: int = 2025):
+    return date(year, month, d)
+
+
+def agenda(start, end):
+    return ("agenda", (start, end))
+
+
+TOMORROW = agenda(day(4), day(5))
+FRIDAY = agenda(day(5), day(6))
+THIS_WEEK = agenda(day(1), day(8))
+NEXT_WEEK = agenda(day(8), day(15))
+WEEKEND = agenda(day(6), day(8))
+
+CORPUS = [
+    # agenda, English
+    ("What do I have tomorrow?", TOMORROW),
+    ("what do i have today", agenda(day(3), day(4))),
+    ("What's on my calendar tomorrow", TOMORROW),
+    ("anything planned for tomorrow?", TOMORROW),
+    ("show my schedule for the day after tomorrow", agenda(day(5), day(6))),
+    ("What do I have on Friday?", FRIDAY),
+    ("what's happening on monday", agenda(day(8), day(9))),
+    ("what do I have next Wednesday", agenda(day(10), day(11))),
+    ("Show my events this week", THIS_WEEK),
+    ("what's on next week", NEXT_WEEK),
+    ("How many events do I have this month?", agenda(day(1), day(1, 1, 2026))),
+    ("what do I have next month", agenda(day(1, 1, 2026), day(1, 2, 2026))),
+    ("my schedule for the weekend", WEEKEND),
+    ("any plans this weekend?", WEEKEND),
+    ("What do I have on December 24?", agenda(day(24), day(25))),
+    ("what's on the 31st of december", agenda(day(31), day(1, 1, 2026))),
+    ("anything in January?", agenda(day(1, 1, 2026), day(1, 2, 2026))),
+    ("list events on 2025-12-19", agenda(day(19), day(20))),
+    ("what did I have yesterday", agenda(day(2), day(3))),
+    # agenda, Ukrainian
+    ("Що в мене завтра?", TOMORROW),
+    ("що у мене сьогодні", agenda(day(3), day(4))),
+    ("Що у мене в п'ятницю?", FRIDAY),
+    ("які плани на наступний тиждень", NEXT_WEEK),
+    ("покажи події на цей тиждень", THIS_WEEK),
+    ("розклад на 5 грудня", FRIDAY),
+    ("що в мене на вихідних", WEEKEND),
+    ("що в мене у січні", agenda(day(1, 1, 2026), day(1, 2, 2026))),
+    ("які справи на післязавтра", agenda(day(5), day(6))),
+    ("що заплановано на наступного понеділка", agenda(day(8), day(9))),
+    ("чи є щось на завтра", TOMORROW),
+    ("покажи мій розклад на цей місяць", agenda(day(1), day(1, 1, 2026))),
+    # by id
+    ("Delete event 42", ("delete", (42,))),
+    ("please remove event #7", ("delete", (7,))),
+    ("cancel event id 13", ("delete", (13,))),
+    ("видали подію 42", ("delete", (42,))),
+    ("скасуй подію #5", ("delete", (5,))),
+    ("show event 7", ("show", (7,))),
+    ("event #12", ("show", (12,))),
+    ("покажи подію 3", ("show", (3,))),
+    # next event
+    ("what's my next event", ("next", ())),
+    ("show the next event", ("next", ())),
+    ("яка моя наступна подія", ("next", ())),
+    # the model's job
+    ("what do I have tomorrow with Anna", None),
+    ("what do I have tomorrow at 18:00", None),
+    ("schedule a call tomorrow", None),
+    ("Plan a picnic tomorrow at 18:00", None),
+    ("add yoga on Monday evening", None),
+    ("delete tomorrow's meetings", None),
+    ("remove the dentist on friday", None),
+    ("move event 42 to friday", None),
+    ("when am I free tomorrow?", None),
+    ("suggest the best time for a workout this week", None),
+    ("Replace football with basketball on Tuesday", None),
+    ("remind me about the meeting tomorrow", None),
+    ("додай тренування на завтра о 18:00", None),
+    ("перенеси зустріч на п'ятницю", None),
+    ("коли я вільний у п'ятницю", None),
+    ("видали всі зустрічі завтра", None),
+    ("what's the weather tomorrow", None),
+    ("do I have a meeting with the team on friday", None),
+    ("hello", None),
+]
+
+
+def main(rounds: int, llm_ms: float):
+    parser = IntentParser()
+    wrong = []
+    hits = covered = covered_hits = correct = false_positives = 0
+    for question, expected in CORPUS:
+        intent = parser.match(question, TODAY)
+        if intent is not None and intent.confidence < parser.min_confidence:
+            intent = None
+        got = (intent.name, intent.params) if intent else None
+        if expected is not None:
+            covered += 1
+            covered_hits += got is not None
+        if got is not None:
+            hits += 1
+            if got == expected:
+                correct += 1
+            elif expected is None:
+                false_positives += 1
+        if got != expected:
+            wrong.append((question, expected, got))
+
+    latencies = []
+    for _ in range(rounds):
+        for question, _ in CORPUS:
+            with Timer() as timer:
+                parser.parse(question, TODAY)
+            latencies.append(timer.elapsed)
+
+    hit_rate = hits / len(CORPUS)
+    print(f"{len(CORPUS)} questions, {covered} the fast path should answer")
+    print(f"hit rate {hit_rate:.0%} of all, {covered_hits / covered:.0%} of the covered ones")
+    print(f"precision {correct / hits if hits else 0:.0%} ({correct}/{hits}), false positives {false_positives}")
+    print(
+        f"parse p50 {percentile(latencies, 50) * 1e6:.1f} us  "
+        f"p99 {percentile(latencies, 99) * 1e6:.1f} us"
+    )
+    mean_parse = sum(latencies) / len(latencies)
+    # misses still pay for the parse before the model call
+    with_fast_path = hit_rate * mean_parse + (1 - hit_rate) * (mean_parse + llm_ms / 1000)
+    print(
+        f"actions stage, model at {llm_ms:.0f} ms: mean {llm_ms:.0f} ms -> "
+        f"{with_fast_path * 1000:.0f} ms on this mix"
+    )
+    for question, expected, got in wrong:
+        print(f"  mismatch: {question!r} expected {expected} got {got}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--llm-ms", type=float, default=1200.0, help="time of one model call")
+    args = parser.parse_args()
+    main(args.rounds, args.llm_ms)
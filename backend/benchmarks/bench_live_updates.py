@@ -0,0 +1,210 @@
+"""Live updates over /ws/events with thousands of sockets.
+
+Serves the gateway under uvicorn in a forked process, against a stub
+Django whose writes touch the months 2025-01..2026-12, and opens:
+
+* ``--idle`` sockets watching months of 2024 that no write touches,
+* ``--active`` sockets watching the 24 written months,
+* ``--slow`` sockets watching them too that never read, with a small
+  receive buffer: once the gateway's send to one of them blocks, its
+  changes are coalesced and after ``--send-timeout`` seconds it is closed.
+
+Then writes go through ``PATCH /event/update/1``:
+
+* ``paced``: ``--writes`` at ``--rate`` per second, the delay from a write
+  until every active socket has a message, per socket and write,
+* ``burst``: once the active sockets are closed, writes back to back for
+  ``--burst`` seconds with the idle and slow ones connected; reports the
+  write rate and the gateway's /live/stats.
+
+Gateway memory is read from /proc before and after the sockets connect.
+"""
+
+import argparse
+import asyncio
+import bisect
+import multiprocessing
+import os
+import socket
+import time
+
+import httpx
+import uvicorn
+from websockets.asyncio.client import connect
+
+from common import StubDjango, free_port, percentile, use_service
+
+WRITTEN = [f"{year}-{month:02d}" for year in (2025, 2026) for month in range(1, 13)]
+IDLE = [f"2024-{month:02d}" for month in range(1, 13)]
+TOUCHED = [["2025-01-01T00:00:00Z", "2026-12-31T00:00:00Z"]]
+
+
+def serve_gateway(port: int, sndbuf: int):
+    use_service("fastapi")
+    import main as gateway
+
+    # accepted sockets inherit the send buffer of the listening one, a
+    # small one makes the gateway feel a client that stopped reading soon
+    # an explicit proto, asyncio only sets TCP_NODELAY on IPPROTO_TCP sockets
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if sndbuf:
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, sndbuf)
+    listener.bind(("127.0.0.1", port))
+    config = uvicorn.Config(
+        gateway.app, log_level="warning", backlog=4096, ws_per_message_deflate=False
+    )
+    # not fd=, which uvicorn takes for a unix socket
+    uvicorn.Server(config).run(sockets=[listener])
+
+
+def start(port: int, sndbuf: int):
+    process = multiprocessing.get_context("fork").Process(
+        target=serve_gateway, args=(port, sndbuf), daemon=True
+    )
+    process.start()
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+
+
+def cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as stat:
+        fields = stat.read().rsplit(")", 1)[1].split()
+    # utime and stime, in clock ticks
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def open_sockets(url: str, count: int, months, slow: bool = False):
+    sockets = []
+
+    async def one(i):
+        query = f"{url}?months={','.join(months)}"
+        if not slow:
+            sockets.append(await connect(query, ping_interval=None, max_queue=None))
+            return
+        sock = socket.socket()
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        host, port = url.split("/")[2].split(":")
+        sock.connect((host, int(port)))
+        # stops reading from the socket after one queued message
+        sockets.append(await connect(query, sock=sock, ping_interval=None, max_queue=1))
+
+    # in batches, the listen backlog is finite
+    for start in range(0, count, 200):
+        await asyncio.gather(*(one(i) for i in range(start, min(start + 200, count))))
+    return sockets
+
+
+async def record(ws, times: list):
+    try:
+        async for _ in ws:
+            times.append(time.perf_counter())
+    except Exception:
+        pass
+
+
+async def run(port: int, pid: int, args):
+    base = f"http://127.0.0.1:{port}"
+    url = f"ws://127.0.0.1:{port}/ws/events"
+    before = rss_mb(pid)
+
+    start = time.perf_counter()
+    idle = await open_sockets(url, args.idle, IDLE)
+    active = await open_sockets(url, args.active, WRITTEN)
+    slow = await open_sockets(url, args.slow, WRITTEN, slow=True)
+    connected = time.perf_counter() - start
+    total = len(idle) + len(active) + len(slow)
+    await asyncio.sleep(1)
+    after = rss_mb(pid)
+    print(
+        f"{total} sockets ({len(idle)} idle, {len(active)} active, {len(slow)} slow) "
+        f"connected in {connected:.1f} s; gateway RSS {before:.0f} -> {after:.0f} MB, "
+        f"{(after - before) * 1024 / max(total, 1):.1f} KB per socket"
+    )
+
+    received = [[] for _ in active]
+    readers = [asyncio.create_task(record(ws, times)) for ws, times in zip(active, received)]
+
+    async with httpx.AsyncClient(base_url=base, timeout=30) as client:
+        writes = []
+        cpu = cpu_seconds(pid)
+        for _ in range(args.writes):
+            writes.append(time.perf_counter())
+            (await client.patch("/event/update/1", json={"name": "x"})).raise_for_status()
+            await asyncio.sleep(1 / args.rate)
+        await asyncio.sleep(1)
+        cpu = cpu_seconds(pid) - cpu
+
+        delays = []
+        for times in received:
+            for issued in writes:
+                index = bisect.bisect_left(times, issued)
+                if index < len(times):
+                    delays.append(times[index] - issued)
+        missing = args.writes * len(active) - len(delays)
+        delays = delays or [0.0]
+        print(
+            f"paced: {args.writes} writes at {args.rate}/s to {len(active)} sockets, "
+            f"write -> message p50 {percentile(delays, 50) * 1000:.1f} ms  "
+            f"p99 {percentile(delays, 99) * 1000:.1f} ms  max {max(delays) * 1000:.1f} ms, "
+            f"{missing} never delivered; gateway CPU {cpu:.2f} s, "
+            f"{cpu / max(args.writes * len(active), 1) * 1e6:.0f} us per message"
+        )
+
+        for task in readers:
+            task.cancel()
+        await asyncio.gather(*(ws.close() for ws in active), return_exceptions=True)
+
+        count = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < args.burst:
+            (await client.patch("/event/update/1", json={"name": "x"})).raise_for_status()
+            count += 1
+        elapsed = time.perf_counter() - start
+        await asyncio.sleep(args.send_timeout + 2)
+        stats = (await client.get("/live/stats")).json()
+        print(f"burst: {count / elapsed:.0f} writes/s for {elapsed:.0f} s; /live/stats {stats}")
+
+    await asyncio.gather(*(ws.close() for ws in idle), return_exceptions=True)
+    # the slow ones are closed by the gateway or dropped here
+    for ws in slow:
+        ws.transport.abort()
+
+
+def main(args):
+    routes = {"/api/update_event/": {"status": "success", "touched": TOUCHED}}
+    with StubDjango(routes) as stub:
+        os.environ["DJANGO_BACKEND_URL"] = f"{stub.url}/api"
+        os.environ["GATEWAY_LIVE_SEND_TIMEOUT"] = str(args.send_timeout)
+        os.environ["GATEWAY_LIVE_MAX_SOCKETS"] = str(args.idle + args.active + args.slow)
+        port = free_port()
+        process = start(port, args.sndbuf)
+        try:
+            asyncio.run(run(port, process.pid, args))
+        finally:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--idle", type=int, default=4000)
+    parser.add_argument("--active", type=int, default=1000)
+    parser.add_argument("--slow", type=int, default=20)
+    parser.add_argument("--writes", type=int, default=50)
+    parser.add_argument("--rate", type=float, default=10, help="paced writes per second")
+    parser.add_argument("--burst", type=float, default=10, help="seconds of back to back writes")
+    parser.add_argument("--send-timeout", type=float, default=2)
+    parser.add_argument("--sndbuf", type=int, default=8192, help="gateway socket send buffer")
+    main(parser.parse_args())
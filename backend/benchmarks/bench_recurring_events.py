@@ -0,0 +1,112 @@
+"""Month views with hundreds of recurring series.
+
+Stores S series (daily, weekly with one to three weekdays, monthly; some
+endless, some with COUNT or UNTIL) and times ``/api/get_events/`` for
+twelve consecutive months:
+
+* ``materialized``: the old way, every occurrence of the next two years
+  stored as its own ``event`` row,
+* ``lazy, cold``: series stored once, expanded for the requested month
+  with an empty expansion cache,
+* ``lazy, warm``: the same months again, served from the cache.
+"""
+
+import argparse
+import random
+from datetime import datetime, timedelta, timezone
+
+from common import Timer, setup_django
+
+START = datetime(2025, 9, 1, 8, tzinfo=timezone.utc)
+RULES = (
+    "FREQ=DAILY",
+    "FREQ=DAILY;INTERVAL=2;COUNT=200",
+    "FREQ=WEEKLY;BYDAY=MO",
+    "FREQ=WEEKLY;BYDAY=TU,TH",
+    "FREQ=WEEKLY;BYDAY=MO,WE,FR;UNTIL=20261231",
+    "FREQ=WEEKLY;INTERVAL=2;BYDAY=FR",
+    "FREQ=MONTHLY",
+    "FREQ=MONTHLY;COUNT=24",
+)
+
+
+def create_series(count: int):
+    from api.recurrence import occurrences, parse_rrule, series_end
+    from db.models import Event, EventSeries
+
+    random.seed(5)
+    series = []
+    for i in range(count):
+        start = START + timedelta(days=random.randrange(60), hours=random.randrange(10))
+        s = EventSeries(
+            start_date=start,
+            end_date=start + timedelta(minutes=random.choice((45, 60, 90))),
+            name=f"Series {i}",
+            description="Lorem ipsum dolor sit amet " * 4,
+            category="Study",
+            exdates=[],
+            **parse_rrule(RULES[i % len(RULES)]),
+        )
+        s.series_end = series_end(s)
+        series.append(s)
+    EventSeries.objects.bulk_create(series, batch_size=1000)
+
+    # the same occurrences stored one row each, two years ahead
+    horizon = START + timedelta(days=730)
+    Event.objects.bulk_create(
+        (
+            Event(
+                start_date=start, end_date=end, name=s.name,
+                description=s.description, category=s.category,
+            )
+            for s in series
+            for start, end in occurrences(s, START, horizon)
+        ),
+        batch_size=5000,
+    )
+    return Event.objects.count()
+
+
+def months():
+    for i in range(12):
+        month = START.month - 1 + i
+        yield START.year + month // 12, month % 12 + 1
+
+
+def run(client, label: str):
+    with Timer() as timer:
+        sizes = [
+            len(client.get("/api/get_events/", {"year": year, "month": month}).content)
+            for year, month in months()
+        ]
+    print(f"{label:<22} {timer.elapsed / 12 * 1000:8.2f} ms/month  {sum(sizes) / 12 / 1024:8.1f} KiB/month")
+
+
+def main(count: int):
+    setup_django()
+    from api.recurrence import expansions
+    from db.models import Event, EventSeries
+    from django.test import Client
+
+    rows = create_series(count)
+    print(f"{count} series, {rows} materialized rows")
+    client = Client()
+
+    # materialized rows only
+    series = list(EventSeries.objects.all())
+    EventSeries.objects.all().delete()
+    run(client, "materialized")
+
+    Event.objects.all().delete()
+    EventSeries.objects.bulk_create(series, batch_size=1000)
+    expansions.entries.clear()
+    run(client, "lazy, cold")
+    run(client, "lazy, warm")
+    print(f"expansion cache: {expansions.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--series", type=int, default=400)
+    args = parser.parse_args()
+    main(args.series)
@@ -0,0 +1,147 @@
+"""The reminder scheduler with a million reminders: memory, restarts, jitter.
+
+Fills a SQLite file with ``--events`` events starting over the next day,
+``--firing`` of them within the first ``--seconds`` seconds (after the
+lead), and measures:
+
+* ``load``: ``ReminderScheduler.start`` loading the horizon, with the
+  memory the scheduler keeps (tracemalloc, so the load time is not
+  reported here) and the process RSS,
+* ``restart``: a second scheduler resuming from the saved watermark,
+* ``changes``: ``apply_changes`` after ``--edits`` events were moved,
+  with every reminder loaded,
+* ``firing``: the run_reminders loop firing the first ``--seconds`` of
+  reminders, the lateness of each (fire time - due time) and the CPU.
+"""
+
+import argparse
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from common import percentile, setup_django
+
+LEAD = 900
+
+
+def fill(count: int, firing: int, seconds: float, start: float):
+    from db.models import Event
+
+    def starts():
+        for i in range(count):
+            if i < firing:
+                offset = LEAD + 1 + seconds * i / firing
+            else:
+                offset = LEAD + 1 + seconds + random.random() * (86400 - 2 * LEAD - seconds)
+            yield datetime.fromtimestamp(start + offset, timezone.utc)
+
+    Event.objects.bulk_create(
+        (
+            Event(
+                start_date=begin,
+                end_date=begin + timedelta(hours=1),
+                name="Meeting",
+                description="",
+                category="Work",
+            )
+            for begin in starts()
+        ),
+        batch_size=5000,
+    )
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def main(args):
+    os.environ["BENCH_SQLITE"] = os.path.join(tempfile.mkdtemp(), "bench.sqlite3")
+    setup_django()
+    from api.reminders import ReminderScheduler
+    from db.models import Event
+
+    now = time.time()
+    begin = time.perf_counter()
+    fill(args.events, args.firing, args.seconds, now)
+    print(f"{args.events} events written in {time.perf_counter() - begin:.1f} s")
+
+    lateness = []
+
+    # writing and loading take longer than the lead, the firing loop runs
+    # on a clock set back to just before the first reminder is due
+    shift = 0.0
+
+    def clock():
+        return time.time() + shift
+
+    def fire(fired):
+        moment = clock()
+        lateness.extend(moment - due for _, due in fired)
+
+    def scheduler():
+        return ReminderScheduler(fire, lead=LEAD, horizon=86400, max_delay=3600)
+
+    gc.collect()
+    before = rss_mb()
+    tracemalloc.start()
+    first = scheduler()
+    first.start(now)
+    kept = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    gc.collect()
+    scheduled = len(first.reminders)
+    print(
+        f"load: {scheduled} reminders, {kept / 2**20:.0f} MB kept, "
+        f"{kept / max(scheduled, 1):.0f} bytes per reminder; RSS {before:.0f} -> {rss_mb():.0f} MB"
+    )
+    first.checkpoint()
+    del first
+    gc.collect()
+
+    begin = time.perf_counter()
+    service = scheduler()
+    service.start(time.time())
+    print(f"restart: {len(service.reminders)} reminders loaded in {time.perf_counter() - begin:.2f} s")
+
+    ids = random.sample(list(Event.objects.values_list("pk", flat=True)[args.firing:]), args.edits)
+    Event.objects.filter(pk__in=ids).update(start_date=datetime.fromtimestamp(now + 7200, timezone.utc))
+    begin = time.perf_counter()
+    service.apply_changes()
+    print(f"changes: {args.edits} moved events applied in {(time.perf_counter() - begin) * 1000:.1f} ms")
+
+    # the loop of run_reminders, without a database to wait on
+    shift = now + 0.5 - time.time()
+    cpu = time.process_time()
+    deadline = now + args.seconds + 2
+    while clock() < deadline:
+        service.fire_due(clock())
+        next_due = service.reminders.next_due()
+        timeout = min(deadline if next_due is None else next_due, deadline) - clock()
+        if timeout > 0:
+            time.sleep(timeout)
+    cpu = time.process_time() - cpu
+    lateness = lateness or [0.0]
+    print(
+        f"firing: {len(lateness)} reminders over {args.seconds:.0f} s with "
+        f"{len(service.reminders)} still scheduled, lateness p50 "
+        f"{percentile(lateness, 50) * 1000:.2f} ms  p99 {percentile(lateness, 99) * 1000:.2f} ms  "
+        f"max {max(lateness) * 1000:.2f} ms; CPU {cpu:.2f} s, "
+        f"{cpu / len(lateness) * 1e6:.1f} us per reminder"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--firing", type=int, default=20000)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--edits", type=int, default=100)
+    main(parser.parse_args())
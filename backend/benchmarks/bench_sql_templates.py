@@ -0,0 +1,102 @@
+"""Template hit rate and prepared vs. raw execution of LLM-style SQL.
+
+Generates a workload of typical model output ("what's on Friday", "delete
+yoga", "plan a run tomorrow", ...) with varying literals, reports how many
+distinct templates it collapses to and the resulting cache hit rate. With
+BENCH_POSTGRES=True the statements are also executed raw and through the
+per-connection prepared statement cache, and both are timed.
+"""
+
+import argparse
+import random
+import time
+from collections import OrderedDict
+
+from common import setup_django
+
+SHAPES = [
+    "SELECT * FROM event WHERE start_date::date = '{day}' ORDER BY start_date;",
+    "SELECT * FROM event WHERE EXTRACT(DOW FROM start_date) = {dow} "
+    "AND start_date >= NOW() - INTERVAL '{n} days';",
+    "SELECT * FROM event WHERE category = '{category}' AND start_date >= '{day}' LIMIT {n};",
+    "UPDATE event SET name = '{name}' WHERE name = '{name}' AND start_date::date = '{day}';",
+    "DELETE FROM event WHERE name = '{name}' AND start_date::date = '{day}';",
+    "INSERT INTO event (name, start_date, end_date, description, category) "
+    "VALUES ('{name}', '{day} 18:00:00+00', '{day} 19:00:00+00', '{name}', '{category}');",
+]
+NAMES = ["Yoga", "Gym", "Picnic", "Meeting", "Lecture", "Run"]
+CATEGORIES = ["Sport", "Work", "Hobby", "Free time", "Other"]
+
+
+def workload(size: int, seed: int = 7):
+    rng = random.Random(seed)
+    for _ in range(size):
+        yield rng.choice(SHAPES).format(
+            day=f"2025-12-{rng.randint(1, 28):02d}",
+            dow=rng.randint(0, 6),
+            n=rng.randint(1, 30),
+            name=rng.choice(NAMES),
+            category=rng.choice(CATEGORIES),
+        )
+
+
+def simulate(queries, cache_size: int):
+    from api.statements import normalize
+
+    cache, hits, templates = OrderedDict(), 0, set()
+    for sql in queries:
+        template, _ = normalize(sql)
+        templates.add(template)
+        if template in cache:
+            hits += 1
+            cache.move_to_end(template)
+        else:
+            cache[template] = True
+            if len(cache) > cache_size:
+                cache.popitem(last=False)
+    return hits / len(queries), len(set(queries)), len(templates)
+
+
+def timed(run, queries):
+    from django.db import transaction
+
+    start = time.perf_counter()
+    with transaction.atomic():
+        for sql in queries:
+            run(sql)
+        transaction.set_rollback(True)
+    return time.perf_counter() - start
+
+
+def main(size: int, cache_size: int):
+    setup_django()
+    from api import statements
+    from django.db import connection
+
+    queries = list(workload(size))
+    start = time.perf_counter()
+    for sql in queries:
+        statements.normalize(sql)
+    per_query = (time.perf_counter() - start) / size
+
+    hit_rate, distinct, templates = simulate(queries, cache_size)
+    print(f"{size} statements, {distinct} distinct strings, {templates} templates")
+    print(f"template cache hit rate {hit_rate:.1%}, normalize {per_query * 1e6:.1f} us/stmt")
+
+    if connection.vendor != "postgresql":
+        print("set BENCH_POSTGRES=True to time prepared execution")
+        return
+
+    with connection.cursor() as cursor:
+        raw = timed(cursor.execute, queries)
+        prepared = timed(lambda sql: statements.execute(cursor, sql), queries)
+    print(f"raw {raw * 1000:.1f} ms  prepared {prepared * 1000:.1f} ms")
+    print(statements.template_stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--statements", type=int, default=5000)
+    parser.add_argument("--cache-size", type=int, default=128)
+    args = parser.parse_args()
+    main(args.statements, args.cache_size)
@@ -0,0 +1,92 @@
+"""Forecast cache, single-flight and bisect lookup against a fake provider.
+
+Serves a fake OpenWeatherMap forecast from a local HTTP server with an
+artificial delay, then fires concurrent lookups for the same city: the
+cache must hit the server once per refresh slot. The bisect lookup is
+checked against the old ``min()`` scan and both are timed.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from common import StubDjango, Timer, report, use_service
+
+use_service("models")
+from weather import ForecastCache, make_fetcher  # noqa: E402
+
+START = 1_764_547_200  # 2025-12-01T00:00:00Z
+
+
+def forecast_payload(entries: int):
+    return {
+        "list": [
+            {
+                "dt": START + i * 3 * 3600,
+                "main": {"temp": round(random.uniform(-5, 10), 1)},
+                "weather": [{"description": "scattered clouds"}],
+            }
+            for i in range(entries)
+        ]
+    }
+
+
+async def main(callers: int, delay: float, entries: int):
+    payload = forecast_payload(entries)
+    with StubDjango({"/data/2.5/forecast": payload}, delay=delay) as stub:
+        fetch = make_fetcher("fake-key", url=f"{stub.url}/data/2.5/forecast")
+
+        # uncached: every caller fetches the forecast itself
+        async def uncached(i):
+            start = time.perf_counter()
+            data = await fetch("Košice")
+            min(data, key=lambda x: abs(x["dt"] - (START + i * 600)))
+            return time.perf_counter() - start
+
+        with Timer() as timer:
+            latencies = await asyncio.gather(*(uncached(i) for i in range(callers)))
+        report("fetch per call", latencies, timer.elapsed)
+        requests_before = stub.hits
+
+        cache = ForecastCache(fetch)
+
+        async def cached(i):
+            start = time.perf_counter()
+            await cache.closest("Košice", START + i * 600)
+            return time.perf_counter() - start
+
+        with Timer() as timer:
+            latencies = await asyncio.gather(*(cached(i) for i in range(callers)))
+        report("single-flight cache", latencies, timer.elapsed)
+        print(
+            f"provider requests: {requests_before} uncached, "
+            f"{stub.hits - requests_before} cached (hits {cache.hits})"
+        )
+        assert stub.hits - requests_before == 1, "concurrent callers did not share one fetch"
+
+        forecast = await cache.get("Košice")
+    targets = [START + random.randint(-10_000, entries * 3 * 3600) for _ in range(10_000)]
+    for target in targets[:1000]:
+        expected = min(forecast.entries, key=lambda x: abs(x["dt"] - target))
+        assert abs(forecast.closest(target)["dt"] - target) == abs(expected["dt"] - target)
+
+    with Timer() as scan:
+        for target in targets:
+            min(forecast.entries, key=lambda x: abs(x["dt"] - target))
+    with Timer() as bisected:
+        for target in targets:
+            forecast.closest(target)
+    print(
+        f"closest entry over {entries} slots: min() {scan.elapsed / len(targets) * 1e6:.1f} us  "
+        f"bisect {bisected.elapsed / len(targets) * 1e6:.2f} us"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--callers", type=int, default=32)
+    parser.add_argument("--delay", type=float, default=0.2)
+    parser.add_argument("--entries", type=int, default=40)
+    args = parser.parse_args()
+    asyncio.run(main(args.callers, args.delay, args.entries))
@@ -0,0 +1,207 @@
+"""Shared helpers for the benchmark scripts in this directory.
+
+The scripts are meant to be run directly, e.g.::
+
+    python benchmarks/bench_gateway_client.py
+
+from the ``backend`` folder. Each one puts the service it measures on
+``sys.path`` through :func:`use_service`, so no install step is needed.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlencode
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the services read it at import; sampled request logs would bury the
+# results (see django_settings for the Django logging)
+os.environ.setdefault("LOG_SAMPLE_RATE", "0")
+
+
+def use_service(name: str) -> str:
+    """Make ``backend/<name>`` importable and return its path."""
+    path = os.path.join(BACKEND_DIR, name)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    return path
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(label: str, latencies, elapsed: float) -> dict:
+    """Print one result line; latencies and elapsed are in seconds."""
+    row = {
+        "label": label,
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+    }
+    print(
+        f"{label:<32} {row['requests']:>7} req  {row['rps']:>9.1f} req/s  "
+        f"p50 {row['p50_ms']:>8.2f} ms  p99 {row['p99_ms']:>8.2f} ms"
+    )
+    return row
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class KeepAliveConnection:
+    """Bare HTTP/1.1 keep-alive client for servers under load.
+
+    httpx's connection pool becomes the bottleneck at 100+ concurrent
+    clients. Responses need a Content-Length.
+    """
+
+    def __init__(self, port: int):
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, path: str, params: dict, body: bytes = None):
+        """GET, or POST of a JSON `body`; returns (status, body)."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+        target = f"{path}?{urlencode(params)}"
+        if body is None:
+            head = f"GET {target} HTTP/1.1\r\nHost: bench\r\n\r\n"
+        else:
+            head = (
+                f"POST {target} HTTP/1.1\r\nHost: bench\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+            )
+        self.writer.write(head.encode() + (body or b""))
+        head = (await self.reader.readuntil(b"\r\n\r\n")).decode("latin-1").lower()
+        status = int(head.split(" ", 2)[1])
+        length = int(head.split("content-length:", 1)[1].split("\r\n", 1)[0])
+        body = await self.reader.readexactly(length)
+        if "connection: close" in head:
+            self.writer.close()
+            self.reader = self.writer = None
+        return status, body
+
+
+async def keepalive_load(port: int, work, concurrency: int):
+    """Send the requests of `work` over `concurrency` connections.
+
+    Items are (path, params) for a GET or (path, params, body) for a POST.
+
+    Returns (latencies, elapsed) in seconds.
+    """
+    latencies = []
+    queue = list(work)
+
+    async def worker():
+        connection = KeepAliveConnection(port)
+        while queue:
+            item = queue.pop()
+            start = time.perf_counter()
+            status, body = await connection.request(*item)
+            latencies.append(time.perf_counter() - start)
+            assert status == 200, body[:200]
+
+    with Timer() as timer:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, timer.elapsed
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # the default backlog of 5 resets connections under benchmark load
+    request_queue_size = 1024
+
+
+class StubDjango:
+    """Threaded local HTTP server that answers every request with JSON.
+
+    ``routes`` maps a path (without query string) to either a payload or a
+    callable ``(method, path, query, body) -> payload``. Unknown paths get
+    ``{"status": "success"}``. ``delay`` adds a fixed server-side latency.
+    """
+
+    def __init__(self, routes=None, delay: float = 0.0):
+        self.routes = routes or {}
+        self.delay = delay
+        self.hits = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # headers and body go out in separate writes
+            disable_nagle_algorithm = True
+
+            def _reply(self):
+                stub.hits += 1
+                path, _, query = self.path.partition("?")
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                route = stub.routes.get(path, {"status": "success"})
+                payload = (
+                    route(self.command, path, query, body)
+                    if callable(route)
+                    else route
+                )
+                if stub.delay:
+                    time.sleep(stub.delay)
+                data = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PATCH = do_DELETE = _reply
+
+            def log_message(self, *args):
+                pass
+
+        self.server = StubServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def setup_django():
+    """Configure the Django project with the benchmark settings."""
+    use_service(os.path.join("django", "smart_calendar"))
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "django_settings")
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command("migrate", verbosity=0, run_syncdb=True)
@@ -0,0 +1,36 @@
+"""Django settings for the benchmarks.
+
+Uses the project settings but swaps the database for an in-memory SQLite
+one unless ``BENCH_POSTGRES=True`` is set, in which case the project's
+Postgres connection is used unchanged. ``BENCH_SQLITE`` names a SQLite
+file instead, for benchmarks that serve requests from several threads
+(every thread has its own in-memory database).
+
+The tests run on these settings too. Both keep the log lines out of their
+output: no sampled INFO lines and only the errors of the "api" logger,
+unless ``LOG_SAMPLE_RATE`` / ``LOG_LEVEL`` are set.
+"""
+
+import os
+
+from smart_calendar.settings import *  # noqa: F401,F403
+
+SECRET_KEY = "benchmark"
+DEBUG = False
+
+if os.environ.get("BENCH_POSTGRES") != "True":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get("BENCH_SQLITE", ":memory:"),
+        }
+    }
+
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", "0"))
+LOGGING = {
+    **LOGGING,
+    "loggers": {
+        **LOGGING["loggers"],
+        "api": {**LOGGING["loggers"]["api"], "level": os.environ.get("LOG_LEVEL", "ERROR")},
+    },
+}
@@ -0,0 +1,250 @@
+"""Batch create/update/delete of events.
+
+Each batch is written with one ``bulk_create``, one ``bulk_update`` or one
+``DELETE`` inside a single transaction, and every item gets its own entry
+in ``results``, in request order. The modes are the ones of
+``exec_sql_request``:
+
+* ``atomic`` (default): one invalid item fails the batch, nothing is
+  written, the valid items are reported as ``skipped``.
+* ``best_effort``: invalid items are reported as ``error`` and the rest
+  is written.
+"""
+
+from db.models import Event
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .executor import ATOMIC
+from .timeline import find_conflicts
+
+EVENT_FIELDS = ("name", "start_date", "end_date", "description", "category")
+REQUIRED_FIELDS = ("name", "start_date", "end_date", "category")
+BATCH_SIZE = 1000
+
+
+class BatchFailed(Exception):
+    """Raised inside the transaction to roll back an atomic batch."""
+
+
+def parse_date(value):
+    moment = parse_datetime(value) if isinstance(value, str) else None
+    if moment is None:
+        raise ValueError(f"Invalid date {value!r}")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def clean(item, partial=False):
+    """Validated event fields of a batch item, raises ValueError."""
+    if not isinstance(item, dict):
+        raise ValueError("Every item must be an object")
+    fields = {name: item[name] for name in EVENT_FIELDS if item.get(name) is not None}
+    if not partial:
+        missing = [name for name in REQUIRED_FIELDS if not fields.get(name)]
+        if missing:
+            raise ValueError(f"Not enough parameters. {missing}")
+        fields.setdefault("description", "")
+    for name in ("start_date", "end_date"):
+        if name in fields:
+            fields[name] = parse_date(fields[name])
+    if not partial and fields["end_date"] <= fields["start_date"]:
+        # an update is checked against the stored dates once they are read
+        raise ValueError("end_date must be after start_date")
+    return fields
+
+
+class Batch:
+    def __init__(self, size, mode=ATOMIC):
+        self.mode = mode
+        self.results = [None] * size
+        self.touched = []
+
+    def fail(self, index, error, **extra):
+        self.results[index] = {"index": index, **extra, "status": "error", "error": str(error)}
+
+    def succeed(self, index, **extra):
+        self.results[index] = {"index": index, **extra, "status": "success"}
+
+    @property
+    def failed(self):
+        return any(result is not None and result["status"] == "error" for result in self.results)
+
+    def check_conflicts(self, candidates):
+        """Fail the (index, candidate) pairs that overlap stored events."""
+        conflicts = find_conflicts(Event.objects.all(), [c for _, c in candidates])
+        conflicting = {}
+        for position, (id, name, start_date, end_date) in conflicts:
+            conflicting.setdefault(position, []).append(id)
+        for position, ids in conflicting.items():
+            index, candidate = candidates[position]
+            self.fail(
+                index,
+                f"The event overlaps existing events {ids}",
+                id=candidate.get("id"),
+                conflicts=ids,
+            )
+
+    def finish(self):
+        if self.failed and self.mode == ATOMIC:
+            self.touched = []
+            for index, result in enumerate(self.results):
+                if result is None:
+                    self.results[index] = {"index": index, "status": "skipped"}
+                elif result["status"] == "success":
+                    result["status"] = "rolled_back"
+        return {
+            "status": "error" if self.failed else "success",
+            "mode": self.mode,
+            "results": self.results,
+            "touched": self.touched,
+        }
+
+    def write(self, write):
+        """Run `write()` in a transaction unless an atomic batch already failed."""
+        if self.failed and self.mode == ATOMIC:
+            return
+        try:
+            with transaction.atomic():
+                write()
+                if self.failed and self.mode == ATOMIC:
+                    raise BatchFailed
+        except BatchFailed:
+            pass
+        except DatabaseError as e:
+            # the whole statement failed, so did every item it carried
+            for index, result in enumerate(self.results):
+                if result is None:
+                    self.fail(index, e)
+                elif result["status"] == "success":
+                    self.fail(index, e, id=result["id"])
+            self.touched = []
+
+
+def bulk_create_events(items, mode=ATOMIC, check_conflicts=False):
+    batch = Batch(len(items), mode)
+    valid = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, clean(item)))
+        except ValueError as e:
+            batch.fail(index, e)
+
+    if check_conflicts and valid:
+        batch.check_conflicts(valid)
+        valid = [(index, fields) for index, fields in valid if batch.results[index] is None]
+
+    def write():
+        events = Event.objects.bulk_create(
+            [Event(**fields) for _, fields in valid], batch_size=BATCH_SIZE
+        )
+        for (index, fields), event in zip(valid, events):
+            batch.succeed(index, id=event.id)
+            batch.touched.append([fields["start_date"], fields["end_date"]])
+
+    batch.write(write)
+    return batch.finish()
+
+
+def bulk_update_events(items, mode=ATOMIC, check_conflicts=False):
+    batch = Batch(len(items), mode)
+    changes = []
+    for index, item in enumerate(items):
+        try:
+            id = int(item.get("id")) if isinstance(item, dict) else None
+        except (TypeError, ValueError):
+            id = None
+        if id is None:
+            batch.fail(index, "There is no id")
+            continue
+        try:
+            changes.append((index, id, clean(item, partial=True)))
+        except ValueError as e:
+            batch.fail(index, e, id=id)
+
+    def write():
+        events = Event.objects.select_for_update().in_bulk(
+            [id for _, id, _ in changes]
+        )
+        # the range of every event as the earlier items of the batch left it
+        ranges = {id: (event.start_date, event.end_date) for id, event in events.items()}
+        planned, candidates = [], []
+        for index, id, values in changes:
+            if id not in ranges:
+                batch.fail(index, f"There is no row with id {id}", id=id)
+                continue
+            start_date = values.get("start_date", ranges[id][0])
+            end_date = values.get("end_date", ranges[id][1])
+            if end_date <= start_date:
+                batch.fail(index, "end_date must be after start_date", id=id)
+                continue
+            ranges[id] = (start_date, end_date)
+            planned.append((index, id, values))
+            candidates.append((index, {"id": id, "start_date": start_date, "end_date": end_date}))
+            batch.succeed(index, id=id)
+
+        if check_conflicts and candidates:
+            batch.check_conflicts(candidates)
+        if batch.failed and batch.mode == ATOMIC:
+            return
+        # only the items that still succeed are written, and only their
+        # ranges are touched
+        updated, fields = {}, set()
+        for index, id, values in planned:
+            if batch.results[index]["status"] != "success":
+                continue
+            event = updated.get(id)
+            if event is None:
+                event = updated[id] = events[id]
+                batch.touched.append([event.start_date, event.end_date])
+            for name, value in values.items():
+                setattr(event, name, value)
+            fields.update(values)
+            batch.touched.append([event.start_date, event.end_date])
+        if fields:
+            Event.objects.bulk_update(list(updated.values()), sorted(fields), batch_size=BATCH_SIZE)
+
+    batch.write(write)
+    return batch.finish()
+
+
+def delete_returning(ids):
+    """(id, start_date, end_date) of the deleted rows, in one statement."""
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM event WHERE id = ANY(%s) RETURNING id, start_date, end_date",
+                [list(ids)],
+            )
+            return cursor.fetchall()
+    events = Event.objects.filter(id__in=ids)
+    rows = list(events.values_list("id", "start_date", "end_date"))
+    events.delete()
+    return rows
+
+
+def bulk_delete_events(ids, mode=ATOMIC):
+    batch = Batch(len(ids), mode)
+    wanted = {}
+    for index, id in enumerate(ids):
+        try:
+            wanted.setdefault(int(id), []).append(index)
+        except (TypeError, ValueError):
+            batch.fail(index, f"Invalid id {id!r}")
+
+    def write():
+        deleted = set()
+        for id, start_date, end_date in delete_returning(wanted):
+            deleted.add(id)
+            batch.touched.append([start_date, end_date])
+        for id, indexes in wanted.items():
+            for index in indexes:
+                if id in deleted:
+                    batch.succeed(index, id=id)
+                else:
+                    batch.fail(index, f"There is no row with id {id}", id=id)
+
+    batch.write(write)
+    return batch.finish()
@@ -0,0 +1,99 @@
+"""Row versions: ETags for conditional GETs and the delta sync feed.
+
+Every insert, update and delete of an event or a series takes the next
+version of ``event_clock`` (triggers of migration ``db.0005``, so the SQL
+of exec_sql_request is versioned too), deleted rows leave a tombstone.
+
+* ``version_etag`` tags a set of rows by its size and highest version: a
+  row that joins or changes takes a version above all others and a row
+  that leaves lowers the count, so the tag changes with the content.
+* ``achanges`` lists what changed after the version a client last saw.
+  Clients start with ``since=0``, which, like a ``since`` the server never
+  gave out or more than ``MAX_CHANGES`` changes, answers ``"reset": true``
+  with the current version: the client refetches what it shows and syncs
+  from that version on.
+"""
+
+from db.models import Event, EventClock, EventSeries, Tombstone
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+from .serializers import versioned_object, versioned_rows
+
+MAX_CHANGES = 1000
+
+
+def current_version() -> int:
+    version = EventClock.objects.filter(pk=1).values_list("version", flat=True).first()
+    return version or 0
+
+
+async def acurrent_version() -> int:
+    version = await EventClock.objects.filter(pk=1).values_list("version", flat=True).afirst()
+    return version or 0
+
+
+async def aversion_etag(*querysets) -> str:
+    """Strong ETag of the rows of the querysets."""
+    parts = []
+    for queryset in querysets:
+        summary = await queryset.aaggregate(rows=Count("pk"), version=Max("version"))
+        parts.append(f"{summary['rows']}.{summary['version'] or 0}")
+    return quote_etag("-".join(parts))
+
+
+def row_etag(pk, version) -> str:
+    return quote_etag(f"{pk}.{version}")
+
+
+def not_modified(request, etag):
+    """A 304 response if the request's If-None-Match has the etag, else None."""
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        response["ETag"] = etag
+    return response
+
+
+def tagged(response, etag):
+    response["ETag"] = etag
+    # cached copies are revalidated on every use, which costs a 304
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def reset(version: int) -> dict:
+    return {"status": "success", "version": version, "reset": True}
+
+
+async def achanges(since: int) -> dict:
+    """Events changed and deleted in (since, current version]."""
+    version = await acurrent_version()
+    if since <= 0 or since > version:
+        return reset(version)
+
+    window = {"version__gt": since, "version__lte": version}
+    rows = versioned_rows(Event.objects.filter(**window).order_by("version"))
+    changed = [versioned_object(row) async for row in rows[: MAX_CHANGES + 1]]
+    tombstones = Tombstone.objects.filter(**window)
+    deleted = [
+        row_id
+        async for row_id in tombstones.filter(source=Tombstone.EVENT)
+        .values_list("row_id", flat=True)[: MAX_CHANGES + 1]
+    ]
+    if len(changed) + len(deleted) > MAX_CHANGES:
+        return reset(version)
+
+    series_changed = (
+        await EventSeries.objects.filter(**window).aexists()
+        or await tombstones.filter(source=Tombstone.SERIES).aexists()
+    )
+    return {
+        "status": "success",
+        "version": version,
+        "reset": False,
+        "changed": changed,
+        "deleted": deleted,
+        # occurrences are not rows, the client refetches the months it shows
+        "series_changed": series_changed,
+    }
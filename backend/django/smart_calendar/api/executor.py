@@ -0,0 +1,257 @@
+"""Execution engine for the SQL actions produced by the model service.
+
+A request's whole action list runs in one transaction on one cursor:
+
+* ``atomic`` (default): all or nothing, the first failing action rolls
+  back every action before it and the rest are skipped.
+* ``best_effort``: every action runs in its own savepoint, so a failing
+  action is undone on its own and the others are still committed.
+
+Consecutive single-row INSERTs into the same columns are sent as one
+multi-row INSERT. Statements go through the prepared statement cache in
+``api.statements``. Every action gets its own entry in ``results``, keyed by
+the ``id`` the model emits (``action_1``, ...).
+"""
+
+import re
+
+import sqlparse
+from django.db import DatabaseError, connection, transaction
+from sqlparse.sql import Where
+
+from . import statements
+from .telemetry import timed_action
+
+ATOMIC = "atomic"
+BEST_EFFORT = "best_effort"
+MODES = (ATOMIC, BEST_EFFORT)
+
+READ_TYPES = ("select", "recommendation")
+WRITE_TYPES = ("create", "update", "delete")
+
+# string literals, blanked out before looking for statement separators
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+INSERT_RE = re.compile(
+    r"^\s*INSERT\s+INTO\s+event\s*\(([^)]*)\)\s*VALUES\s*(\(.*\))\s*;?\s*$",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+class ActionFailed(Exception):
+    """Raised inside the transaction to roll back an atomic request."""
+
+
+def is_single_statement(sql_request):
+    # cheaper than sqlparse, which is slow on long multi-row INSERTs
+    return ";" not in STRING_RE.sub("", sql_request.strip().rstrip(";"))
+
+
+def dictfetchall(cursor):
+    columns = [col[0] for col in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def execute_tracked(cursor, sql_request):
+    """Run a write statement and return the date ranges of the rows it touched.
+
+    Inserted and deleted rows are read back with RETURNING. RETURNING only
+    shows the new values of an update, so the old ones are selected first
+    with the statement's own WHERE clause. Returns None when the touched
+    rows cannot be determined; the statement is still executed.
+    """
+    body = sql_request.strip().rstrip(";")
+    if not is_single_statement(body) or "returning" in body.lower():
+        statements.execute(cursor, sql_request)
+        return None
+
+    touched = []
+    savepoint = transaction.savepoint()
+    try:
+        if body[:6].upper() == "UPDATE":
+            statement = sqlparse.parse(body)[0]
+            where = next(
+                (token for token in statement.tokens if isinstance(token, Where)),
+                None,
+            )
+            if where is None:
+                transaction.savepoint_commit(savepoint)
+                statements.execute(cursor, sql_request)
+                return None
+            condition = str(where).strip().rstrip(";")
+            statements.execute(
+                cursor, f"SELECT start_date, end_date FROM event {condition}"
+            )
+            touched.extend(cursor.fetchall())
+
+        statements.execute(cursor, f"{body} RETURNING start_date, end_date")
+        touched.extend(cursor.fetchall())
+    except DatabaseError:
+        # not a plain statement on the event table, run it untracked
+        transaction.savepoint_rollback(savepoint)
+        statements.execute(cursor, sql_request)
+        return None
+
+    transaction.savepoint_commit(savepoint)
+    return [list(row) for row in touched]
+
+
+def insert_parts(action):
+    """(columns, values) of a batchable INSERT action, else None."""
+    if action.get("type") != "create":
+        return None
+    match = INSERT_RE.match(action.get("sql", ""))
+    if match is None or not is_single_statement(action["sql"]):
+        return None
+    columns = ", ".join(column.strip().lower() for column in match[1].split(","))
+    return columns, match[2]
+
+
+def group_actions(actions):
+    """Split the action list into runs; consecutive INSERTs share a run."""
+    group, columns = [], None
+    for index, action in enumerate(actions):
+        parts = insert_parts(action)
+        if parts is not None and group and parts[0] == columns:
+            group.append((index, action, parts[1]))
+            continue
+        if group:
+            yield group
+        group = [(index, action, parts[1] if parts else None)]
+        columns = parts[0] if parts else None
+    if group:
+        yield group
+
+
+def run_action(cursor, action):
+    """Execute one action; returns (result, touched)."""
+    type_sql_request = action.get("type")
+    sql_request = action.get("sql")
+    result = {"id": action.get("id"), "type": type_sql_request}
+    touched = []
+
+    match type_sql_request:
+        case "select":
+            statements.execute(cursor, sql_request)
+            result["fetched_data"] = dictfetchall(cursor)
+        case "recommendation":
+            statements.execute(cursor, sql_request)
+            result["message"] = "reccomendation success"
+            result["fetched_data"] = dictfetchall(cursor)
+        case "create":
+            touched = execute_tracked(cursor, sql_request)
+            result["message"] = "Insert executed successfully"
+        case "update":
+            touched = execute_tracked(cursor, sql_request)
+            result["message"] = f"Update executed. Rows affected: {cursor.rowcount}"
+        case "delete":
+            touched = execute_tracked(cursor, sql_request)
+            result["message"] = f"Delete executed. Rows affected: {cursor.rowcount}"
+        case _:
+            raise ValueError(f"Error: No such method {type_sql_request}")
+
+    result["status"] = "success"
+    return result, touched
+
+
+def run_batch(cursor, group):
+    """Send a run of INSERTs as one statement; returns touched or raises."""
+    columns = insert_parts(group[0][1])[0]
+    values = ", ".join(values for _, _, values in group)
+    return execute_tracked(cursor, f"INSERT INTO event ({columns}) VALUES {values}")
+
+
+class Execution:
+    def __init__(self, actions, mode):
+        self.actions = actions
+        self.mode = mode
+        self.results = [None] * len(actions)
+        self.touched = []
+
+    def add_touched(self, touched):
+        # one untracked statement makes the whole request untracked
+        if touched is None or self.touched is None:
+            self.touched = None
+        else:
+            self.touched.extend(touched)
+
+    def fail(self, index, action, error):
+        self.results[index] = {
+            "id": action.get("id"),
+            "type": action.get("type"),
+            "status": "error",
+            "error": str(error),
+        }
+        if self.mode == ATOMIC:
+            raise ActionFailed
+
+    def run_one(self, cursor, index, action):
+        # an atomic request is rolled back as a whole, no savepoint needed
+        savepoint = transaction.savepoint() if self.mode == BEST_EFFORT else None
+        try:
+            with timed_action(action.get("type")):
+                result, touched = run_action(cursor, action)
+        except Exception as e:
+            if savepoint:
+                transaction.savepoint_rollback(savepoint)
+            self.fail(index, action, e)
+            return
+        if savepoint:
+            transaction.savepoint_commit(savepoint)
+        self.results[index] = result
+        self.add_touched(touched)
+
+    def run_group(self, cursor, group):
+        if len(group) > 1:
+            savepoint = transaction.savepoint()
+            try:
+                with timed_action("create_batch"):
+                    touched = run_batch(cursor, group)
+            except DatabaseError:
+                # find out which INSERT is broken by running them one by one
+                transaction.savepoint_rollback(savepoint)
+            else:
+                transaction.savepoint_commit(savepoint)
+                for index, action, _ in group:
+                    self.results[index] = {
+                        "id": action.get("id"),
+                        "type": "create",
+                        "status": "success",
+                        "message": "Insert executed successfully",
+                        "batched": len(group),
+                    }
+                self.add_touched(touched)
+                return
+
+        for index, action, _ in group:
+            self.run_one(cursor, index, action)
+
+    def run(self):
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    for group in group_actions(self.actions):
+                        self.run_group(cursor, group)
+        except ActionFailed:
+            self.touched = []
+            for index, action in enumerate(self.actions):
+                result = self.results[index]
+                if result is None:
+                    self.results[index] = {
+                        "id": action.get("id"),
+                        "type": action.get("type"),
+                        "status": "skipped",
+                    }
+                elif result["status"] == "success":
+                    result["status"] = "rolled_back"
+
+        failed = any(result["status"] != "success" for result in self.results)
+        return {
+            "status": "error" if failed else "success",
+            "mode": self.mode,
+            "results": self.results,
+            "touched": self.touched,
+        }
+
+
+def execute_actions(actions, mode=ATOMIC):
+    return Execution(actions, mode).run()
@@ -0,0 +1,64 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.reminders import ReminderScheduler, send_reminders
+from api.telemetry import log
+
+
+class Command(BaseCommand):
+    help = "Fire event reminders until stopped, see api.reminders"
+
+    def handle(self, *args, **options):
+        scheduler = ReminderScheduler(send_reminders)
+        scheduler.start(time.time())
+        listening = self.listen()
+        log("reminders_started", listening=listening, **scheduler.stats())
+
+        checked = checkpointed = time.monotonic()
+        try:
+            while True:
+                now = time.time()
+                scheduler.fire_due(now)
+                scheduler.extend(now)
+                if time.monotonic() - checkpointed >= settings.REMINDER_CHECKPOINT:
+                    scheduler.checkpoint()
+                    checkpointed = time.monotonic()
+                if time.monotonic() - checked >= settings.REMINDER_POLL:
+                    # NOTIFYs are lost while the connection is down, or never sent
+                    scheduler.apply_changes()
+                    checked = time.monotonic()
+
+                timeout = settings.REMINDER_POLL - (time.monotonic() - checked)
+                next_due = scheduler.reminders.next_due()
+                if next_due is not None:
+                    timeout = min(timeout, next_due - time.time())
+                if self.wait(listening, max(timeout, 0)):
+                    scheduler.apply_changes()
+                    checked = time.monotonic()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            scheduler.checkpoint()
+            log("reminders_stopped", **scheduler.stats())
+
+    def listen(self) -> bool:
+        """LISTEN for the writes of api.notify, on Postgres only."""
+        if connection.vendor != "postgresql" or not settings.EVENT_NOTIFY_CHANNEL:
+            return False
+        from psycopg import sql
+
+        connection.ensure_connection()
+        connection.connection.execute(
+            sql.SQL("LISTEN {}").format(sql.Identifier(settings.EVENT_NOTIFY_CHANNEL))
+        )
+        return True
+
+    def wait(self, listening: bool, timeout: float) -> bool:
+        """Sleep up to `timeout` seconds; True if a write was notified meanwhile."""
+        if not listening:
+            time.sleep(timeout)
+            return False
+        return any(True for _ in connection.connection.notifies(timeout=timeout, stop_after=1))
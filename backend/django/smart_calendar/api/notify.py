@@ -0,0 +1,76 @@
+"""Change notifications of the write paths.
+
+Every write that changed events or series sends ``events_changed`` with
+the months (UTC, ``"YYYY-MM"``) its "touched" ranges cover, or None when
+it could not tell which. On Postgres ``notify_postgres`` passes it on as a
+``NOTIFY`` on ``EVENT_NOTIFY_CHANNEL`` with ``{"months": [...]}``; the
+gateway LISTENs, drops those months from its cache and pushes them to the
+WebSocket clients that show them. Other receivers can connect to the
+signal for an in-process broker.
+"""
+
+import json
+from datetime import datetime
+from datetime import timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.dispatch import Signal, receiver
+from django.utils.dateparse import parse_datetime
+
+# months=[...] or months=None
+events_changed = Signal()
+
+# a NOTIFY payload is limited to 8000 bytes; more months are sent as None
+MAX_NOTIFY_MONTHS = 240
+
+
+def as_utc(value):
+    moment = parse_datetime(value) if isinstance(value, str) else value
+    if not isinstance(moment, datetime):
+        raise ValueError(f"There is no date in {value!r}")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=dt_timezone.utc)
+    return moment.astimezone(dt_timezone.utc)
+
+
+def touched_months(touched):
+    """Sorted "YYYY-MM" of the months the touched ranges cover, None for any."""
+    if touched is None:
+        return None
+    months = set()
+    for span in touched:
+        try:
+            start, end = sorted(as_utc(value) for value in span)
+        except (TypeError, ValueError):
+            return None
+        year, month = start.year, start.month
+        while (year, month) <= (end.year, end.month):
+            months.add(f"{year:04d}-{month:02d}")
+            if len(months) > MAX_NOTIFY_MONTHS:
+                return None
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return sorted(months)
+
+
+def publish(touched):
+    """Send events_changed for the touched ranges of a committed write."""
+    if touched == []:
+        # nothing was written
+        return
+    events_changed.send(sender=None, months=touched_months(touched))
+
+
+apublish = sync_to_async(publish)
+
+
+@receiver(events_changed)
+def notify_postgres(sender, months, **kwargs):
+    if connection.vendor != "postgresql" or not settings.EVENT_NOTIFY_CHANNEL:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_notify(%s, %s)",
+            [settings.EVENT_NOTIFY_CHANNEL, json.dumps({"months": months})],
+        )
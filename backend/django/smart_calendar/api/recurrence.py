@@ -0,0 +1,315 @@
+"""Recurring events: an RRULE subset stored once, expanded per window.
+
+Supported rule parts: ``FREQ=DAILY|WEEKLY|MONTHLY``, ``INTERVAL``,
+``BYDAY`` (WEEKLY only), and ``UNTIL`` or ``COUNT``; cancelled
+occurrences are listed in ``EventSeries.exdates``. Occurrences keep the
+wall-clock time of the first one in the current time zone, and a monthly
+rule skips months without its day (like RFC 5545).
+
+``occurrences()`` is a generator over one window: daily and weekly rules
+jump straight to the first period that can touch the window, so a series
+is never expanded from its start. Expansions are cached per (series,
+window), keyed by the series' content, so an edited series never hits a
+stale entry.
+"""
+
+import calendar
+import heapq
+from collections import OrderedDict
+from datetime import datetime, time, timedelta
+from datetime import timezone as dt_timezone
+
+from db.models import EventSeries
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .serializers import SERIES_LABEL
+
+WEEKDAY_CODES = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+PERIOD_DAYS = {EventSeries.DAILY: 1, EventSeries.WEEKLY: 7}
+# upper bound of COUNT, the end of a counted series is found by walking it
+MAX_COUNT = 10000
+
+
+class RuleError(ValueError):
+    pass
+
+
+def parse_until(value):
+    for pattern in ("%Y%m%dT%H%M%SZ", "%Y%m%dT%H%M%S", "%Y%m%d"):
+        try:
+            moment = datetime.strptime(value, pattern)
+        except ValueError:
+            continue
+        if pattern == "%Y%m%d":
+            # a date-only UNTIL includes the whole day
+            moment = datetime.combine(moment.date(), time.max)
+        if pattern.endswith("Z"):
+            return moment.replace(tzinfo=dt_timezone.utc)
+        return timezone.make_aware(moment)
+    moment = parse_datetime(value)
+    if moment is None:
+        raise RuleError(f"Invalid UNTIL {value}")
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+def parse_rrule(text: str) -> dict:
+    """EventSeries rule fields of an RRULE string, raises RuleError."""
+    if not isinstance(text, str):
+        raise RuleError("There is no rrule")
+    text = text.strip()
+    if text.upper().startswith("RRULE:"):
+        text = text[len("RRULE:"):]
+    parts = {}
+    for part in filter(None, text.split(";")):
+        key, _, value = part.partition("=")
+        parts[key.strip().upper()] = value.strip()
+
+    unsupported = set(parts) - {"FREQ", "INTERVAL", "BYDAY", "UNTIL", "COUNT"}
+    if unsupported:
+        raise RuleError(f"Unsupported rule parts {sorted(unsupported)}")
+    frequency = parts.get("FREQ", "").upper()
+    if frequency not in PERIOD_DAYS and frequency != EventSeries.MONTHLY:
+        raise RuleError("FREQ must be DAILY, WEEKLY or MONTHLY")
+    if "UNTIL" in parts and "COUNT" in parts:
+        raise RuleError("UNTIL and COUNT cannot be combined")
+
+    rule = {
+        "frequency": frequency,
+        "interval": 1,
+        "weekdays": "",
+        "until": None,
+        "count": None,
+    }
+    try:
+        rule["interval"] = int(parts.get("INTERVAL", 1))
+        if "COUNT" in parts:
+            rule["count"] = int(parts["COUNT"])
+    except ValueError:
+        raise RuleError("INTERVAL and COUNT must be numbers")
+    if rule["interval"] < 1 or (rule["count"] is not None and not 0 < rule["count"] <= MAX_COUNT):
+        raise RuleError(f"INTERVAL must be positive and COUNT between 1 and {MAX_COUNT}")
+    if "UNTIL" in parts:
+        rule["until"] = parse_until(parts["UNTIL"])
+    if "BYDAY" in parts:
+        if frequency != EventSeries.WEEKLY:
+            raise RuleError("BYDAY is only supported with FREQ=WEEKLY")
+        codes = [code.strip().upper() for code in parts["BYDAY"].split(",")]
+        if not codes or any(code not in WEEKDAY_CODES for code in codes):
+            raise RuleError(f"Invalid BYDAY {parts['BYDAY']}")
+        rule["weekdays"] = ",".join(str(day) for day in sorted({WEEKDAY_CODES.index(c) for c in codes}))
+    return rule
+
+
+def parse_exdate(value):
+    """Start of a cancelled occurrence, raises RuleError."""
+    moment = parse_datetime(value) if isinstance(value, str) else None
+    if moment is None:
+        raise RuleError(f"Invalid exdate {value!r}")
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+def format_rrule(series) -> str:
+    parts = [f"FREQ={series.frequency}"]
+    if series.interval != 1:
+        parts.append(f"INTERVAL={series.interval}")
+    if series.weekdays:
+        parts.append("BYDAY=" + ",".join(WEEKDAY_CODES[int(d)] for d in series.weekdays.split(",")))
+    if series.until is not None:
+        parts.append(f"UNTIL={series.until.astimezone(dt_timezone.utc):%Y%m%dT%H%M%SZ}")
+    if series.count is not None:
+        parts.append(f"COUNT={series.count}")
+    return ";".join(parts)
+
+
+def _periodic_starts(series, first, not_before):
+    """(index, start) of a daily/weekly rule from the period before `not_before`."""
+    period = PERIOD_DAYS[series.frequency] * series.interval
+    if series.frequency == EventSeries.WEEKLY and series.weekdays:
+        offsets = sorted(int(day) - first.weekday() for day in series.weekdays.split(","))
+    else:
+        offsets = [0]
+    # days of the first week that fall before the first occurrence
+    skipped = sum(1 for offset in offsets if offset < 0)
+
+    days = (timezone.localtime(not_before, first.tzinfo).date() - first.date()).days
+    # one period of slack for offsets beyond the period start
+    number = max(0, days // period - 1)
+    index = max(0, number * len(offsets) - skipped)
+    while True:
+        for offset in offsets:
+            if number == 0 and offset < 0:
+                continue
+            yield index, first + timedelta(days=number * period + offset)
+            index += 1
+        number += 1
+
+
+def _monthly_starts(series, first, not_before):
+    """(index, start) of a monthly rule; months without the day are skipped."""
+    number = 0
+    if series.count is None:
+        # nothing to count, start a period before the window
+        months = (not_before.year - first.year) * 12 + not_before.month - first.month
+        number = max(0, months // series.interval - 1)
+    index = 0
+    while True:
+        month = first.month - 1 + number * series.interval
+        year, month = first.year + month // 12, month % 12 + 1
+        if first.day <= calendar.monthrange(year, month)[1]:
+            yield index, first.replace(year=year, month=month)
+            index += 1
+        number += 1
+
+
+def starts(series, not_before):
+    """(index, start) of the occurrences, from a point before `not_before`."""
+    first = timezone.localtime(series.start_date)
+    if series.frequency == EventSeries.MONTHLY:
+        return _monthly_starts(series, first, not_before)
+    return _periodic_starts(series, first, not_before)
+
+
+def occurrences(series, window_start: datetime, window_end: datetime):
+    """Yield (start, end) of the occurrences overlapping [window_start, window_end)."""
+    duration = series.end_date - series.start_date
+    exdates = {parse_exdate(value).timestamp() for value in series.exdates}
+    for index, start in starts(series, window_start - duration):
+        if series.count is not None and index >= series.count:
+            return
+        if series.until is not None and start > series.until:
+            return
+        if start >= window_end:
+            return
+        if start + duration <= window_start or start.timestamp() in exdates:
+            continue
+        yield start.astimezone(dt_timezone.utc), (start + duration).astimezone(dt_timezone.utc)
+
+
+def series_end(series):
+    """When the last occurrence ends, None for endless series."""
+    duration = series.end_date - series.start_date
+    if series.until is not None:
+        return series.until + duration
+    if series.count is None:
+        return None
+    last = None
+    for index, start in starts(series, series.start_date):
+        if index >= series.count:
+            break
+        last = start
+    return last + duration
+
+
+SERIES_FIELDS = (
+    "pk", "start_date", "end_date", "name", "description", "category",
+    "frequency", "interval", "weekdays", "until", "count", "exdates",
+)
+
+
+def series_in_window(window_start, window_end):
+    """Series with occurrences in the window, as named rows (no model instances)."""
+    return (
+        EventSeries.objects.filter(start_date__lt=window_end)
+        .filter(Q(series_end__isnull=True) | Q(series_end__gt=window_start))
+        .values_list(*SERIES_FIELDS, named=True)
+    )
+
+
+def occurrence_objects(series, window_start, window_end, starting_only=False):
+    """Occurrences as ``serializers.to_object`` shaped dicts, ordered by start."""
+    rule = format_rrule(series)
+    return [
+        {
+            "model": SERIES_LABEL,
+            "pk": series.pk,
+            "fields": {
+                "start_date": start,
+                "end_date": end,
+                "name": series.name,
+                "description": series.description,
+                "category": series.category,
+                "recurrence": rule,
+            },
+        }
+        for start, end in occurrences(series, window_start, window_end)
+        if not starting_only or start >= window_start
+    ]
+
+
+class ExpansionCache:
+    """LRU of occurrence_objects() per (series content, window)."""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def expand(self, series, window_start, window_end, starting_only=False) -> list:
+        # every field is part of the key, an edited series gets a new entry
+        key = (
+            tuple(series._replace(exdates=tuple(series.exdates))),
+            window_start,
+            window_end,
+            starting_only,
+        )
+        objects = self.entries.get(key)
+        if objects is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return objects
+        self.misses += 1
+        objects = occurrence_objects(series, window_start, window_end, starting_only)
+        self.entries[key] = objects
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return objects
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "size": len(self.entries),
+        }
+
+
+expansions = ExpansionCache(getattr(settings, "RECURRENCE_CACHE_SIZE", 16384))
+
+
+def expand_series(window_start, window_end, starting_only=False):
+    """Occurrence objects of every series in the window, ordered by start.
+
+    ``starting_only`` keeps only occurrences that start inside the window
+    (the month view).
+    """
+    per_series = [
+        expansions.expand(series, window_start, window_end, starting_only)
+        for series in series_in_window(window_start, window_end)
+    ]
+    # every list is already sorted, merge instead of sorting everything
+    return list(
+        heapq.merge(
+            *per_series, key=lambda obj: (obj["fields"]["start_date"], obj["pk"])
+        )
+    )
+
+
+async def aexpand_series(window_start, window_end, starting_only=False):
+    """expand_series() for async views."""
+    per_series = [
+        expansions.expand(series, window_start, window_end, starting_only)
+        async for series in series_in_window(window_start, window_end)
+    ]
+    return list(
+        heapq.merge(
+            *per_series, key=lambda obj: (obj["fields"]["start_date"], obj["pk"])
+        )
+    )
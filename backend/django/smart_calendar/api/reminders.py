@@ -0,0 +1,242 @@
+"""Reminders: a min-heap of due times, kept current from the row versions.
+
+``python manage.py run_reminders`` holds the reminders due in the next
+``REMINDER_HORIZON`` seconds in a ``ReminderHeap``. A reminder is due
+``REMINDER_LEAD`` seconds before an event or an occurrence of a series
+starts; due reminders are sent in batches as ``reminders_due``, and
+every one is written to the "reminders" logger. That logger is not
+sampled like the "api" one: a reminder that is not written is lost.
+
+* The horizon moves forward with a range scan of the ``start_date`` index
+  over the part not loaded yet.
+* Writes are applied from the rows and tombstones above the last version
+  the scheduler saw (see ``api.changes``), so an edit costs a few indexed
+  queries, not a rescan of the upcoming events.
+* ``reminder_watermark.fired_until`` is saved every
+  ``REMINDER_CHECKPOINT`` seconds: every reminder due before it has
+  fired. A restart only loads the reminders after it. Those of the last
+  checkpoint interval may fire again (at least once), those missed while
+  the service was down fire late, up to ``REMINDER_MAX_DELAY`` seconds.
+"""
+
+import heapq
+import itertools
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime
+from datetime import timezone as dt_timezone
+
+from db.models import Event, EventSeries, ReminderWatermark, Tombstone
+from django.conf import settings
+from django.dispatch import Signal, receiver
+
+from .changes import current_version
+from .recurrence import SERIES_FIELDS, occurrences, series_in_window
+
+# reminders=[(key, due), ...]; a key is an event id or (series id, start)
+reminders_due = Signal()
+
+# rows read per round trip while loading the horizon
+LOAD_CHUNK = 10000
+
+logger = logging.getLogger("reminders")
+
+
+def as_datetime(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, dt_timezone.utc)
+
+
+class ReminderHeap:
+    """Due times by key in a min-heap, replaced entries are dropped lazily.
+
+    Rescheduling or cancelling a key leaves its old entry in the heap; it
+    is skipped when it comes up, and the heap is rebuilt once most of it
+    is stale.
+    """
+
+    def __init__(self):
+        self._heap = []
+        # key -> its current (due, sequence, key) heap entry
+        self._live = {}
+        # orders equal due times, keys of both kinds do not compare
+        self._sequence = itertools.count()
+
+    def __len__(self):
+        return len(self._live)
+
+    def __contains__(self, key):
+        return key in self._live
+
+    def due(self, key):
+        entry = self._live.get(key)
+        return None if entry is None else entry[0]
+
+    def schedule(self, key, due: float):
+        current = self._live.get(key)
+        if current is not None and current[0] == due:
+            return
+        entry = (due, next(self._sequence), key)
+        self._live[key] = entry
+        heapq.heappush(self._heap, entry)
+        self._compact()
+
+    def cancel(self, key):
+        if self._live.pop(key, None) is not None:
+            self._compact()
+
+    def _compact(self):
+        if len(self._heap) > 2 * len(self._live) + 1024:
+            self._heap = list(self._live.values())
+            heapq.heapify(self._heap)
+
+    def next_due(self):
+        heap, live = self._heap, self._live
+        while heap and live.get(heap[0][2]) is not heap[0]:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def pop_due(self, now: float) -> list:
+        """(key, due) of the reminders due before `now`, earliest first."""
+        fired = []
+        heap, live = self._heap, self._live
+        while heap and heap[0][0] < now:
+            entry = heapq.heappop(heap)
+            due, _, key = entry
+            if live.get(key) is entry:
+                del live[key]
+                fired.append((key, due))
+        return fired
+
+
+class ReminderScheduler:
+    """The reminders due in [fired_until, loaded_until), times in epoch seconds.
+
+    ``fire`` is called with the (key, due) list of every batch of due
+    reminders. The methods take ``now`` so the caller owns the clock.
+    """
+
+    def __init__(self, fire, lead=None, horizon=None, max_delay=None):
+        self.fire = fire
+        self.lead = settings.REMINDER_LEAD if lead is None else lead
+        self.horizon = settings.REMINDER_HORIZON if horizon is None else horizon
+        self.max_delay = settings.REMINDER_MAX_DELAY if max_delay is None else max_delay
+        self.reminders = ReminderHeap()
+        # series id -> keys of its scheduled occurrences
+        self._occurrences = defaultdict(set)
+        self.version = 0
+        self.fired_until = 0.0
+        self.loaded_until = 0.0
+        self.fired = 0
+
+    def start(self, now: float):
+        """Resume from the saved watermark and load the horizon."""
+        watermark = (
+            ReminderWatermark.objects.filter(pk=1).values_list("fired_until", flat=True).first()
+        )
+        resume = now if watermark is None else max(watermark.timestamp(), now - self.max_delay)
+        self.fired_until = self.loaded_until = resume
+        # before loading: a write racing the load is applied again, which is harmless
+        self.version = current_version()
+        self.load(now + self.horizon)
+
+    def load(self, until: float):
+        """Schedule the reminders due in [loaded_until, until)."""
+        if until <= self.loaded_until:
+            return
+        low = as_datetime(self.loaded_until + self.lead)
+        high = as_datetime(until + self.lead)
+        events = Event.objects.filter(start_date__gte=low, start_date__lt=high)
+        for pk, start in events.values_list("pk", "start_date").iterator(chunk_size=LOAD_CHUNK):
+            self.reminders.schedule(pk, start.timestamp() - self.lead)
+        for series in series_in_window(low, high):
+            self._schedule_occurrences(series, low, high)
+        self.loaded_until = until
+
+    def extend(self, now: float):
+        """Move the horizon forward once half of it has passed."""
+        if self.loaded_until - now < self.horizon / 2:
+            self.load(now + self.horizon)
+
+    def apply_changes(self) -> int:
+        """Apply the writes after the last version seen; returns that version."""
+        version = current_version()
+        if version == self.version:
+            return version
+        window = {"version__gt": self.version, "version__lte": version}
+
+        for pk, start in Event.objects.filter(**window).values_list("pk", "start_date").iterator():
+            due = start.timestamp() - self.lead
+            if self.fired_until <= due < self.loaded_until:
+                self.reminders.schedule(pk, due)
+            else:
+                self.reminders.cancel(pk)
+        tombstones = Tombstone.objects.filter(**window)
+        for row_id in tombstones.filter(source=Tombstone.EVENT).values_list("row_id", flat=True):
+            self.reminders.cancel(row_id)
+
+        low = as_datetime(self.fired_until + self.lead)
+        high = as_datetime(self.loaded_until + self.lead)
+        for series in EventSeries.objects.filter(**window).values_list(*SERIES_FIELDS, named=True):
+            self._cancel_series(series.pk)
+            self._schedule_occurrences(series, low, high)
+        for row_id in tombstones.filter(source=Tombstone.SERIES).values_list("row_id", flat=True):
+            self._cancel_series(row_id)
+
+        self.version = version
+        return version
+
+    def fire_due(self, now: float) -> list:
+        """Fire the reminders due before `now`."""
+        fired = self.reminders.pop_due(now)
+        for key, _ in fired:
+            if isinstance(key, tuple):
+                self._occurrences[key[0]].discard(key)
+        if fired:
+            self.fire(fired)
+            self.fired += len(fired)
+        self.fired_until = max(self.fired_until, now)
+        return fired
+
+    def checkpoint(self):
+        ReminderWatermark.objects.update_or_create(
+            pk=1, defaults={"fired_until": as_datetime(self.fired_until)}
+        )
+
+    def _schedule_occurrences(self, series, low, high):
+        keys = self._occurrences[series.pk]
+        for start, _ in occurrences(series, low, high):
+            if start >= low:
+                key = (series.pk, start.timestamp())
+                self.reminders.schedule(key, key[1] - self.lead)
+                keys.add(key)
+        if not keys:
+            del self._occurrences[series.pk]
+
+    def _cancel_series(self, series_id):
+        for key in self._occurrences.pop(series_id, ()):
+            self.reminders.cancel(key)
+
+    def stats(self) -> dict:
+        return {
+            "scheduled": len(self.reminders),
+            "fired": self.fired,
+            "version": self.version,
+            "fired_until": as_datetime(self.fired_until),
+            "loaded_until": as_datetime(self.loaded_until),
+        }
+
+
+def send_reminders(fired):
+    reminders_due.send(sender=ReminderScheduler, reminders=fired)
+
+
+@receiver(reminders_due)
+def log_reminders(sender, reminders, **kwargs):
+    for key, due in reminders:
+        if isinstance(key, tuple):
+            record = {"event": "reminder", "series": key[0], "start": as_datetime(key[1])}
+        else:
+            record = {"event": "reminder", "event_id": key}
+        record["due"] = as_datetime(due)
+        logger.info(json.dumps(record, default=str))
@@ -0,0 +1,141 @@
+"""Direct JSON encoding of events.
+
+Produces the same ``{"model", "pk", "fields"}`` objects as
+``django.core.serializers.serialize("json", ...)`` but reads plain tuples
+with ``values_list()`` instead of building model instances, and encodes
+the result once. orjson is used when it is installed; it writes
+sub-second timestamps with microseconds where DjangoJSONEncoder stops at
+milliseconds, whole-second ones come out identical.
+"""
+
+import itertools
+
+from asgiref.sync import sync_to_async
+from db.models import Event, EventSeries
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, StreamingHttpResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+EVENT_FIELDS = ("start_date", "end_date", "name", "description", "category")
+MODEL_LABEL = Event._meta.label_lower
+# occurrences of recurring events carry the series' label and pk
+SERIES_LABEL = EventSeries._meta.label_lower
+
+# number of rows fetched per round trip when streaming
+STREAM_CHUNK_SIZE = 2000
+
+_encoder = DjangoJSONEncoder()
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_encoder.default, option=orjson.OPT_UTC_Z)
+    return _encoder.encode(obj).encode()
+
+
+def event_rows(queryset):
+    return queryset.values_list("pk", *EVENT_FIELDS)
+
+
+def to_object(row) -> dict:
+    return {
+        "model": MODEL_LABEL,
+        "pk": row[0],
+        "fields": dict(zip(EVENT_FIELDS, row[1:])),
+    }
+
+
+def versioned_rows(queryset):
+    """event_rows() with the row version last."""
+    return queryset.values_list("pk", *EVENT_FIELDS, "version")
+
+
+def versioned_object(row) -> dict:
+    obj = to_object(row[:-1])
+    obj["version"] = row[-1]
+    return obj
+
+
+def serialize_events(queryset, extra=()) -> bytes:
+    """JSON array of the queryset's events followed by the `extra` objects."""
+    return dumps([to_object(row) for row in event_rows(queryset)] + list(extra))
+
+
+async def aserialize_events(queryset, extra=()) -> bytes:
+    """serialize_events() for async views, rows are read with async iteration."""
+    return dumps([to_object(row) async for row in event_rows(queryset)] + list(extra))
+
+
+def stream_events(queryset, extra=()):
+    """Yield a JSON array of events piece by piece."""
+    yield b"["
+    separator = b""
+    batch = []
+    objects = map(to_object, event_rows(queryset).iterator(chunk_size=STREAM_CHUNK_SIZE))
+    for obj in itertools.chain(objects, extra):
+        batch.append(obj)
+        if len(batch) == STREAM_CHUNK_SIZE:
+            yield separator + dumps(batch)[1:-1]
+            separator = b","
+            batch = []
+    if batch:
+        yield separator + dumps(batch)[1:-1]
+    yield b"]"
+
+
+async def astream_events(queryset, extra=()):
+    """stream_events() as an async generator, for ASGI servers."""
+
+    # not aiterator(), which starts a values_list() query in the event loop
+    rows = event_rows(queryset).iterator(chunk_size=STREAM_CHUNK_SIZE)
+    next_chunk = sync_to_async(lambda: list(itertools.islice(rows, STREAM_CHUNK_SIZE)))
+
+    async def objects():
+        while chunk := await next_chunk():
+            for row in chunk:
+                yield to_object(row)
+        for obj in extra:
+            yield obj
+
+    yield b"["
+    separator = b""
+    batch = []
+    async for obj in objects():
+        batch.append(obj)
+        if len(batch) == STREAM_CHUNK_SIZE:
+            yield separator + dumps(batch)[1:-1]
+            separator = b","
+            batch = []
+    if batch:
+        yield separator + dumps(batch)[1:-1]
+    yield b"]"
+
+
+def events_response(queryset, stream: bool = False, extra=()):
+    if stream:
+        return StreamingHttpResponse(
+            stream_events(queryset, extra), content_type="application/json"
+        )
+    return HttpResponse(
+        serialize_events(queryset, extra), content_type="application/json"
+    )
+
+
+async def aevents_response(queryset, stream: bool = False, extra=()):
+    if stream:
+        return StreamingHttpResponse(
+            astream_events(queryset, extra), content_type="application/json"
+        )
+    return HttpResponse(
+        await aserialize_events(queryset, extra), content_type="application/json"
+    )
+
+
+def event_response(event_row, status: int = 200):
+    return HttpResponse(
+        dumps(to_object(event_row)), content_type="application/json", status=status
+    )
@@ -0,0 +1,187 @@
+"""Parameterized templates and server-side prepared statements for LLM SQL.
+
+The model inlines every literal, so two questions that only differ in a
+date produce two different statements that Postgres parses and plans from
+scratch. ``normalize`` lifts the literals out into ``$n`` parameters; the
+resulting template is PREPAREd once per connection and later runs go
+through EXECUTE with the extracted values.
+
+Only literals whose position cannot change the meaning of the statement
+are lifted: strings, and numbers that are compared against, used in
+LIMIT/OFFSET or listed in VALUES/IN. ``ORDER BY 1`` or ``SELECT 1`` stay
+as they are. Statements that Postgres refuses to prepare run unchanged.
+"""
+
+import re
+import weakref
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+
+TOKEN_RE = re.compile(
+    r"""
+    (?P<space>\s+)
+    |(?P<comment>--[^\n]*|/\*.*?\*/)
+    |(?P<string>'(?:[^']|'')*')
+    |(?P<prefixed>[EeBbXxNnUu]&?'(?:[^']|'')*')
+    |(?P<ident>"(?:[^"]|"")*")
+    |(?P<number>(?<![\w$.])\d+(?:\.\d+)?(?:[eE][+-]?\d+)?(?![\w.]))
+    |(?P<word>[A-Za-z_][\w$]*)
+    |(?P<op><=|>=|<>|!=|::|\S)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+PREPARABLE = {"select", "insert", "update", "delete", "with", "values"}
+# `INTERVAL '7 days'` becomes `$1::interval`
+TYPED_LITERALS = {"interval", "date", "time", "timestamp", "timestamptz"}
+COMPARISONS = {"=", "<", ">", "<=", ">=", "<>", "!="}
+LIMITS = {"limit", "offset"}
+
+stats = {"hits": 0, "misses": 0, "evictions": 0, "fallbacks": 0}
+
+# prepared statements live as long as the database session, so there is one
+# cache per driver connection; a pooled connection keeps its statements
+# whichever request checks it out next
+caches = weakref.WeakKeyDictionary()
+
+
+def normalize(sql_request):
+    """Split a statement into (template, params), or None if unsupported."""
+    body = sql_request.strip().rstrip(";")
+    tokens = [(m.lastgroup, m.group()) for m in TOKEN_RE.finditer(body)]
+    words = [text.lower() for kind, text in tokens if kind == "word"]
+    if not words or words[0] not in PREPARABLE:
+        return None
+    if any(text in {";", "$", "?"} for kind, text in tokens if kind == "op"):
+        return None
+
+    pieces, params = [], []
+    previous = ""  # last significant token, lowercased
+    in_values = False
+    # one entry per open parenthesis: is it a VALUES row or an IN list
+    lists = []
+
+    for kind, text in tokens:
+        if kind in ("space", "comment"):
+            pieces.append(text)
+            continue
+
+        if kind == "string":
+            value = text[1:-1].replace("''", "'")
+            params.append(value)
+            if previous in TYPED_LITERALS:
+                # drop the type keyword and cast the parameter instead
+                while pieces and not pieces[-1].strip():
+                    pieces.pop()
+                pieces.pop()
+                pieces.append(f"${len(params)}::{previous}")
+            else:
+                pieces.append(f"${len(params)}")
+        elif kind == "number" and (
+            previous in COMPARISONS
+            or previous in LIMITS
+            or (lists and lists[-1] and previous in ("(", ","))
+        ):
+            params.append(text)
+            pieces.append(f"${len(params)}")
+        else:
+            if kind == "word" and text.lower() == "values":
+                in_values = True
+            elif kind == "word" and text.lower() in ("returning", "on", "select"):
+                in_values = False
+            elif text == "(":
+                lists.append((in_values and not lists) or previous == "in")
+            elif text == ")" and lists:
+                lists.pop()
+            pieces.append(text)
+
+        previous = text.lower()
+
+    return "".join(pieces), params
+
+
+class StatementCache:
+    """LRU map of template -> prepared statement name for one connection."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.names = OrderedDict()
+        self.counter = 0
+
+    def get(self, template):
+        name = self.names.get(template)
+        if name is not None:
+            self.names.move_to_end(template)
+        return name
+
+    def add(self, cursor, template):
+        self.counter += 1
+        name = f"llm_stmt_{self.counter}"
+        cursor.execute(f"PREPARE {name} AS {template}")
+        self.names[template] = name
+        while len(self.names) > self.max_size:
+            _, evicted = self.names.popitem(last=False)
+            cursor.execute(f"DEALLOCATE {evicted}")
+            stats["evictions"] += 1
+        return name
+
+    def discard(self, template):
+        self.names.pop(template, None)
+
+
+def statement_cache():
+    raw_connection = connection.connection
+    cache = caches.get(raw_connection)
+    if cache is None:
+        cache = caches[raw_connection] = StatementCache(
+            getattr(settings, "SQL_TEMPLATE_CACHE_SIZE", 128)
+        )
+    return cache
+
+
+def execute(cursor, sql_request):
+    """Run a statement through the per-connection prepared statement cache."""
+    if connection.vendor != "postgresql":
+        cursor.execute(sql_request)
+        return
+
+    normalized = normalize(sql_request)
+    if normalized is None:
+        stats["fallbacks"] += 1
+        cursor.execute(sql_request)
+        return
+
+    template, params = normalized
+    cache = statement_cache()
+    name = cache.get(template)
+    if name is None:
+        stats["misses"] += 1
+        savepoint = transaction.savepoint()
+        try:
+            name = cache.add(cursor, template)
+        except DatabaseError:
+            # e.g. a parameter whose type Postgres cannot infer
+            transaction.savepoint_rollback(savepoint)
+            cache.discard(template)
+            stats["fallbacks"] += 1
+            cursor.execute(sql_request)
+            return
+        transaction.savepoint_commit(savepoint)
+    else:
+        stats["hits"] += 1
+
+    if params:
+        placeholders = ", ".join(["%s"] * len(params))
+        cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+    else:
+        cursor.execute(f"EXECUTE {name}")
+
+
+def template_stats():
+    lookups = stats["hits"] + stats["misses"]
+    return {
+        **stats,
+        "hit_rate": stats["hits"] / lookups if lookups else 0.0,
+    }
@@ -0,0 +1,140 @@
+"""Prometheus metrics, request IDs and sampled JSON logs of the API.
+
+``TelemetryMiddleware`` takes the ``X-Request-ID`` the gateway or the
+model service sent (or makes one up), keeps it in ``request_id`` for the
+log lines of the request and echoes it on the response. It also times
+every request by URL route; ``timed_action`` times the SQL of the
+``exec_sql_request`` actions by action type.
+
+Logs are one JSON object per line on the "api" logger. Below WARNING only
+a ``LOG_SAMPLE_RATE`` share of them is written; warnings and errors always
+are. The metrics are served by ``/metrics`` in the Prometheus text format.
+"""
+
+import json
+import logging
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST, Histogram, generate_latest
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# longer ids (or none) are replaced, they end up in every log line
+MAX_REQUEST_ID = 128
+
+# anything else the model makes up is counted as "other"
+ACTION_TYPES = {"select", "recommendation", "create", "update", "delete"}
+
+request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+REQUEST_SECONDS = Histogram(
+    "django_request_seconds",
+    "Time to answer a request",
+    ["method", "route", "status"],
+)
+SQL_ACTION_SECONDS = Histogram(
+    "django_sql_action_seconds",
+    "Time to run the SQL of one exec_sql_request action",
+    ["type", "status"],
+)
+
+logger = logging.getLogger("api")
+
+
+def log(event, level=logging.INFO, **fields):
+    """Write one JSON log line, sampled below WARNING."""
+    if level < logging.WARNING and random.random() >= settings.LOG_SAMPLE_RATE:
+        return
+    if not logger.isEnabledFor(level):
+        return
+    record = {"event": event, "request_id": request_id.get(), **fields}
+    logger.log(level, json.dumps(record, default=str, ensure_ascii=False))
+
+
+@contextmanager
+def timed_action(action_type):
+    """Observe the time of the block under `action_type`."""
+    if action_type not in ACTION_TYPES and action_type != "create_batch":
+        action_type = "other"
+    status = "error"
+    start = time.perf_counter()
+    try:
+        yield
+        status = "success"
+    finally:
+        SQL_ACTION_SECONDS.labels(action_type, status).observe(
+            time.perf_counter() - start
+        )
+
+
+def incoming_request_id(request):
+    value = request.headers.get(REQUEST_ID_HEADER, "")
+    if 0 < len(value) <= MAX_REQUEST_ID and value.isprintable():
+        return value
+    return uuid.uuid4().hex
+
+
+class TelemetryMiddleware:
+    """Request id and per-route latency; runs sync or async like the view."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token, start = self.begin(request)
+        response = None
+        try:
+            response = self.get_response(request)
+            return response
+        finally:
+            self.end(request, response, token, start)
+
+    async def __acall__(self, request):
+        token, start = self.begin(request)
+        response = None
+        try:
+            response = await self.get_response(request)
+            return response
+        finally:
+            self.end(request, response, token, start)
+
+    def begin(self, request):
+        current = incoming_request_id(request)
+        request.request_id = current
+        return request_id.set(current), time.perf_counter()
+
+    def end(self, request, response, token, start):
+        elapsed = time.perf_counter() - start
+        # the route pattern, not the path, keeps the number of series bounded
+        match = request.resolver_match
+        route = match.route if match is not None else "unmatched"
+        status = response.status_code if response is not None else 500
+        REQUEST_SECONDS.labels(request.method, route, status).observe(elapsed)
+        if response is not None:
+            response[REQUEST_ID_HEADER] = request.request_id
+        log(
+            "request",
+            logging.WARNING if status >= 500 else logging.INFO,
+            method=request.method,
+            route=route,
+            status=status,
+            ms=round(elapsed * 1000, 2),
+        )
+        request_id.reset(token)
+
+
+async def metrics(request):
+    return HttpResponse(generate_latest(), content_type=CONTENT_TYPE_LATEST)
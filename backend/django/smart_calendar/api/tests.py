@@ -1,3 +1,969 @@
-from django.test import TestCase
+import json
+from datetime import datetime, timedelta, timezone
+from unittest import mock
 
-# Create your tests here.
+from db.models import Event, EventSeries
+from django.core import serializers
+from django.test import SimpleTestCase, TestCase, override_settings
+from prometheus_client import REGISTRY
+from smart_calendar import api_settings
+
+from .notify import events_changed, touched_months
+from . import serializers as event_serializers
+from .recurrence import occurrences, parse_rrule
+from .reminders import ReminderHeap, ReminderScheduler, send_reminders
+from .statements import normalize
+from .timeline import overlaps
+
+
+def make_event(name, start, end):
+    return Event.objects.create(
+        name=name,
+        start_date=start,
+        end_date=end,
+        description="",
+        category="Work",
+    )
+
+
+class EventRangeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        utc = timezone.utc
+        make_event("before", datetime(2025, 11, 1, 9, tzinfo=utc), datetime(2025, 11, 1, 10, tzinfo=utc))
+        make_event("trip", datetime(2025, 11, 29, tzinfo=utc), datetime(2025, 12, 3, tzinfo=utc))
+        make_event("meeting", datetime(2025, 12, 2, 9, tzinfo=utc), datetime(2025, 12, 2, 10, tzinfo=utc))
+        make_event("new year", datetime(2025, 12, 31, 22, tzinfo=utc), datetime(2026, 1, 1, 2, tzinfo=utc))
+
+    def names(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [event["fields"]["name"] for event in response.json()]
+
+    def test_month_returns_events_starting_in_it(self):
+        response = self.client.get("/api/get_events/", {"year": 2025, "month": 12})
+        self.assertEqual(self.names(response), ["meeting", "new year"])
+
+    def test_range_includes_overlapping_multi_day_events(self):
+        response = self.client.get(
+            "/api/get_events_range/",
+            {"from": "2025-12-01T00:00:00Z", "to": "2026-01-01T00:00:00Z"},
+        )
+        self.assertEqual(self.names(response), ["trip", "meeting", "new year"])
+
+    def test_range_end_is_exclusive(self):
+        response = self.client.get(
+            "/api/get_events_range/",
+            {"from": "2025-11-01T10:00:00Z", "to": "2025-11-29T00:00:00Z"},
+        )
+        self.assertEqual(self.names(response), [])
+
+    def test_range_requires_a_valid_window(self):
+        response = self.client.get(
+            "/api/get_events_range/",
+            {"from": "2025-12-02T00:00:00Z", "to": "2025-12-01T00:00:00Z"},
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class FreeSlotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        utc = timezone.utc
+        # Monday 2025-12-01; the first two overlap
+        make_event("standup", datetime(2025, 12, 1, 9, tzinfo=utc), datetime(2025, 12, 1, 10, 30, tzinfo=utc))
+        make_event("review", datetime(2025, 12, 1, 10, tzinfo=utc), datetime(2025, 12, 1, 11, tzinfo=utc))
+        make_event("lunch", datetime(2025, 12, 1, 12, tzinfo=utc), datetime(2025, 12, 1, 13, tzinfo=utc))
+
+    def slots(self, **params):
+        response = self.client.get("/api/free_slots/", params)
+        self.assertEqual(response.status_code, 200)
+        return [[start[11:16], end[11:16]] for start, end in response.json()["slots"]]
+
+    def test_first_slots_skip_busy_time(self):
+        self.assertEqual(
+            self.slots(**{"from": "2025-12-01T00:00:00Z", "to": "2025-12-02T00:00:00Z", "count": 3}),
+            [["11:00", "12:00"], ["13:00", "14:00"], ["14:00", "15:00"]],
+        )
+
+    def test_slots_stay_inside_working_hours(self):
+        slots = self.slots(
+            **{"from": "2025-12-01T16:20:00Z", "to": "2025-12-03T00:00:00Z", "duration": 90, "count": 2}
+        )
+        self.assertEqual(slots, [["16:30", "18:00"], ["09:00", "10:30"]])
+
+    def test_slots_stay_on_the_step_grid(self):
+        # 20 minutes is not a multiple of the 15 minute step
+        slots = self.slots(
+            **{"from": "2025-12-01T12:30:00Z", "to": "2025-12-01T15:00:00Z", "duration": 20, "count": 3}
+        )
+        self.assertEqual(slots, [["13:00", "13:20"], ["13:30", "13:50"], ["14:00", "14:20"]])
+
+    def test_weekends_are_skipped(self):
+        response = self.client.get(
+            "/api/free_slots/",
+            {"from": "2025-12-06T00:00:00Z", "to": "2025-12-10T00:00:00Z", "count": 1},
+        )
+        self.assertEqual(response.json()["slots"][0][0][:16], "2025-12-08T09:00")
+
+    def test_invalid_query_is_rejected(self):
+        response = self.client.get(
+            "/api/free_slots/",
+            {"from": "2025-12-01T00:00:00Z", "to": "2025-12-02T00:00:00Z", "duration": 0},
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class ConflictTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        utc = timezone.utc
+        cls.meeting = make_event("meeting", datetime(2025, 12, 2, 9, tzinfo=utc), datetime(2025, 12, 2, 10, tzinfo=utc))
+        cls.trip = make_event("trip", datetime(2025, 12, 1, tzinfo=utc), datetime(2025, 12, 3, tzinfo=utc))
+
+    def post(self, path, data):
+        return self.client.post(path, data, content_type="application/json")
+
+    def test_batch_returns_every_overlap(self):
+        response = self.post(
+            "/api/check_conflicts/",
+            {
+                "events": [
+                    {"start_date": "2025-12-02T09:30:00Z", "end_date": "2025-12-02T11:00:00Z"},
+                    {"start_date": "2025-12-03T00:00:00Z", "end_date": "2025-12-03T01:00:00Z"},
+                    {"start_date": "2025-12-01T12:00:00Z", "end_date": "2025-12-01T13:00:00Z"},
+                ]
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted((c["candidate"], c["name"]) for c in response.json()["conflicts"]),
+            [(0, "meeting"), (0, "trip"), (2, "trip")],
+        )
+
+    def test_an_event_does_not_conflict_with_itself(self):
+        response = self.post(
+            "/api/check_conflicts/",
+            {"events": [{"id": self.trip.id, "start_date": "2025-12-01T00:00:00Z", "end_date": "2025-12-01T08:00:00Z"}]},
+        )
+        self.assertEqual(response.json()["conflicts"], [])
+
+    def test_create_can_refuse_overlapping_events(self):
+        event = {
+            "name": "call",
+            "start_date": "2025-12-02T09:45:00Z",
+            "end_date": "2025-12-02T10:15:00Z",
+            "description": "",
+            "category": "Work",
+        }
+        response = self.post("/api/create_event/?check_conflicts=true", event)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Event.objects.count(), 2)
+        # without the flag the write goes through as before
+        self.assertEqual(self.post("/api/create_event/", event).status_code, 200)
+
+    def test_update_can_refuse_overlapping_events(self):
+        response = self.client.patch(
+            f"/api/update_event/?id={self.meeting.id}&check_conflicts=true",
+            {"start_date": "2025-12-04T09:00:00Z", "end_date": "2025-12-04T10:00:00Z"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.patch(
+            f"/api/update_event/?id={self.meeting.id}&check_conflicts=true",
+            {"start_date": "2025-12-02T23:00:00Z", "end_date": "2025-12-03T01:00:00Z"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 409)
+
+
+def new_event(name, day):
+    return {
+        "name": name,
+        "start_date": f"2025-12-{day:02d}T09:00:00Z",
+        "end_date": f"2025-12-{day:02d}T10:00:00Z",
+        "category": "Work",
+    }
+
+
+class BulkEventTests(TestCase):
+    def post(self, path, data):
+        response = self.client.post(path, data, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_create_returns_ids_per_item(self):
+        result = self.post(
+            "/api/bulk_create_events/", {"events": [new_event("a", 1), new_event("b", 2)]}
+        )
+        self.assertEqual(result["status"], "success")
+        ids = [item["id"] for item in result["results"]]
+        self.assertEqual(
+            list(Event.objects.filter(id__in=ids).order_by("id").values_list("name", flat=True)),
+            ["a", "b"],
+        )
+        self.assertEqual(len(result["touched"]), 2)
+
+    def test_atomic_create_writes_nothing_on_invalid_item(self):
+        result = self.post(
+            "/api/bulk_create_events/", {"events": [new_event("a", 1), {"name": "b"}]}
+        )
+        self.assertEqual([item["status"] for item in result["results"]], ["skipped", "error"])
+        self.assertFalse(Event.objects.exists())
+
+    def test_best_effort_create_keeps_valid_items(self):
+        result = self.post(
+            "/api/bulk_create_events/",
+            {"events": [new_event("a", 1), {"name": "b"}], "mode": "best_effort"},
+        )
+        self.assertEqual([item["status"] for item in result["results"]], ["success", "error"])
+        self.assertEqual(Event.objects.count(), 1)
+
+    def test_inverted_ranges_are_rejected_per_item(self):
+        inverted = {**new_event("b", 2), "end_date": "2025-12-02T08:00:00Z"}
+        result = self.post(
+            "/api/bulk_create_events/",
+            {"events": [new_event("a", 1), inverted], "mode": "best_effort"},
+        )
+        self.assertEqual([item["status"] for item in result["results"]], ["success", "error"])
+        self.assertEqual(result["results"][1]["error"], "end_date must be after start_date")
+        self.assertEqual(Event.objects.count(), 1)
+
+    def test_update_and_delete(self):
+        created = self.post(
+            "/api/bulk_create_events/", {"events": [new_event("a", 1), new_event("b", 2)]}
+        )
+        first, second = (item["id"] for item in created["results"])
+
+        response = self.client.patch(
+            "/api/bulk_update_events/",
+            {"events": [{"id": first, "name": "A"}, {"id": second, "category": "Home"}, {"id": 0, "name": "x"}],
+             "mode": "best_effort"},
+            content_type="application/json",
+        )
+        result = response.json()
+        self.assertEqual([item["status"] for item in result["results"]], ["success", "success", "error"])
+        self.assertEqual(Event.objects.get(id=first).name, "A")
+        self.assertEqual(Event.objects.get(id=second).category, "Home")
+
+        result = self.post("/api/bulk_delete_events/", {"ids": [first, 0]})
+        self.assertEqual([item["status"] for item in result["results"]], ["rolled_back", "error"])
+        self.assertEqual(Event.objects.count(), 2)
+
+        result = self.post("/api/bulk_delete_events/", {"ids": [first, second]})
+        self.assertEqual(result["status"], "success")
+        self.assertFalse(Event.objects.exists())
+
+    def test_update_touches_only_the_written_items(self):
+        created = self.post(
+            "/api/bulk_create_events/", {"events": [new_event("a", 1), new_event("b", 2), new_event("c", 3)]}
+        )
+        first, second, third = (item["id"] for item in created["results"])
+        Event.objects.filter(id=third).update(
+            start_date=datetime(2026, 2, 10, 9, tzinfo=timezone.utc),
+            end_date=datetime(2026, 2, 10, 10, tzinfo=timezone.utc),
+        )
+        overlapping = {"start_date": "2026-02-10T09:30:00Z", "end_date": "2026-02-10T10:30:00Z"}
+        response = self.client.patch(
+            "/api/bulk_update_events/?check_conflicts=true",
+            {
+                "events": [
+                    {"id": first, "start_date": "2026-01-05T09:00:00Z", "end_date": "2026-01-05T10:00:00Z"},
+                    {"id": first, **overlapping},
+                    {"id": second, **overlapping},
+                ],
+                "mode": "best_effort",
+            },
+            content_type="application/json",
+        )
+        result = response.json()
+        self.assertEqual([item["status"] for item in result["results"]], ["success", "error", "error"])
+        self.assertEqual(
+            result["touched"],
+            [["2025-12-01T09:00:00Z", "2025-12-01T10:00:00Z"], ["2026-01-05T09:00:00Z", "2026-01-05T10:00:00Z"]],
+        )
+        self.assertEqual(Event.objects.get(id=first).start_date, datetime(2026, 1, 5, 9, tzinfo=timezone.utc))
+        self.assertEqual(Event.objects.get(id=second).start_date, datetime(2025, 12, 2, 9, tzinfo=timezone.utc))
+
+
+class ListEventsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        utc = timezone.utc
+        same_start = datetime(2025, 12, 1, 9, tzinfo=utc)
+        # equal starts, the id breaks the tie
+        for name in ("a", "b", "c"):
+            make_event(name, same_start, same_start + timedelta(hours=1))
+        for day in (2, 3, 4):
+            make_event(f"day {day}", datetime(2025, 12, day, 9, tzinfo=utc), datetime(2025, 12, day, 10, tzinfo=utc))
+        Event.objects.filter(name="day 3").update(category="Home", description="dentist")
+
+    def page(self, **params):
+        response = self.client.get("/api/list_events/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_pages_cover_every_event_once(self):
+        names, cursor = [], None
+        while True:
+            page = self.page(limit=2, **({"cursor": cursor} if cursor else {}))
+            names += [event["name"] for event in page["results"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(names, ["a", "b", "c", "day 2", "day 3", "day 4"])
+
+    def test_filters(self):
+        self.assertEqual([e["name"] for e in self.page(category="Home")["results"]], ["day 3"])
+        self.assertEqual([e["name"] for e in self.page(q="DENT")["results"]], ["day 3"])
+        page = self.page(**{"from": "2025-12-03T00:00:00Z", "to": "2025-12-04T00:00:00Z"})
+        self.assertEqual([e["name"] for e in page["results"]], ["day 3"])
+
+    def test_sparse_fields(self):
+        event = self.page(view="grid", limit=1)["results"][0]
+        self.assertEqual(set(event), {"id", "start_date", "end_date", "name", "category"})
+        event = self.page(fields="name", limit=1)["results"][0]
+        self.assertEqual(set(event), {"id", "name"})
+
+    def test_invalid_parameters(self):
+        for params in ({"cursor": "nope"}, {"fields": "secret"}, {"limit": 0}, {"view": "tiles"}):
+            response = self.client.get("/api/list_events/", params)
+            self.assertEqual(response.status_code, 400, params)
+
+
+class SerializerParityTests(TestCase):
+    """The direct encoding against ``serializers.serialize("json", ...)``."""
+
+    @classmethod
+    def setUpTestData(cls):
+        utc = timezone.utc
+        make_event("meeting", datetime(2025, 12, 2, 9, tzinfo=utc), datetime(2025, 12, 2, 10, tzinfo=utc))
+        Event.objects.create(
+            name="Planning «Q1»",
+            start_date=datetime(2025, 12, 3, 9, 15, 30, tzinfo=utc),
+            end_date=datetime(2025, 12, 3, 10, tzinfo=utc),
+            description='line one\nline "two"',
+            category="",
+        )
+
+    def old(self, events) -> str:
+        return serializers.serialize("json", events, fields=event_serializers.EVENT_FIELDS)
+
+    def new(self, rows) -> bytes:
+        return event_serializers.dumps([event_serializers.to_object(row) for row in rows])
+
+    def test_same_objects(self):
+        queryset = Event.objects.order_by("pk")
+        old = json.loads(self.old(queryset))
+        new = json.loads(event_serializers.serialize_events(queryset))
+        self.assertEqual(new, old)
+        for before, after in zip(old, new):
+            self.assertEqual(list(after), ["model", "pk", "fields"])
+            self.assertEqual(list(after["fields"]), list(before["fields"]))
+        self.assertEqual(new[0]["model"], "db.event")
+        self.assertIsInstance(new[0]["pk"], int)
+        self.assertEqual(new[1]["fields"]["start_date"], "2025-12-03T09:15:30Z")
+
+    def test_same_objects_without_orjson(self):
+        queryset = Event.objects.order_by("pk")
+        with mock.patch.object(event_serializers, "orjson", None):
+            new = event_serializers.serialize_events(queryset)
+        self.assertEqual(json.loads(new), json.loads(self.old(queryset)))
+
+    def test_null_fields(self):
+        # the columns are NOT NULL, but values_list() rows of a nullable
+        # projection must still encode like the instances would
+        start = datetime(2025, 12, 2, 9, tzinfo=timezone.utc)
+        event = Event(pk=7, start_date=start, end_date=None, name="x", description=None, category=None)
+        row = (7, start, None, "x", None, None)
+        old = json.loads(self.old([event]))
+        self.assertEqual(old[0]["fields"]["end_date"], None)
+        self.assertEqual(json.loads(self.new([row])), old)
+        with mock.patch.object(event_serializers, "orjson", None):
+            self.assertEqual(json.loads(self.new([row])), old)
+
+    def test_sub_second_timestamps(self):
+        start = datetime(2025, 12, 2, 9, 0, 0, 123456, tzinfo=timezone.utc)
+        event = Event(pk=7, start_date=start, end_date=start, name="x", description="", category="")
+        row = (7, start, start, "x", "", "")
+        old = json.loads(self.old([event]))[0]["fields"]["start_date"]
+        self.assertEqual(old, "2025-12-02T09:00:00.123Z")
+        new = json.loads(self.new([row]))[0]["fields"]["start_date"]
+        # the same instant, orjson keeps the microseconds
+        self.assertEqual(datetime.fromisoformat(new).replace(microsecond=123000), datetime.fromisoformat(old))
+        with mock.patch.object(event_serializers, "orjson", None):
+            self.assertEqual(json.loads(self.new([row])), json.loads(self.old([event])))
+
+    def test_streamed_like_the_rest(self):
+        queryset = Event.objects.order_by("pk")
+        streamed = b"".join(event_serializers.stream_events(queryset))
+        self.assertEqual(json.loads(streamed), json.loads(self.old(queryset)))
+
+
+class RecurrenceTests(TestCase):
+    def create(self, **extra):
+        data = {
+            "name": "lecture",
+            "start_date": "2025-12-01T09:00:00Z",
+            "end_date": "2025-12-01T10:30:00Z",
+            "category": "Study",
+            "rrule": "FREQ=WEEKLY;BYDAY=MO,WE;COUNT=4",
+            **extra,
+        }
+        response = self.client.post("/api/create_series/", data, content_type="application/json")
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def month(self, year, month):
+        response = self.client.get("/api/get_events/", {"year": year, "month": month})
+        return [event["fields"]["start_date"][:10] for event in response.json()]
+
+    def test_month_view_expands_the_series(self):
+        self.create(exdates=["2025-12-08T09:00:00Z"])
+        self.assertEqual(self.month(2025, 12), ["2025-12-01", "2025-12-03", "2025-12-10"])
+        self.assertEqual(self.month(2026, 1), [])
+
+    def test_range_includes_running_occurrences(self):
+        self.create()
+        response = self.client.get(
+            "/api/get_events_range/",
+            {"from": "2025-12-03T10:00:00Z", "to": "2025-12-08T00:00:00Z"},
+        )
+        events = response.json()
+        self.assertEqual([e["model"] for e in events], ["db.eventseries"])
+        self.assertEqual(events[0]["fields"]["recurrence"], "FREQ=WEEKLY;BYDAY=MO,WE;COUNT=4")
+
+    def test_update_and_delete(self):
+        id = self.create()["id"]
+        response = self.client.patch(
+            f"/api/update_series/?id={id}", {"rrule": "FREQ=DAILY;COUNT=2"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.month(2025, 12), ["2025-12-01", "2025-12-02"])
+        self.client.delete(f"/api/delete_series/?id={id}")
+        self.assertEqual(self.month(2025, 12), [])
+
+    def test_unsupported_rules_are_rejected(self):
+        response = self.client.post(
+            "/api/create_series/",
+            {"name": "x", "start_date": "2025-12-01T09:00:00Z", "end_date": "2025-12-01T10:00:00Z",
+             "category": "Work", "rrule": "FREQ=YEARLY"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class OccurrenceTests(SimpleTestCase):
+    def series(self, rule, start):
+        utc = timezone.utc
+        return EventSeries(
+            start_date=start.replace(tzinfo=utc),
+            end_date=(start + timedelta(hours=1)).replace(tzinfo=utc),
+            exdates=[],
+            **parse_rrule(rule),
+        )
+
+    def starts(self, series, window_start, window_end):
+        utc = timezone.utc
+        return [
+            start.strftime("%Y-%m-%d %H")
+            for start, _ in occurrences(series, window_start.replace(tzinfo=utc), window_end.replace(tzinfo=utc))
+        ]
+
+    def test_endless_series_starts_at_the_window(self):
+        series = self.series("FREQ=DAILY;INTERVAL=3", datetime(2020, 1, 1, 8))
+        self.assertEqual(
+            self.starts(series, datetime(2025, 12, 1), datetime(2025, 12, 8)),
+            ["2025-12-03 08", "2025-12-06 08"],
+        )
+
+    def test_count_is_kept_across_the_jump(self):
+        series = self.series("FREQ=WEEKLY;BYDAY=TU,TH;COUNT=10", datetime(2025, 12, 4, 8))
+        # Thu 4th is the first, then Tue/Thu pairs; the 10th is Tue Jan 6th
+        self.assertEqual(
+            self.starts(series, datetime(2026, 1, 5), datetime(2026, 2, 1)),
+            ["2026-01-06 08"],
+        )
+
+    def test_monthly_skips_short_months(self):
+        series = self.series("FREQ=MONTHLY;UNTIL=20260601", datetime(2026, 1, 31, 8))
+        self.assertEqual(
+            self.starts(series, datetime(2026, 1, 1), datetime(2027, 1, 1)),
+            ["2026-01-31 08", "2026-03-31 08", "2026-05-31 08"],
+        )
+
+
+class OverlapSweepTests(SimpleTestCase):
+    def test_matches_pairwise_comparison(self):
+        existing = [(0, 10), (5, 6), (10, 20), (15, 30), (40, 41)]
+        candidates = [(9, 10), (10, 11), (0, 50), (30, 40), (6, 5)]
+        expected = sorted(
+            (c, e)
+            for c, (c_start, c_end) in enumerate(candidates)
+            for e, (e_start, e_end) in enumerate(existing)
+            if c_start < e_end and e_start < c_end and c_start < c_end
+        )
+        self.assertEqual(overlaps(existing, candidates), expected)
+
+
+def insert(name, day):
+    return (
+        "INSERT INTO event (name, start_date, end_date, description, category) "
+        f"VALUES ('{name}', '2025-12-{day:02d} 09:00:00+00', "
+        f"'2025-12-{day:02d} 10:00:00+00', '', 'Work');"
+    )
+
+
+class AsyncViewTests(TestCase):
+    """The views through the ASGI handler."""
+
+    async def test_create_then_read_month(self):
+        response = await self.async_client.post(
+            "/api/create_event/", {**new_event("standup", 3), "description": ""},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        event = await Event.objects.aget(name="standup")
+
+        response = await self.async_client.get("/api/get_event/", {"id": event.id})
+        self.assertEqual(response.json()["fields"]["name"], "standup")
+
+        response = await self.async_client.get(
+            "/api/get_events/", {"year": 2025, "month": 12, "stream": "true"}
+        )
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertIn(b"standup", body)
+
+    async def test_invalid_month_is_rejected(self):
+        for params in (
+            {"year": 2025, "month": 13},
+            {"year": 2025, "month": "abc"},
+            {"year": 0, "month": 1},
+            {"year": 9999, "month": 12},
+        ):
+            response = await self.async_client.get("/api/get_events/", params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertEqual(response.json()["status"], "error")
+
+    async def test_exec_sql_request_runs_in_a_worker_thread(self):
+        response = await self.async_client.post(
+            "/api/exec_sql_request/",
+            {"actions": [{"id": "action_1", "type": "select", "sql": "SELECT COUNT(*) AS n FROM event"}]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.json()["status"], "success")
+
+
+@override_settings(
+    ROOT_URLCONF=api_settings.ROOT_URLCONF, MIDDLEWARE=api_settings.MIDDLEWARE
+)
+class ApiProfileTests(TestCase):
+    def test_api_is_served_without_the_contrib_middleware(self):
+        make_event("meeting", datetime(2025, 12, 2, 9, tzinfo=timezone.utc), datetime(2025, 12, 2, 10, tzinfo=timezone.utc))
+        response = self.client.get("/api/get_events/", {"year": 2025, "month": 12})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["fields"]["name"], "meeting")
+        self.assertIn("Content-Length", response.headers)
+
+    def test_admin_is_not_routed(self):
+        self.assertEqual(self.client.get("/admin/").status_code, 404)
+
+
+class DbStatsTests(SimpleTestCase):
+    def test_reports_connection_settings(self):
+        stats = self.client.get("/api/db_stats/").json()
+        self.assertEqual(stats["vendor"], "sqlite")
+        self.assertIn("conn_max_age", stats)
+        self.assertIsNone(stats["pool"])
+
+
+class TelemetryTests(TestCase):
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_request_id_is_echoed_or_created(self):
+        response = self.client.get("/api/db_stats/", headers={"X-Request-ID": "abc-123"})
+        self.assertEqual(response["X-Request-ID"], "abc-123")
+
+        response = self.client.get("/api/db_stats/", headers={"X-Request-ID": "x" * 500})
+        self.assertRegex(response["X-Request-ID"], r"^[0-9a-f]{32}$")
+
+    async def test_requests_are_timed_by_route(self):
+        labels = {"method": "GET", "route": "api/get_event/", "status": "400"}
+        before = self.sample("django_request_seconds_count", **labels)
+        await self.async_client.get("/api/get_event/")
+        await self.async_client.get("/api/get_event/")
+        self.assertEqual(self.sample("django_request_seconds_count", **labels), before + 2)
+
+    def test_sql_is_timed_by_action_type(self):
+        before = self.sample("django_sql_action_seconds_count", type="select", status="success")
+        self.client.post(
+            "/api/exec_sql_request/",
+            {"actions": [{"id": "action_1", "type": "select", "sql": "SELECT 1 AS one"}]},
+            content_type="application/json",
+        )
+        after = self.sample("django_sql_action_seconds_count", type="select", status="success")
+        self.assertEqual(after, before + 1)
+
+    def test_metrics_endpoint(self):
+        self.client.get("/api/db_stats/")
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'django_request_seconds_count{method="GET",route="api/db_stats/"', response.content)
+
+    @override_settings(LOG_SAMPLE_RATE=0)
+    def test_failures_are_logged_despite_sampling(self):
+        with self.assertLogs("api", "INFO") as logs:
+            self.client.post(
+                "/api/exec_sql_request/",
+                {"actions": [{"id": "action_1", "type": "delete", "sql": "DELETE FROM no_such_table"}]},
+                content_type="application/json",
+                headers={"X-Request-ID": "req-1"},
+            )
+        self.assertEqual(len(logs.records), 1)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["event"], "exec_sql_request")
+        self.assertEqual(record["request_id"], "req-1")
+        self.assertEqual(record["status"], "error")
+
+
+class ExecSqlRequestTests(TestCase):
+    def execute(self, actions, **extra):
+        response = self.client.post(
+            "/api/exec_sql_request/",
+            {"actions": actions, **extra},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_results_are_returned_per_action(self):
+        result = self.execute(
+            [
+                {"id": "action_1", "type": "create", "sql": insert("a", 1)},
+                {"id": "action_2", "type": "create", "sql": insert("b", 2)},
+                {"id": "action_3", "type": "select", "sql": "SELECT name FROM event ORDER BY name"},
+            ]
+        )
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(
+            [(r["id"], r["status"]) for r in result["results"]],
+            [("action_1", "success"), ("action_2", "success"), ("action_3", "success")],
+        )
+        # the two INSERTs went out as one statement
+        self.assertEqual(result["results"][0]["batched"], 2)
+        self.assertEqual(result["results"][2]["fetched_data"], [{"name": "a"}, {"name": "b"}])
+        self.assertEqual(len(result["touched"]), 2)
+
+    def test_atomic_mode_rolls_back_everything(self):
+        result = self.execute(
+            [
+                {"id": "action_1", "type": "create", "sql": insert("a", 1)},
+                {"id": "action_2", "type": "delete", "sql": "DELETE FROM no_such_table"},
+                {"id": "action_3", "type": "create", "sql": insert("b", 2)},
+            ]
+        )
+        self.assertEqual(
+            [r["status"] for r in result["results"]], ["rolled_back", "error", "skipped"]
+        )
+        self.assertEqual(result["touched"], [])
+        self.assertFalse(Event.objects.exists())
+
+    def test_best_effort_mode_keeps_successful_actions(self):
+        result = self.execute(
+            [
+                {"id": "action_1", "type": "create", "sql": insert("a", 1)},
+                {"id": "action_2", "type": "create", "sql": "INSERT INTO event (name) VALUES ('x')"},
+                {"id": "action_3", "type": "update", "sql": "UPDATE event SET name = 'c' WHERE name = 'a'"},
+            ],
+            mode="best_effort",
+        )
+        self.assertEqual(
+            [r["status"] for r in result["results"]], ["success", "error", "success"]
+        )
+        self.assertEqual(list(Event.objects.values_list("name", flat=True)), ["c"])
+
+    def test_unknown_mode_is_rejected(self):
+        response = self.client.post(
+            "/api/exec_sql_request/",
+            {"actions": [], "mode": "sometimes"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class DeltaSyncTests(TestCase):
+    def setUp(self):
+        utc = timezone.utc
+        self.event = make_event("meeting", datetime(2025, 12, 2, 9, tzinfo=utc), datetime(2025, 12, 2, 10, tzinfo=utc))
+
+    def month(self, **headers):
+        return self.client.get("/api/get_events/", {"year": 2025, "month": 12}, headers=headers)
+
+    def changes(self, since):
+        response = self.client.get("/api/event_changes/", {"since": since})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_month_is_not_sent_again_until_it_changes(self):
+        etag = self.month()["ETag"]
+        response = self.month(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        make_event("call", datetime(2025, 12, 5, 9, tzinfo=timezone.utc), datetime(2025, 12, 5, 10, tzinfo=timezone.utc))
+        self.assertEqual(self.month(if_none_match=etag).status_code, 200)
+        # a write to another month keeps the tag
+        etag = self.month()["ETag"]
+        make_event("later", datetime(2026, 1, 5, 9, tzinfo=timezone.utc), datetime(2026, 1, 5, 10, tzinfo=timezone.utc))
+        self.assertEqual(self.month(if_none_match=etag).status_code, 304)
+
+    def test_event_etag_follows_its_version(self):
+        response = self.client.get("/api/get_event/", {"id": self.event.id})
+        etag = response["ETag"]
+        response = self.client.get("/api/get_event/", {"id": self.event.id}, headers={"if_none_match": etag})
+        self.assertEqual(response.status_code, 304)
+
+        self.client.patch(f"/api/update_event/?id={self.event.id}", {"name": "standup"}, content_type="application/json")
+        response = self.client.get("/api/get_event/", {"id": self.event.id}, headers={"if_none_match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["fields"]["name"], "standup")
+
+    def test_changes_since_a_version(self):
+        self.assertTrue(self.changes(0)["reset"])
+        since = self.changes(0)["version"]
+
+        self.client.post(
+            "/api/exec_sql_request/",
+            {"actions": [
+                {"type": "create", "sql": insert("a", 3)},
+                {"type": "update", "sql": "UPDATE event SET name = 'standup' WHERE name = 'meeting'"},
+            ]},
+            content_type="application/json",
+        )
+        other = Event.objects.get(name="a")
+        feed = self.changes(since)
+        self.assertFalse(feed["reset"])
+        self.assertEqual([event["fields"]["name"] for event in feed["changed"]], ["a", "standup"])
+        self.assertEqual(feed["deleted"], [])
+
+        self.client.delete(f"/api/delete_event/?id={other.id}")
+        feed = self.changes(feed["version"])
+        self.assertEqual((feed["changed"], feed["deleted"]), ([], [other.id]))
+        self.assertFalse(feed["series_changed"])
+        self.assertEqual(self.changes(feed["version"])["changed"], [])
+
+    def test_unknown_versions_reset_the_client(self):
+        version = self.changes(0)["version"]
+        self.assertTrue(self.changes(version + 1)["reset"])
+        self.assertEqual(self.client.get("/api/event_changes/", {"since": "x"}).status_code, 400)
+
+
+class NotifyTests(TestCase):
+    def setUp(self):
+        self.published = []
+
+        def record(sender, months, **kwargs):
+            self.published.append(months)
+
+        events_changed.connect(record, weak=False, dispatch_uid="notify-tests")
+        self.addCleanup(events_changed.disconnect, dispatch_uid="notify-tests")
+
+    def test_writes_publish_the_months_they_touched(self):
+        self.client.post(
+            "/api/create_event/",
+            {"name": "trip", "start_date": "2025-12-30T09:00:00Z", "end_date": "2026-01-02T10:00:00Z",
+             "description": "", "category": "Travel"},
+            content_type="application/json",
+        )
+        self.client.post(
+            "/api/exec_sql_request/",
+            {"actions": [{"type": "create", "sql": insert("a", 3)}]},
+            content_type="application/json",
+        )
+        self.assertEqual(self.published, [["2025-12", "2026-01"], ["2025-12"]])
+
+    def test_reads_and_failed_writes_publish_nothing(self):
+        self.client.post(
+            "/api/exec_sql_request/",
+            {"actions": [
+                {"type": "select", "sql": "SELECT name FROM event"},
+                {"type": "create", "sql": "INSERT INTO event (name) VALUES ('x')"},
+            ]},
+            content_type="application/json",
+        )
+        self.assertEqual(self.published, [])
+
+    def test_endless_series_publish_every_month(self):
+        self.client.post(
+            "/api/create_series/",
+            {"name": "gym", "start_date": "2025-12-01T18:00:00Z", "end_date": "2025-12-01T19:00:00Z",
+             "category": "Sport", "rrule": "FREQ=WEEKLY"},
+            content_type="application/json",
+        )
+        self.assertEqual(self.published, [None])
+
+    def test_touched_months(self):
+        self.assertEqual(
+            touched_months([["2025-11-30 23:00:00+00", datetime(2025, 12, 1, tzinfo=timezone.utc)]]),
+            ["2025-11", "2025-12"],
+        )
+        self.assertIsNone(touched_months([["2020-01-01T00:00:00Z", "2045-01-01T00:00:00Z"]]))
+        self.assertIsNone(touched_months([[None, None]]))
+
+
+class ReminderHeapTests(SimpleTestCase):
+    def test_pops_in_due_order(self):
+        heap = ReminderHeap()
+        heap.schedule(1, 30.0)
+        heap.schedule((7, 100.0), 10.0)
+        heap.schedule(2, 10.0)
+        self.assertEqual(heap.next_due(), 10.0)
+        self.assertEqual(heap.pop_due(30.0), [((7, 100.0), 10.0), (2, 10.0)])
+        self.assertEqual(heap.pop_due(31.0), [(1, 30.0)])
+        self.assertEqual(len(heap), 0)
+
+    def test_rescheduled_and_cancelled_keys_fire_once_or_never(self):
+        heap = ReminderHeap()
+        heap.schedule(1, 10.0)
+        heap.schedule(1, 20.0)
+        heap.schedule(1, 20.0)
+        heap.schedule(2, 15.0)
+        heap.cancel(2)
+        self.assertEqual(heap.next_due(), 20.0)
+        self.assertEqual(heap.pop_due(100.0), [(1, 20.0)])
+
+    def test_stale_entries_are_compacted(self):
+        heap = ReminderHeap()
+        for i in range(5000):
+            heap.schedule(1, float(i))
+        self.assertLess(len(heap._heap), 2000)
+        self.assertEqual(heap.pop_due(1e9), [(1, 4999.0)])
+
+
+class ReminderSchedulerTests(TestCase):
+    NOW = datetime(2026, 1, 5, 8, 0, tzinfo=timezone.utc)
+
+    def setUp(self):
+        self.fired = []
+
+    def at(self, **delta):
+        return (self.NOW + timedelta(**delta)).timestamp()
+
+    def event(self, hours):
+        start = self.NOW + timedelta(hours=hours)
+        return make_event("meeting", start, start + timedelta(hours=1))
+
+    def scheduler(self):
+        scheduler = ReminderScheduler(self.fired.extend, lead=600, horizon=86400, max_delay=3600)
+        scheduler.start(self.at())
+        return scheduler
+
+    def test_loads_the_horizon_only(self):
+        past, soon, later = self.event(-2), self.event(3), self.event(30)
+        scheduler = self.scheduler()
+        self.assertEqual(list(scheduler.reminders._live), [soon.pk])
+        self.assertEqual(scheduler.reminders.due(soon.pk), self.at(hours=3) - 600)
+
+        scheduler.extend(self.at(hours=13))
+        self.assertIn(later.pk, scheduler.reminders)
+        self.assertNotIn(past.pk, scheduler.reminders)
+
+    def test_writes_are_applied_incrementally(self):
+        for hours in range(1, 21):
+            self.event(hours)
+        scheduler = self.scheduler()
+        with self.assertNumQueries(1):
+            scheduler.apply_changes()
+
+        created = self.event(5)
+        moved = Event.objects.filter(start_date=self.NOW + timedelta(hours=1)).get()
+        moved.start_date += timedelta(days=3)
+        moved.save()
+        deleted = Event.objects.filter(start_date=self.NOW + timedelta(hours=2)).get()
+        deleted.delete()
+        # the clock, the changed events and series, and the tombstones of each
+        with self.assertNumQueries(5):
+            scheduler.apply_changes()
+        self.assertIn(created.pk, scheduler.reminders)
+        self.assertNotIn(moved.pk, scheduler.reminders)
+        self.assertNotIn(deleted.pk, scheduler.reminders)
+        self.assertEqual(len(scheduler.reminders), 19)
+
+    def test_series_occurrences(self):
+        response = self.client.post(
+            "/api/create_series/",
+            {"name": "standup", "start_date": "2026-01-01T09:00:00Z",
+             "end_date": "2026-01-01T09:15:00Z", "category": "Work", "rrule": "FREQ=DAILY"},
+            content_type="application/json",
+        )
+        series_id = response.json()["id"]
+        scheduler = self.scheduler()
+        self.assertEqual(list(scheduler.reminders._live), [(series_id, self.at(hours=1))])
+
+        EventSeries.objects.filter(pk=series_id).update(
+            start_date=datetime(2026, 1, 1, 10, tzinfo=timezone.utc),
+            end_date=datetime(2026, 1, 1, 10, 15, tzinfo=timezone.utc),
+        )
+        scheduler.apply_changes()
+        self.assertEqual(list(scheduler.reminders._live), [(series_id, self.at(hours=2))])
+
+        EventSeries.objects.filter(pk=series_id).delete()
+        scheduler.apply_changes()
+        self.assertEqual(len(scheduler.reminders), 0)
+
+    def test_a_restart_resumes_from_the_watermark(self):
+        first, second, third = self.event(1), self.event(2), self.event(3)
+        scheduler = self.scheduler()
+        scheduler.fire_due(self.at(minutes=55))
+        self.assertEqual(self.fired, [(first.pk, self.at(minutes=50))])
+        scheduler.checkpoint()
+
+        # down for two hours: the second reminder is late, the first is not repeated
+        self.fired.clear()
+        scheduler = ReminderScheduler(self.fired.extend, lead=600, horizon=86400, max_delay=3600)
+        scheduler.start(self.at(hours=2))
+        scheduler.fire_due(self.at(hours=2))
+        self.assertEqual(self.fired, [(second.pk, self.at(minutes=110))])
+        self.assertIn(third.pk, scheduler.reminders)
+
+    @override_settings(LOG_SAMPLE_RATE=0)
+    def test_every_reminder_is_written_despite_sampling(self):
+        with self.assertLogs("reminders", "INFO") as logs:
+            send_reminders([(42, self.at()), ((7, self.at(minutes=10)), self.at())])
+        records = [json.loads(record.getMessage()) for record in logs.records]
+        self.assertEqual([record.get("event_id") for record in records], [42, None])
+        self.assertEqual(records[1]["series"], 7)
+        self.assertEqual(records[1]["start"], "2026-01-05 08:10:00+00:00")
+
+
+class StatementTemplateTests(SimpleTestCase):
+    def test_literals_become_parameters(self):
+        template, params = normalize(
+            "SELECT * FROM event WHERE start_date >= NOW() - INTERVAL '7 days' "
+            "AND category = 'Sport' AND EXTRACT(DOW FROM start_date) = 5 LIMIT 10;"
+        )
+        self.assertEqual(
+            template,
+            "SELECT * FROM event WHERE start_date >= NOW() - $1::interval "
+            "AND category = $2 AND EXTRACT(DOW FROM start_date) = $3 LIMIT $4",
+        )
+        self.assertEqual(params, ["7 days", "Sport", "5", "10"])
+
+    def test_same_structure_shares_a_template(self):
+        first, _ = normalize("DELETE FROM event WHERE name = 'Yoga' AND id IN (1, 2)")
+        second, _ = normalize("DELETE FROM event WHERE name = 'Gym' AND id IN (7, 8)")
+        self.assertEqual(first, second)
+
+    def test_positional_numbers_are_kept(self):
+        template, params = normalize("SELECT 1, name FROM event ORDER BY 2")
+        self.assertEqual(template, "SELECT 1, name FROM event ORDER BY 2")
+        self.assertEqual(params, [])
+
+    def test_quotes_are_unescaped(self):
+        _, params = normalize("UPDATE event SET name = 'It''s' WHERE id = 4")
+        self.assertEqual(params, ["It's", "4"])
+
+    def test_unsupported_statements_are_left_alone(self):
+        self.assertIsNone(normalize("CREATE TABLE x (a int)"))
+        self.assertIsNone(normalize("DELETE FROM event; DROP TABLE event"))
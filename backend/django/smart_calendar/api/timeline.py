@@ -0,0 +1,209 @@
+"""Sorted-array interval index over events, used to find free time.
+
+The busy intervals of a window are merged into two parallel lists of
+POSIX timestamps, ``starts`` and ``ends``. Merged intervals never overlap,
+so both lists are sorted and the first interval that can block a moment
+is found with a bisect on ``ends``. Free time is then walked gap by gap,
+intersected with the working hours, which answers "first N free slots of
+duration D" in O(log n + k) for the k gaps visited.
+
+Conflicts between a batch of candidate events and the stored ones are
+found in one sweep over both sets sorted by start, instead of one overlap
+query per candidate.
+"""
+
+import heapq
+import math
+from bisect import bisect_right
+from datetime import datetime, time, timedelta
+from datetime import timezone as dt_timezone
+
+WORKDAYS = frozenset(range(5))
+
+
+class Timeline:
+    def __init__(self, intervals):
+        """`intervals` are (start, end) timestamp pairs sorted by start."""
+        starts, ends = [], []
+        for start, end in intervals:
+            if end <= start:
+                continue
+            if ends and start <= ends[-1]:
+                # overlaps or touches the previous busy interval
+                if end > ends[-1]:
+                    ends[-1] = end
+            else:
+                starts.append(start)
+                ends.append(end)
+        self.starts = starts
+        self.ends = ends
+
+    @classmethod
+    def load(cls, events, window_start: datetime, window_end: datetime, extra=()):
+        """Index the events of a queryset that overlap [window_start, window_end).
+
+        `extra` are more (start, end) datetime pairs sorted by start, e.g.
+        occurrences of recurring events.
+        """
+        rows = (
+            events.filter(start_date__lt=window_end, end_date__gt=window_start)
+            .order_by("start_date")
+            .values_list("start_date", "end_date")
+        )
+        return cls(
+            (start.timestamp(), end.timestamp())
+            for start, end in heapq.merge(rows.iterator(chunk_size=2000), extra)
+        )
+
+    def __len__(self):
+        return len(self.starts)
+
+    def free(self, start: float, end: float):
+        """Yield the free (start, end) gaps inside [start, end)."""
+        # first busy interval that ends after `start`
+        index = bisect_right(self.ends, start)
+        cursor = start
+        while cursor < end:
+            if index == len(self.starts):
+                yield cursor, end
+                return
+            if self.starts[index] > cursor:
+                yield cursor, min(self.starts[index], end)
+            cursor = self.ends[index]
+            index += 1
+
+
+class WorkingHours:
+    def __init__(
+        self,
+        day_start: time = time(9),
+        day_end: time = time(18),
+        weekdays=WORKDAYS,
+        tz=dt_timezone.utc,
+    ):
+        self.day_start = day_start
+        self.day_end = day_end
+        self.weekdays = frozenset(weekdays)
+        self.tz = tz
+
+    def windows(self, start: float, end: float):
+        """Yield the working (start, end) intervals inside [start, end)."""
+        day = datetime.fromtimestamp(start, self.tz).date()
+        last = datetime.fromtimestamp(end, self.tz).date()
+        while day <= last:
+            if day.weekday() in self.weekdays:
+                opens = datetime.combine(day, self.day_start, self.tz).timestamp()
+                closes = datetime.combine(day, self.day_end, self.tz).timestamp()
+                if max(opens, start) < min(closes, end):
+                    yield max(opens, start), min(closes, end)
+            day += timedelta(days=1)
+
+
+def intersect(first, second):
+    """Intersection of two sorted streams of disjoint intervals."""
+    first, second = iter(first), iter(second)
+    a, b = next(first, None), next(second, None)
+    while a is not None and b is not None:
+        low, high = max(a[0], b[0]), min(a[1], b[1])
+        if low < high:
+            yield low, high
+        if a[1] <= b[1]:
+            a = next(first, None)
+        else:
+            b = next(second, None)
+
+
+def free_slots(
+    timeline: Timeline,
+    start: float,
+    end: float,
+    duration: float,
+    count: int,
+    hours: WorkingHours = None,
+    step: float = 900,
+):
+    """First `count` free (start, end) slots of `duration` seconds.
+
+    Slots start on multiples of `step` seconds; a long gap yields several
+    slots, back to back when `duration` is a multiple of `step`.
+    """
+    gaps = timeline.free(start, end)
+    if hours is not None:
+        gaps = intersect(gaps, hours.windows(start, end))
+
+    slots = []
+    for gap_start, gap_end in gaps:
+        slot = math.ceil(gap_start / step) * step
+        while slot + duration <= gap_end:
+            slots.append((slot, slot + duration))
+            if len(slots) == count:
+                return slots
+            # the next slot starts on the grid again, not right after this one
+            slot = math.ceil((slot + duration) / step) * step
+    return slots
+
+
+def overlaps(existing, candidates):
+    """(candidate index, existing index) pairs of overlapping intervals.
+
+    Both arguments are sequences of (start, end) pairs; intervals are
+    half-open, so touching ones do not overlap. Sweep line over the starts
+    with a min-heap of the still open intervals of each set, in
+    O((n + m) log(n + m) + k) for k overlaps.
+    """
+    # candidates sort before stored events starting at the same moment;
+    # either order finds the pair
+    points = sorted(
+        [(start, 0, index) for index, (start, _) in enumerate(candidates)]
+        + [(start, 1, index) for index, (start, _) in enumerate(existing)]
+    )
+    sources = (candidates, existing)
+    open_ = ([], [])
+    pairs = []
+    for start, kind, index in points:
+        end = sources[kind][index][1]
+        if end <= start:
+            continue
+        for heap in open_:
+            while heap and heap[0][0] <= start:
+                heapq.heappop(heap)
+        # everything still open on the other side ends after `start`
+        for _, other in open_[1 - kind]:
+            pairs.append((index, other) if kind == 0 else (other, index))
+        heapq.heappush(open_[kind], (end, index))
+    pairs.sort()
+    return pairs
+
+
+def find_conflicts(events, candidates):
+    """Stored events overlapping each candidate.
+
+    `candidates` are dicts with aware ``start_date``/``end_date`` and an
+    optional ``id`` of the event they replace, which is never reported as
+    its own conflict. Returns (candidate index, event row) pairs, the rows
+    being (id, name, start_date, end_date) tuples.
+    """
+    if not candidates:
+        return []
+    rows = list(
+        events.filter(
+            start_date__lt=max(c["end_date"] for c in candidates),
+            end_date__gt=min(c["start_date"] for c in candidates),
+        ).values_list("id", "start_date", "end_date")
+    )
+    pairs = [
+        (candidate, rows[index])
+        for candidate, index in overlaps(
+            [(row[1].timestamp(), row[2].timestamp()) for row in rows],
+            [(c["start_date"].timestamp(), c["end_date"].timestamp()) for c in candidates],
+        )
+        if rows[index][0] != candidates[candidate].get("id")
+    ]
+    # names only for the few rows that conflict
+    names = dict(
+        events.filter(id__in={row[0] for _, row in pairs}).values_list("id", "name")
+    )
+    return [
+        (candidate, (id, names[id], start_date, end_date))
+        for candidate, (id, start_date, end_date) in pairs
+    ]
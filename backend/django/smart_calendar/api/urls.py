@@ -1,12 +1,26 @@
 from django.urls import path
 
 from .views import (
+    bulk_create,
+    bulk_delete,
+    bulk_update,
+    check_conflicts,
     create_event,
+    create_series,
+    db_stats,
     delete_event,
+    delete_series,
+    event_changes,
     exec_sql_request,
+    find_free_slots,
     get_event,
     get_events,
+    get_events_range,
+    list_events,
+    recurrence_stats,
+    sql_template_stats,
     update_event,
+    update_series,
 )
 
 urlpatterns = [
@@ -15,9 +29,27 @@ urlpatterns = [
         exec_sql_request,
         name="exec-sql-request",
     ),
+    path(
+        "sql_template_stats/",
+        sql_template_stats,
+        name="sql-template-stats",
+    ),
+    path("db_stats/", db_stats, name="db-stats"),
     path("get_events/", get_events, name="get_events"),
+    path("get_events_range/", get_events_range, name="get_events_range"),
     path("get_event/", get_event, name="get_event"),
+    path("event_changes/", event_changes, name="event_changes"),
+    path("list_events/", list_events, name="list_events"),
+    path("free_slots/", find_free_slots, name="free_slots"),
     path("create_event/", create_event, name="create_event"),
     path("update_event/", update_event, name="update_event"),
     path("delete_event/", delete_event, name="delete_event"),
+    path("check_conflicts/", check_conflicts, name="check_conflicts"),
+    path("create_series/", create_series, name="create_series"),
+    path("update_series/", update_series, name="update_series"),
+    path("delete_series/", delete_series, name="delete_series"),
+    path("recurrence_stats/", recurrence_stats, name="recurrence-stats"),
+    path("bulk_create_events/", bulk_create, name="bulk_create_events"),
+    path("bulk_update_events/", bulk_update, name="bulk_update_events"),
+    path("bulk_delete_events/", bulk_delete, name="bulk_delete_events"),
 ]
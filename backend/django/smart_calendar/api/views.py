@@ -1,16 +1,46 @@
 import json
+import logging
+from datetime import datetime
+from datetime import timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
-from db.models import Event
-from django.core import serializers
+from asgiref.sync import sync_to_async
+from db.models import Event, EventSeries
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import DatabaseError, connection
 from django.db.models import ProtectedError
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime, parse_time
 from django.views.decorators.csrf import csrf_exempt
 
+from .bulk import bulk_create_events, bulk_delete_events, bulk_update_events, clean
+from .changes import achanges, aversion_etag, not_modified, row_etag, tagged
+from .executor import ATOMIC, MODES, execute_actions
+from .listing import DEFAULT_LIMIT, MAX_LIMIT, alist_page, decode_cursor, filter_events, parse_fields
+from .notify import apublish
+from .recurrence import (
+    RuleError,
+    aexpand_series,
+    expansions,
+    occurrences,
+    parse_exdate,
+    parse_rrule,
+    series_end,
+    series_in_window,
+)
+from .serializers import aevents_response, dumps, event_response, versioned_rows
+from .statements import template_stats
+from .telemetry import log
+from .timeline import Timeline, WorkingHours, find_conflicts, free_slots
+
+MAX_FREE_SLOTS = 100
+MAX_CONFLICT_CANDIDATES = 10000
+MAX_BATCH_ITEMS = 10000
+
 
 @csrf_exempt
-def get_events(request):
+async def get_events(request):
     year = request.GET.get("year")
     month = request.GET.get("month")
     if not year or not month:
@@ -18,33 +48,290 @@ def get_events(request):
             {"status": "error", "message": "There is year or month"}, status=400
         )
 
+    # a half-open range instead of __year/__month so the start_date index
+    # can be used
+    try:
+        year, month = int(year), int(month)
+        month_start = timezone.make_aware(datetime(year, month, 1))
+        if month == 12:
+            month_end = timezone.make_aware(datetime(year + 1, 1, 1))
+        else:
+            month_end = timezone.make_aware(datetime(year, month + 1, 1))
+    except (ValueError, OverflowError):
+        return JsonResponse(
+            {"status": "error", "message": f"There is no month {month} of {year}"}, status=400
+        )
+
+    events = Event.objects.filter(start_date__gte=month_start, start_date__lt=month_end)
+    # every series can have occurrences in the month
+    etag = await aversion_etag(events, EventSeries.objects.all())
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+
+    # occurrences of recurring events starting in the month come after them
+    recurring = await aexpand_series(month_start, month_end, starting_only=True)
+
+    response = await aevents_response(
+        events, stream=request.GET.get("stream") == "true", extra=recurring
+    )
+    return tagged(response, etag)
+
+
+def parse_moment(value):
+    moment = parse_datetime(value) if value else None
+    if moment is not None and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_candidate(data, id=None):
+    """Candidate event for find_conflicts, raises ValueError."""
+    start_date = data.get("start_date")
+    end_date = data.get("end_date")
+    if isinstance(start_date, str):
+        start_date = parse_moment(start_date)
+    if isinstance(end_date, str):
+        end_date = parse_moment(end_date)
+    if (
+        not isinstance(start_date, datetime)
+        or not isinstance(end_date, datetime)
+        or end_date <= start_date
+    ):
+        raise ValueError(f"There is no valid start_date/end_date. [{start_date}, {end_date}]")
+    id = data.get("id", id)
+    return {
+        "id": int(id) if id is not None else None,
+        "start_date": start_date,
+        "end_date": end_date,
+    }
+
+
+def conflict_list(conflicts):
+    return [
+        {
+            "candidate": candidate,
+            "id": id,
+            "name": name,
+            "start_date": start_date,
+            "end_date": end_date,
+        }
+        for candidate, (id, name, start_date, end_date) in conflicts
+    ]
+
+
+async def conflict_response(candidate):
+    """409 response if the candidate overlaps stored events, else None."""
+    conflicts = await sync_to_async(find_conflicts)(Event.objects.all(), [candidate])
+    if not conflicts:
+        return None
+    return JsonResponse(
+        {
+            "status": "error",
+            "message": "The event overlaps existing events",
+            "conflicts": conflict_list(conflicts),
+        },
+        status=409,
+    )
+
+
+@csrf_exempt
+async def get_events_range(request):
+    """Events overlapping the half-open window [from, to)."""
+    try:
+        window_start = parse_moment(request.GET.get("from"))
+        window_end = parse_moment(request.GET.get("to"))
+    except ValueError:
+        window_start = window_end = None
+    if window_start is None or window_end is None or window_end <= window_start:
+        return JsonResponse(
+            {"status": "error", "message": "There is no valid from/to window"},
+            status=400,
+        )
+
     events = Event.objects.filter(
-        start_date__year=int(year), start_date__month=int(month)
+        start_date__lt=window_end, end_date__gt=window_start
+    ).order_by("start_date", "id")
+
+    return await aevents_response(
+        events,
+        stream=request.GET.get("stream") == "true",
+        extra=await aexpand_series(window_start, window_end),
+    )
+
+
+def parse_list_query(params):
+    """Validated arguments of list_events, raises ValueError."""
+    try:
+        limit = int(params.get("limit", DEFAULT_LIMIT))
+    except ValueError:
+        raise ValueError("limit must be a number")
+    if not 0 < limit <= MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+    window_start = parse_moment(params.get("from"))
+    window_end = parse_moment(params.get("to"))
+    if (params.get("from") and window_start is None) or (params.get("to") and window_end is None):
+        raise ValueError("There is no valid from/to window")
+    cursor = params.get("cursor")
+    return {
+        "limit": limit,
+        "cursor": decode_cursor(cursor) if cursor else None,
+        "categories": [c for c in params.get("category", "").split(",") if c],
+        "text": params.get("q", "").strip(),
+        "fields": parse_fields(params.get("fields"), params.get("view")),
+        "window_start": window_start,
+        "window_end": window_end,
+    }
+
+
+@csrf_exempt
+async def list_events(request):
+    """One page of events ordered by (start_date, id).
+
+    Pass the returned `next_cursor` as `cursor` for the next page. Filters:
+    `category` (comma separated), `q` (text in name or description),
+    `from`/`to` on the start; `fields` or `view=grid` pick the columns.
+    """
+    try:
+        query = parse_list_query(request.GET)
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": f"{e}"}, status=400)
+
+    events = filter_events(Event.objects.all(), query["categories"], query["text"])
+    if query["window_start"] is not None:
+        events = events.filter(start_date__gte=query["window_start"])
+    if query["window_end"] is not None:
+        events = events.filter(start_date__lt=query["window_end"])
+
+    return HttpResponse(
+        await alist_page(events, query["fields"], query["limit"], query["cursor"]),
+        content_type="application/json",
+    )
+
+
+def parse_free_slots_query(params):
+    """Validated arguments of find_free_slots, raises ValueError."""
+    window_start = parse_moment(params.get("from"))
+    window_end = parse_moment(params.get("to"))
+    if window_start is None or window_end is None or window_end <= window_start:
+        raise ValueError("There is no valid from/to window")
+
+    duration = int(params.get("duration", 60))
+    count = int(params.get("count", 5))
+    step = int(params.get("step", 15))
+    if duration <= 0 or step <= 0 or not 0 < count <= MAX_FREE_SLOTS:
+        raise ValueError(
+            f"duration and step must be positive, count between 1 and {MAX_FREE_SLOTS}"
+        )
+
+    day_start = parse_time(params.get("day_start", "09:00"))
+    day_end = parse_time(params.get("day_end", "18:00"))
+    if day_start is None or day_end is None or day_end <= day_start:
+        raise ValueError("There are no valid working hours")
+    weekdays = {int(day) for day in params.get("weekdays", "0,1,2,3,4").split(",") if day}
+    if not weekdays <= set(range(7)):
+        raise ValueError("Weekdays are numbers from 0 (Monday) to 6 (Sunday)")
+    try:
+        tz = ZoneInfo(params["tz"]) if params.get("tz") else timezone.get_current_timezone()
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"There is no time zone {params['tz']}")
+
+    return {
+        "window_start": window_start,
+        "window_end": window_end,
+        "duration": duration * 60,
+        "count": count,
+        "step": step * 60,
+        "hours": WorkingHours(day_start, day_end, weekdays, tz),
+    }
+
+
+def busy_timeline(window_start, window_end):
+    """Timeline of the stored events and occurrences in the window."""
+    recurring = sorted(
+        span
+        for series in series_in_window(window_start, window_end)
+        for span in occurrences(series, window_start, window_end)
+    )
+    return Timeline.load(Event.objects.all(), window_start, window_end, extra=recurring)
+
+
+@csrf_exempt
+async def find_free_slots(request):
+    """First `count` free slots of `duration` minutes in [from, to).
+
+    Only slots inside the working hours (`day_start`-`day_end` on
+    `weekdays`, in `tz`) are returned; slots start on multiples of `step`
+    minutes.
+    """
+    try:
+        query = parse_free_slots_query(request.GET)
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": f"{e}"}, status=400)
+
+    timeline = await sync_to_async(busy_timeline)(query["window_start"], query["window_end"])
+    slots = free_slots(
+        timeline,
+        query["window_start"].timestamp(),
+        query["window_end"].timestamp(),
+        query["duration"],
+        query["count"],
+        hours=query["hours"],
+        step=query["step"],
     )
 
-    json_string = serializers.serialize("json", events)
-    result = json.loads(json_string)
-    return JsonResponse(result, safe=False)
+    return JsonResponse(
+        {
+            "status": "success",
+            "slots": [
+                [
+                    datetime.fromtimestamp(start, dt_timezone.utc),
+                    datetime.fromtimestamp(end, dt_timezone.utc),
+                ]
+                for start, end in slots
+            ],
+        }
+    )
 
 
 @csrf_exempt
-def get_event(request):
-    id = request.get("id")
+async def get_event(request):
+    id = request.GET.get("id")
     if not id:
         return JsonResponse(
             {"status": "error", "message": "There is no id"}, status=400
         )
 
-    events = Event.objects.get(id=int(id))
+    event = await versioned_rows(Event.objects.filter(id=int(id))).afirst()
+    if event is None:
+        return JsonResponse(
+            {"status": "error", "message": f"There is no row with id {id}"}, status=400
+        )
+
+    etag = row_etag(event[0], event[-1])
+    return not_modified(request, etag) or tagged(event_response(event[:-1]), etag)
 
-    json_string = serializers.serialize("json", events)
-    result = json.loads(json_string)
-    return JsonResponse(result, safe=False)
+
+@csrf_exempt
+async def event_changes(request):
+    """Events changed and deleted after the version `since`.
+
+    Answers the current `version` to pass as `since` next time, the
+    changed events (with their version) and the ids of deleted ones; with
+    `"reset": true` the client refetches the months it shows instead.
+    """
+    try:
+        since = int(request.GET.get("since", ""))
+    except ValueError:
+        return JsonResponse(
+            {"status": "error", "message": "There is no valid since version"}, status=400
+        )
+
+    return HttpResponse(dumps(await achanges(since)), content_type="application/json")
 
 
 @csrf_exempt
-def delete_event(request):
-    print(request)
+async def delete_event(request):
     id = request.GET.get("id")
     if not id:
         return JsonResponse(
@@ -52,7 +339,9 @@ def delete_event(request):
         )
 
     try:
-        Event.objects.filter(id=id).delete()
+        events = Event.objects.filter(id=id)
+        touched = [span async for span in events.values_list("start_date", "end_date")]
+        await events.adelete()
     except ObjectDoesNotExist:
         return JsonResponse(
             {"status": "error", "message": f"There is no row with id {id}"}, status=400
@@ -62,11 +351,12 @@ def delete_event(request):
             {"status": "error", "message": f"Failed to delete row {id}"}, status=400
         )
 
-    return JsonResponse({"status": "success"}, status=200)
+    await apublish(touched)
+    return JsonResponse({"status": "success", "touched": touched}, status=200)
 
 
 @csrf_exempt
-def create_event(request):
+async def create_event(request):
     data = json.loads(request.body)
     name = data.get("name")
     start_date = data.get("start_date")
@@ -82,8 +372,17 @@ def create_event(request):
             status=400,
         )
 
+    if request.GET.get("check_conflicts") == "true":
+        try:
+            candidate = parse_candidate(data)
+        except ValueError as e:
+            return JsonResponse({"status": "error", "message": f"{e}"}, status=400)
+        conflict = await conflict_response(candidate)
+        if conflict is not None:
+            return conflict
+
     try:
-        Event.objects.create(
+        await Event.objects.acreate(
             name=name,
             start_date=start_date,
             end_date=end_date,
@@ -97,11 +396,13 @@ def create_event(request):
     except Exception as e:
         return JsonResponse({"status": "error", "message": f"{e}"}, status=400)
 
-    return JsonResponse({"status": "success"}, status=200)
+    touched = [[start_date, end_date]]
+    await apublish(touched)
+    return JsonResponse({"status": "success", "touched": touched}, status=200)
 
 
 @csrf_exempt
-def update_event(request):
+async def update_event(request):
     id = request.GET.get("id")
     if not id:
         return JsonResponse(
@@ -116,7 +417,8 @@ def update_event(request):
     category = data.get("category")
 
     try:
-        event = Event.objects.get(id=id)
+        event = await Event.objects.aget(id=id)
+        touched = [[event.start_date, event.end_date]]
         if name:
             event.name = name
         if start_date:
@@ -128,7 +430,16 @@ def update_event(request):
         if category:
             event.category = category
 
-        event.save()
+        if request.GET.get("check_conflicts") == "true":
+            candidate = parse_candidate(
+                {"start_date": event.start_date, "end_date": event.end_date}, id=event.id
+            )
+            conflict = await conflict_response(candidate)
+            if conflict is not None:
+                return conflict
+
+        await event.asave()
+        touched.append([event.start_date, event.end_date])
 
     except ObjectDoesNotExist:
         return JsonResponse(
@@ -138,17 +449,210 @@ def update_event(request):
         return JsonResponse(
             {"status": "error", "message": f"Failed to delete row {id}"}, status=400
         )
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": f"{e}"}, status=400)
+
+    await apublish(touched)
+    return JsonResponse({"status": "success", "touched": touched}, status=200)
+
+
+def series_range(series):
+    """[start, end] of a whole series for "touched", None if endless."""
+    if series.series_end is None:
+        return None
+    return [series.start_date, series.series_end]
+
+
+async def save_series(series, data, partial):
+    """Apply the event fields, rrule and exdates of `data`, raises ValueError."""
+    for name, value in clean(data, partial=partial).items():
+        setattr(series, name, value)
+    if "rrule" in data or not partial:
+        for name, value in parse_rrule(data.get("rrule")).items():
+            setattr(series, name, value)
+    if "exdates" in data:
+        if not isinstance(data["exdates"], list):
+            raise ValueError("exdates must be a list")
+        series.exdates = [parse_exdate(value).isoformat() for value in data["exdates"]]
+    if series.end_date <= series.start_date:
+        raise ValueError("end_date must be after start_date")
+    series.series_end = series_end(series)
+    await series.asave()
 
-    return JsonResponse({"status": "success"}, status=200)
 
+@csrf_exempt
+async def create_series(request):
+    """Create a recurring event: event fields plus "rrule" and "exdates"."""
+    try:
+        data = json.loads(request.body)
+        series = EventSeries()
+        await save_series(series, data, partial=False)
+    except json.JSONDecodeError:
+        return JsonResponse(
+            {"status": "error", "message": "Invalid dictionary"}, status=400
+        )
+    except (AttributeError, RuleError, ValueError) as e:
+        return JsonResponse({"status": "error", "message": f"{e}"}, status=400)
+    except DatabaseError:
+        return JsonResponse(
+            {"status": "error", "message": "Database error"}, status=400
+        )
 
-def dictfetchall(cursor):
-    columns = [col[0] for col in cursor.description]
-    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    touched = series_range(series)
+    touched = touched and [touched]
+    await apublish(touched)
+    return JsonResponse(
+        {"status": "success", "id": series.id, "touched": touched}, status=200
+    )
 
 
 @csrf_exempt
-def exec_sql_request(request):
+async def update_series(request):
+    id = request.GET.get("id")
+    if not id:
+        return JsonResponse(
+            {"status": "error", "message": "There is no id"}, status=400
+        )
+
+    try:
+        data = json.loads(request.body)
+        series = await EventSeries.objects.aget(id=id)
+        old = series_range(series)
+        await save_series(series, data, partial=True)
+    except json.JSONDecodeError:
+        return JsonResponse(
+            {"status": "error", "message": "Invalid dictionary"}, status=400
+        )
+    except ObjectDoesNotExist:
+        return JsonResponse(
+            {"status": "error", "message": f"There is no row with id {id}"}, status=400
+        )
+    except (AttributeError, RuleError, ValueError) as e:
+        return JsonResponse({"status": "error", "message": f"{e}"}, status=400)
+
+    new = series_range(series)
+    touched = [old, new] if old and new else None
+    await apublish(touched)
+    return JsonResponse({"status": "success", "touched": touched}, status=200)
+
+
+@csrf_exempt
+async def delete_series(request):
+    id = request.GET.get("id")
+    if not id:
+        return JsonResponse(
+            {"status": "error", "message": "There is no id"}, status=400
+        )
+
+    series = await EventSeries.objects.filter(id=id).afirst()
+    if series is None:
+        return JsonResponse(
+            {"status": "error", "message": f"There is no row with id {id}"}, status=400
+        )
+    touched = series_range(series)
+    touched = touched and [touched]
+    await series.adelete()
+    await apublish(touched)
+    return JsonResponse({"status": "success", "touched": touched}, status=200)
+
+
+@csrf_exempt
+async def recurrence_stats(request):
+    return JsonResponse(expansions.stats())
+
+
+@csrf_exempt
+async def check_conflicts(request):
+    """Every stored event overlapping each event of a batch.
+
+    The body is {"events": [{"start_date", "end_date", "id"?}, ...]}; an
+    ``id`` marks the candidate as a new version of that event, which then
+    does not conflict with itself.
+    """
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse(
+            {"status": "error", "message": "Invalid dictionary"}, status=400
+        )
+
+    events = data.get("events") if isinstance(data, dict) else None
+    if not isinstance(events, list) or len(events) > MAX_CONFLICT_CANDIDATES:
+        return JsonResponse(
+            {
+                "status": "error",
+                "message": f"There is no list of at most {MAX_CONFLICT_CANDIDATES} events",
+            },
+            status=400,
+        )
+    try:
+        candidates = [parse_candidate(event) for event in events]
+    except (AttributeError, TypeError, ValueError) as e:
+        return JsonResponse({"status": "error", "message": f"{e}"}, status=400)
+
+    conflicts = await sync_to_async(find_conflicts)(Event.objects.all(), candidates)
+    return JsonResponse({"status": "success", "conflicts": conflict_list(conflicts)})
+
+
+def parse_batch(request, key):
+    """(items, mode) of a batch request body, raises ValueError."""
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        raise ValueError("Invalid dictionary")
+    items = data.get(key) if isinstance(data, dict) else None
+    mode = data.get("mode", ATOMIC) if isinstance(data, dict) else None
+    if not isinstance(items, list) or len(items) > MAX_BATCH_ITEMS or mode not in MODES:
+        raise ValueError(
+            f"There is no list of at most {MAX_BATCH_ITEMS} {key} or no such mode"
+        )
+    return items, mode
+
+
+@csrf_exempt
+async def bulk_create(request):
+    """Create {"events": [...]} in one transaction, one result per event."""
+    try:
+        items, mode = parse_batch(request, "events")
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": f"{e}"}, status=400)
+    # transactions are sync only, the whole batch runs in a worker thread
+    result = await sync_to_async(bulk_create_events)(
+        items, mode, check_conflicts=request.GET.get("check_conflicts") == "true"
+    )
+    await apublish(result["touched"])
+    return JsonResponse(result)
+
+
+@csrf_exempt
+async def bulk_update(request):
+    """Update {"events": [{"id", ...changed fields}]} in one transaction."""
+    try:
+        items, mode = parse_batch(request, "events")
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": f"{e}"}, status=400)
+    # transactions are sync only, the whole batch runs in a worker thread
+    result = await sync_to_async(bulk_update_events)(
+        items, mode, check_conflicts=request.GET.get("check_conflicts") == "true"
+    )
+    await apublish(result["touched"])
+    return JsonResponse(result)
+
+
+@csrf_exempt
+async def bulk_delete(request):
+    """Delete {"ids": [...]} with a single DELETE statement."""
+    try:
+        ids, mode = parse_batch(request, "ids")
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": f"{e}"}, status=400)
+    result = await sync_to_async(bulk_delete_events)(ids, mode)
+    await apublish(result["touched"])
+    return JsonResponse(result)
+
+
+@csrf_exempt
+async def exec_sql_request(request):
     raw_data = request.body
     try:
         data_dict = json.loads(raw_data)
@@ -156,53 +660,45 @@ def exec_sql_request(request):
         return JsonResponse(
             {"status": "error", "message": "Invalid dictionary"}, status=400
         )
-    print(data_dict)
-    result = {}
-
-    for action in data_dict["actions"]:
-        type_sql_request = action["type"]
-
-        sql_request = action["sql"]
-
-        with connection.cursor() as cursor:
-            match type_sql_request:
-                case "select":
-                    cursor.execute(sql_request)
-                    result["fetched_data"] = dictfetchall(cursor)
-
-                case "create":
-                    try:
-                        cursor.execute(sql_request)
-                        result["message"] = "Insert executed successfully"
-                    except Exception as e:
-                        result["error"] = str(e)
-                case "update":
-                    try:
-                        cursor.execute(sql_request)
-                        result["message"] = (
-                            f"Update executed. Rows affected: {cursor.rowcount}"
-                        )
-                    except Exception as e:
-                        result["error"] = str(e)
-                case "delete":
-                    try:
-                        cursor.execute(sql_request)
-                        result["message"] = (
-                            f"Delete executed. Rows affected: {cursor.rowcount}"
-                        )
-                    except Exception as e:
-                        result["error"] = str(e)
-                case "recommendation":
-                    try:
-                        cursor.execute(sql_request)
-                        result["message"] = "reccomendation success"
-                        result["fetched_data"] = dictfetchall(cursor)
-                    except Exception as e:
-                        result["error"] = str(e)
-                case _:
-                    result["error"] = {
-                        "message": "Error: No such method",
-                        "method": type_sql_request,
-                    }
 
+    actions = data_dict.get("actions")
+    mode = data_dict.get("mode", ATOMIC)
+    if not isinstance(actions, list) or mode not in MODES:
+        return JsonResponse(
+            {"status": "error", "message": "There are no actions or no such mode"},
+            status=400,
+        )
+
+    # one transaction on one cursor, run in a worker thread like the async ORM
+    result = await sync_to_async(execute_actions)(actions, mode)
+    log(
+        "exec_sql_request",
+        logging.WARNING if result["status"] == "error" else logging.INFO,
+        mode=mode,
+        actions=[action.get("type") for action in actions],
+        status=result["status"],
+        errors=[r["error"] for r in result["results"] if r["status"] == "error"],
+    )
+    # select and recommendation actions touch nothing and publish nothing
+    await apublish(result["touched"])
     return JsonResponse(result)
+
+
+@csrf_exempt
+async def sql_template_stats(request):
+    return JsonResponse(template_stats())
+
+
+@csrf_exempt
+async def db_stats(request):
+    """Connection settings and, with DB_POOL, the pool's usage counters."""
+    pool = connection.pool if connection.vendor == "postgresql" else None
+    return JsonResponse(
+        {
+            "vendor": connection.vendor,
+            "conn_max_age": connection.settings_dict["CONN_MAX_AGE"],
+            "health_checks": connection.settings_dict["CONN_HEALTH_CHECKS"],
+            # pool_size, pool_available, requests_waiting, requests_wait_ms, ...
+            "pool": pool.get_stats() if pool is not None else None,
+        }
+    )
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0002_event_date_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventSeries',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False, verbose_name='id of a series')),
+                ('start_date', models.DateTimeField(verbose_name='start of the first occurrence')),
+                ('end_date', models.DateTimeField(verbose_name='end of the first occurrence')),
+                ('name', models.TextField(verbose_name='name of an event')),
+                ('description', models.TextField(default='', verbose_name='description of an event')),
+                ('category', models.TextField(verbose_name='category of an event')),
+                ('frequency', models.CharField(choices=[('DAILY', 'daily'), ('WEEKLY', 'weekly'), ('MONTHLY', 'monthly')], max_length=7)),
+                ('interval', models.PositiveIntegerField(default=1)),
+                ('weekdays', models.CharField(blank=True, default='', max_length=13)),
+                ('until', models.DateTimeField(blank=True, null=True)),
+                ('count', models.PositiveIntegerField(blank=True, null=True)),
+                ('exdates', models.JSONField(blank=True, default=list)),
+                ('series_end', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'recurring event',
+                'verbose_name_plural': 'recurring events',
+                'db_table': 'event_series',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['start_date'], name='event_series_start_idx'), models.Index(fields=['series_end'], name='event_series_end_idx')],
+            },
+        ),
+    ]
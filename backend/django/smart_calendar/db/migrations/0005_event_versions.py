@@ -0,0 +1,177 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:05
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+# Versions are given by triggers rather than by Django so the SQL the model
+# writes through exec_sql_request is versioned as well. Every changed row
+# bumps the single row of event_clock and takes its value; a deleted row
+# leaves a tombstone with its own version.
+TABLES = [("event", "event"), ("event_series", "series")]
+EVENT_COLUMNS = ["start_date", "end_date", "name", "description", "category"]
+COLUMNS = {
+    "event": EVENT_COLUMNS,
+    "event_series": EVENT_COLUMNS
+    + ["frequency", "interval", "weekdays", "until", "count", "exdates", "series_end"],
+}
+
+POSTGRES_FUNCTIONS = """
+CREATE OR REPLACE FUNCTION event_clock_tick() RETURNS bigint AS $$
+    INSERT INTO event_clock (id, version) VALUES (1, 1)
+    ON CONFLICT (id) DO UPDATE SET version = event_clock.version + 1
+    RETURNING version
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION event_stamp_version() RETURNS trigger AS $$
+BEGIN
+    NEW.version := event_clock_tick();
+    NEW.updated_at := now();
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION event_record_tombstone() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO event_tombstone (source, row_id, version, start_date, end_date, deleted_at)
+    VALUES (TG_ARGV[0], OLD.id, event_clock_tick(), OLD.start_date, OLD.end_date, now());
+    RETURN OLD;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+POSTGRES_TRIGGERS = """
+CREATE TRIGGER {table}_stamp_version BEFORE INSERT OR UPDATE ON {table}
+    FOR EACH ROW EXECUTE FUNCTION event_stamp_version();
+CREATE TRIGGER {table}_tombstone AFTER DELETE ON {table}
+    FOR EACH ROW EXECUTE FUNCTION event_record_tombstone('{source}');
+"""
+
+# SQLite has no BEFORE triggers that can change NEW, the row is stamped
+# right after the write instead; the update trigger only watches the data
+# columns, so stamping a row does not fire it again
+SQLITE_TICK = (
+    "INSERT INTO event_clock (id, version) VALUES (1, 1) "
+    "ON CONFLICT (id) DO UPDATE SET version = version + 1;"
+)
+SQLITE_NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+SQLITE_TRIGGERS = [
+    """
+CREATE TRIGGER {table}_stamp_{operation} AFTER {operation}{columns} ON {table}
+BEGIN
+    """ + SQLITE_TICK + """
+    UPDATE {table}
+    SET version = (SELECT version FROM event_clock WHERE id = 1), updated_at = """ + SQLITE_NOW + """
+    WHERE id = NEW.id;
+END
+""",
+    """
+CREATE TRIGGER {table}_tombstone AFTER DELETE ON {table}
+BEGIN
+    """ + SQLITE_TICK + """
+    INSERT INTO event_tombstone (source, row_id, version, start_date, end_date, deleted_at)
+    VALUES ('{source}', OLD.id, (SELECT version FROM event_clock WHERE id = 1),
+            OLD.start_date, OLD.end_date, """ + SQLITE_NOW + """);
+END
+""",
+]
+
+
+def create_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(POSTGRES_FUNCTIONS)
+        for table, source in TABLES:
+            schema_editor.execute(POSTGRES_TRIGGERS.format(table=table, source=source))
+    elif vendor == "sqlite":
+        for table, source in TABLES:
+            columns = ", ".join(f'"{column}"' for column in COLUMNS[table])
+            for operation, watched in (("INSERT", ""), ("UPDATE", f" OF {columns}")):
+                schema_editor.execute(
+                    SQLITE_TRIGGERS[0].format(table=table, operation=operation, columns=watched)
+                )
+            schema_editor.execute(SQLITE_TRIGGERS[1].format(table=table, source=source))
+
+
+def drop_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table, _ in TABLES:
+        if vendor == "postgresql":
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_stamp_version ON {table}")
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_tombstone ON {table}")
+        elif vendor == "sqlite":
+            for name in ("stamp_INSERT", "stamp_UPDATE", "tombstone"):
+                schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_{name}")
+    if vendor == "postgresql":
+        schema_editor.execute("DROP FUNCTION IF EXISTS event_record_tombstone()")
+        schema_editor.execute("DROP FUNCTION IF EXISTS event_stamp_version()")
+        schema_editor.execute("DROP FUNCTION IF EXISTS event_clock_tick()")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0004_event_start_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventClock',
+            fields=[
+                ('id', models.PositiveSmallIntegerField(default=1, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'event_clock',
+            },
+        ),
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('source', models.CharField(choices=[('event', 'event'), ('series', 'recurring event')], max_length=6)),
+                ('row_id', models.BigIntegerField(verbose_name='id of the deleted row')),
+                ('version', models.BigIntegerField()),
+                ('start_date', models.DateTimeField()),
+                ('end_date', models.DateTimeField()),
+                ('deleted_at', models.DateTimeField(db_default=django.db.models.functions.datetime.Now())),
+            ],
+            options={
+                'db_table': 'event_tombstone',
+                'ordering': ['version'],
+            },
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='updated_at',
+            field=models.DateTimeField(db_default=django.db.models.functions.datetime.Now(), editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='version',
+            field=models.BigIntegerField(db_default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='eventseries',
+            name='updated_at',
+            field=models.DateTimeField(db_default=django.db.models.functions.datetime.Now(), editable=False),
+        ),
+        migrations.AddField(
+            model_name='eventseries',
+            name='version',
+            field=models.BigIntegerField(db_default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['version'], name='event_version_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventseries',
+            index=models.Index(fields=['version'], name='event_series_version_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['version'], name='event_tombstone_version_idx'),
+        ),
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
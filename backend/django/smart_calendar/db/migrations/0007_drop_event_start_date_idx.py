@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:44
+
+from django.db import migrations
+
+# event_start_id_idx (0004) leads with start_date and serves the same
+# ranges; the single column index only cost a second update per write
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0006_reminder_watermark'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='event',
+            name='event_start_date_idx',
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Now
 
 
 # create table event (
@@ -22,11 +23,140 @@ class Event(models.Model):
 
     category = models.TextField(verbose_name="category of an event")
 
+    # stamped by the triggers of migration 0005 on every insert and update,
+    # including the SQL of exec_sql_request; see EventClock
+    version = models.BigIntegerField(db_default=0, editable=False)
+    updated_at = models.DateTimeField(db_default=Now(), editable=False)
+
     class Meta:
         db_table = "event"
         verbose_name = "event"
         verbose_name_plural = "events"
         ordering = ["id"]
+        # range filters on the dates; a BRIN index on start_date is added by
+        # migration 0002 on Postgres only. Ranges on start_date alone use
+        # event_start_id_idx, which leads with it.
+        indexes = [
+            models.Index(fields=["end_date"], name="event_end_date_idx"),
+            models.Index(
+                fields=["category", "start_date"], name="event_category_start_idx"
+            ),
+            # keyset pagination of list_events orders by (start_date, id)
+            models.Index(fields=["start_date", "id"], name="event_start_id_idx"),
+            # event_changes reads the rows changed after a version
+            models.Index(fields=["version"], name="event_version_idx"),
+        ]
 
     def __str__(self):
         return "event model"
+
+
+class EventSeries(models.Model):
+    """A recurring event, stored once and expanded on read.
+
+    ``start_date``/``end_date`` are the first occurrence; the rule is an
+    RRULE subset (see ``api.recurrence``). ``exdates`` lists the starts of
+    cancelled occurrences, ``series_end`` is when the last occurrence ends
+    (null for endless series) so a window query can skip finished series.
+    """
+
+    DAILY = "DAILY"
+    WEEKLY = "WEEKLY"
+    MONTHLY = "MONTHLY"
+    FREQUENCIES = [(DAILY, "daily"), (WEEKLY, "weekly"), (MONTHLY, "monthly")]
+
+    id = models.BigAutoField(primary_key=True, verbose_name="id of a series")
+
+    start_date = models.DateTimeField(verbose_name="start of the first occurrence")
+    end_date = models.DateTimeField(verbose_name="end of the first occurrence")
+
+    name = models.TextField(verbose_name="name of an event")
+    description = models.TextField(default="", verbose_name="description of an event")
+    category = models.TextField(verbose_name="category of an event")
+
+    frequency = models.CharField(max_length=7, choices=FREQUENCIES)
+    interval = models.PositiveIntegerField(default=1)
+    # comma separated weekdays, 0 is Monday; WEEKLY only
+    weekdays = models.CharField(max_length=13, blank=True, default="")
+    until = models.DateTimeField(null=True, blank=True)
+    count = models.PositiveIntegerField(null=True, blank=True)
+    exdates = models.JSONField(default=list, blank=True)
+    series_end = models.DateTimeField(null=True, blank=True)
+
+    version = models.BigIntegerField(db_default=0, editable=False)
+    updated_at = models.DateTimeField(db_default=Now(), editable=False)
+
+    class Meta:
+        db_table = "event_series"
+        verbose_name = "recurring event"
+        verbose_name_plural = "recurring events"
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["start_date"], name="event_series_start_idx"),
+            models.Index(fields=["series_end"], name="event_series_end_idx"),
+            models.Index(fields=["version"], name="event_series_version_idx"),
+        ]
+
+    def __str__(self):
+        return "event series model"
+
+
+class EventClock(models.Model):
+    """The last version given to a change of ``event`` or ``event_series``.
+
+    A single row, bumped by the database triggers of migration 0005 for
+    every inserted, updated and deleted row. Writers lock the row until
+    they commit, so versions become visible in increasing order and a
+    client that has seen version V has seen every change up to V.
+    """
+
+    id = models.PositiveSmallIntegerField(primary_key=True, default=1)
+    version = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = "event_clock"
+
+    def __str__(self):
+        return "event clock model"
+
+
+class Tombstone(models.Model):
+    """A deleted event or series, written by the delete triggers."""
+
+    EVENT = "event"
+    SERIES = "series"
+    SOURCES = [(EVENT, "event"), (SERIES, "recurring event")]
+
+    id = models.BigAutoField(primary_key=True)
+    source = models.CharField(max_length=6, choices=SOURCES)
+    row_id = models.BigIntegerField(verbose_name="id of the deleted row")
+    version = models.BigIntegerField()
+    start_date = models.DateTimeField()
+    end_date = models.DateTimeField()
+    deleted_at = models.DateTimeField(db_default=Now())
+
+    class Meta:
+        db_table = "event_tombstone"
+        ordering = ["version"]
+        indexes = [models.Index(fields=["version"], name="event_tombstone_version_idx")]
+
+    def __str__(self):
+        return "tombstone model"
+
+
+class ReminderWatermark(models.Model):
+    """How far the reminder service got, so a restart resumes from there.
+
+    A single row: every reminder due before ``fired_until`` has fired (see
+    ``api.reminders``).
+    """
+
+    id = models.PositiveSmallIntegerField(primary_key=True, default=1)
+    fired_until = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "reminder_watermark"
+
+    def __str__(self):
+        return "reminder watermark model"
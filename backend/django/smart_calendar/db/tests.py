@@ -1,3 +1,60 @@
+from datetime import datetime, timedelta, timezone
+from unittest import skipUnless
+
+from django.db import connection
 from django.test import TestCase
 
-# Create your tests here.
+from .models import Event
+
+
+@skipUnless(connection.vendor == "postgresql", "EXPLAIN output is Postgres specific")
+class EventIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        Event.objects.bulk_create(
+            Event(
+                start_date=start + timedelta(hours=i),
+                end_date=start + timedelta(hours=i + 1),
+                name=f"Event {i}",
+                description="",
+                category="Work" if i % 2 else "Sport",
+            )
+            for i in range(2000)
+        )
+
+    def explain(self, queryset):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE event")
+            # the test table is small, keep the planner off sequential scans
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    def test_month_range_uses_start_id_index(self):
+        plan = self.explain(
+            Event.objects.filter(
+                start_date__gte=datetime(2025, 2, 1, tzinfo=timezone.utc),
+                start_date__lt=datetime(2025, 3, 1, tzinfo=timezone.utc),
+            )
+        )
+        self.assertIn("event_start_id_idx", plan)
+        self.assertNotIn("Seq Scan", plan)
+
+    def test_category_filter_uses_composite_index(self):
+        plan = self.explain(
+            Event.objects.filter(
+                category="Sport",
+                start_date__gte=datetime(2025, 2, 1, tzinfo=timezone.utc),
+            )
+        )
+        self.assertIn("event_category_start_idx", plan)
+
+    def test_overlap_query_uses_an_index(self):
+        plan = self.explain(
+            Event.objects.filter(
+                start_date__lt=datetime(2025, 2, 2, tzinfo=timezone.utc),
+                end_date__gt=datetime(2025, 2, 1, tzinfo=timezone.utc),
+            )
+        )
+        self.assertRegex(plan, r"Index (Only )?Scan|Bitmap Index Scan")
+        self.assertNotIn("Seq Scan", plan)
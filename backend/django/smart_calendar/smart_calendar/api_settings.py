@@ -0,0 +1,26 @@
+"""
+API-only settings: DJANGO_SETTINGS_MODULE=smart_calendar.api_settings.
+
+Serves ``api.urls`` under ``/api/`` and nothing else. The api views are
+csrf-exempt JSON endpoints without sessions, users, messages or templates,
+so the contrib apps and their middleware are left out: less to import at
+startup and fewer middleware calls per request. ``smart_calendar.settings``
+remains the full profile with the admin.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    "api",
+    "db",
+]
+
+# CommonMiddleware sets Content-Length, so ASGI servers do not chunk the JSON
+MIDDLEWARE = [
+    "api.telemetry.TelemetryMiddleware",
+    "django.middleware.common.CommonMiddleware",
+]
+
+ROOT_URLCONF = "smart_calendar.api_urls"
+
+TEMPLATES = []
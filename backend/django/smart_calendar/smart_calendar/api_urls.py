@@ -0,0 +1,9 @@
+"""URL configuration of the API-only profile (``smart_calendar.api_settings``)."""
+
+from api.telemetry import metrics
+from django.urls import include, path
+
+urlpatterns = [
+    path("api/", include("api.urls")),
+    path("metrics", metrics, name="metrics"),
+]
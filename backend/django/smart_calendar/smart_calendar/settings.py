@@ -42,6 +42,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first, so its timings cover the rest of the stack
+    "api.telemetry.TelemetryMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -69,20 +71,85 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "smart_calendar.wsgi.application"
+ASGI_APPLICATION = "smart_calendar.asgi.application"
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Connections come from a psycopg pool (DB_POOL=True, needs psycopg[pool]),
+# or are kept open for DB_CONN_MAX_AGE seconds per thread ("None" keeps them
+# forever). Django refuses both at once, and under ASGI every request runs
+# in its own thread, so the pool is the default.
+DB_POOL = os.environ.get("DB_POOL", "True") == "True"
+DB_CONN_MAX_AGE = os.environ.get("DB_CONN_MAX_AGE", "60")
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
-        "NAME": "calendardb",
-        "USER": "calendar_user",
-        "PASSWORD": "mypassword",
-        "HOST": "calendar_db",
-        "PORT": "5432",
+        "NAME": os.environ.get("POSTGRES_DB", "calendardb"),
+        "USER": os.environ.get("POSTGRES_USER", "calendar_user"),
+        "PASSWORD": os.environ.get("POSTGRES_PASSWORD", "mypassword"),
+        "HOST": os.environ.get("POSTGRES_HOST", "calendar_db"),
+        "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+        "CONN_MAX_AGE": (
+            0 if DB_POOL else None if DB_CONN_MAX_AGE == "None" else int(DB_CONN_MAX_AGE)
+        ),
+        # check a reused connection before handing it out (pooled or persistent)
+        "CONN_HEALTH_CHECKS": os.environ.get("DB_CONN_HEALTH_CHECKS", "True") == "True",
+        "OPTIONS": {},
+    }
+}
+if DB_POOL:
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", "2")),
+        "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", "10")),
+        # seconds a request waits for a free connection before failing
+        "timeout": float(os.environ.get("DB_POOL_TIMEOUT", "10")),
+        # idle connections above min_size are closed after this many seconds
+        "max_idle": float(os.environ.get("DB_POOL_MAX_IDLE", "600")),
     }
+
+# Number of prepared LLM statement templates kept per database connection
+SQL_TEMPLATE_CACHE_SIZE = int(os.environ.get("SQL_TEMPLATE_CACHE_SIZE", "128"))
+
+# Number of (recurrence rule, window) expansions kept per process
+RECURRENCE_CACHE_SIZE = int(os.environ.get("RECURRENCE_CACHE_SIZE", "16384"))
+
+# Postgres channel on which writes NOTIFY the months they changed (see
+# api.notify); empty to not notify
+EVENT_NOTIFY_CHANNEL = os.environ.get("EVENT_NOTIFY_CHANNEL", "calendar_events")
+
+# run_reminders (see api.reminders), all in seconds: how long before an
+# event its reminder fires, how far ahead reminders are kept in memory,
+# how often writes are looked for without a NOTIFY, how often the
+# watermark is saved, and how late a reminder missed during a restart
+# may still fire
+REMINDER_LEAD = int(os.environ.get("REMINDER_LEAD", "900"))
+REMINDER_HORIZON = int(os.environ.get("REMINDER_HORIZON", "86400"))
+REMINDER_POLL = float(os.environ.get("REMINDER_POLL", "5"))
+REMINDER_CHECKPOINT = float(os.environ.get("REMINDER_CHECKPOINT", "10"))
+REMINDER_MAX_DELAY = int(os.environ.get("REMINDER_MAX_DELAY", "3600"))
+
+# Share of the INFO log lines of the "api" logger that are written;
+# warnings and errors are always logged
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", "0.1"))
+
+# one JSON object per line, see api.telemetry
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {"json": {"format": "%(message)s"}},
+    "handlers": {"json": {"class": "logging.StreamHandler", "formatter": "json"}},
+    "loggers": {
+        "api": {
+            "handlers": ["json"],
+            "level": os.environ.get("LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+        # the reminders of run_reminders, never sampled (see api.reminders)
+        "reminders": {"handlers": ["json"], "level": "INFO", "propagate": False},
+    },
 }
 
 
@@ -0,0 +1,225 @@
+import importlib
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+
+class CacheBackend:
+    """Storage used by MonthCache.
+
+    Subclass this to keep month payloads somewhere other than the gateway
+    process (e.g. Redis shared by several gateway replicas). Keys are
+    strings, values are bytes: the raw JSON returned by Django behind a
+    line with its ETag (see ``pack_entry``).
+
+    The backend also keeps the generation counters of MonthCache, so every
+    gateway sharing it sees the invalidations of the others. Counters
+    outlive ``clear()``, which drops the entries only.
+    """
+
+    evictions = 0
+
+    def get(self, key: str):
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: float):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def counter(self, key: str) -> int:
+        """Current value of a counter, 0 if it was never incremented."""
+        raise NotImplementedError
+
+    def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+    def set_if(self, key: str, value: bytes, ttl: float, counters, expected) -> bool:
+        """set() unless one of the counters moved away from `expected`.
+
+        A shared backend should check and write atomically (a Redis script
+        or WATCH/MULTI); this default leaves a gap between the two.
+        """
+        if tuple(self.counter(name) for name in counters) != tuple(expected):
+            return False
+        self.set(key, value, ttl)
+        return True
+
+    def __len__(self):
+        return 0
+
+
+class MemoryBackend(CacheBackend):
+    """In-process LRU store with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._counters = {}
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def counter(self, key):
+        return self._counters.get(key, 0)
+
+    def incr(self, key):
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def load_backend(path: str, **kwargs) -> CacheBackend:
+    """Instantiate a backend from a ``"package.module:ClassName"`` path."""
+    module_name, _, class_name = path.partition(":")
+    backend_class = getattr(importlib.import_module(module_name), class_name)
+    return backend_class(**kwargs)
+
+
+def pack_entry(content: bytes, etag: str) -> bytes:
+    # an ETag has no line breaks, the first one ends it
+    return etag.encode() + b"\n" + content
+
+
+def unpack_entry(value: bytes):
+    etag, _, content = value.partition(b"\n")
+    return content, etag.decode()
+
+
+EPOCH_KEY = "events:epoch"
+
+
+def month_key(year: int, month: int) -> str:
+    return f"events:{year}:{month:02d}"
+
+
+def generation_key(key: str) -> str:
+    return f"{key}:generation"
+
+
+def parse_datetime(value) -> datetime:
+    if isinstance(value, datetime):
+        moment = value
+    else:
+        moment = datetime.fromisoformat(str(value).replace(" ", "T"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    # Django stores and filters in UTC
+    return moment.astimezone(timezone.utc)
+
+
+def months_between(start, end):
+    """Yield every (year, month) from start's month to end's month inclusive."""
+    start, end = parse_datetime(start), parse_datetime(end)
+    if end < start:
+        start, end = end, start
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+class MonthCache:
+    """Cache of ``GET /events/`` responses keyed on (year, month).
+
+    Every key carries a generation number that is bumped on invalidation,
+    and ``clear()`` bumps an epoch. A reader takes both before asking
+    Django and only stores the response if nothing invalidated the month
+    meanwhile, so a slow read racing a write can never put stale data back
+    into the cache. The counters live in the backend: with a shared one,
+    the guard also holds against the writes another gateway forwarded.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float = 60):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _counters(self, year: int, month: int):
+        return EPOCH_KEY, generation_key(month_key(year, month))
+
+    def generation(self, year: int, month: int):
+        return tuple(self.backend.counter(name) for name in self._counters(year, month))
+
+    def get(self, year: int, month: int):
+        """(content, etag) of a cached month, or None."""
+        value = self.backend.get(month_key(year, month))
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return unpack_entry(value)
+
+    def set(self, year: int, month: int, value: bytes, generation, etag: str = "") -> bool:
+        """Store a month read at `generation`; False if it was invalidated since."""
+        return self.backend.set_if(
+            month_key(year, month),
+            pack_entry(value, etag),
+            self.ttl,
+            self._counters(year, month),
+            generation,
+        )
+
+    def invalidate(self, year: int, month: int):
+        key = month_key(year, month)
+        self.backend.incr(generation_key(key))
+        self.backend.delete(key)
+        self.invalidations += 1
+
+    def invalidate_range(self, start, end):
+        for year, month in months_between(start, end):
+            self.invalidate(year, month)
+
+    def invalidate_touched(self, touched):
+        """Drop the months of Django's ``touched`` ranges; None drops all."""
+        if touched is None:
+            self.clear()
+            return
+        for start, end in touched:
+            self.invalidate_range(start, end)
+
+    def clear(self):
+        self.backend.incr(EPOCH_KEY)
+        self.backend.clear()
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.backend.evictions,
+            "invalidations": self.invalidations,
+            "size": len(self.backend),
+        }
@@ -0,0 +1,225 @@
+"""Live change notifications over WebSocket.
+
+Clients connect to ``/ws/events`` with the months they show
+(``?months=2025-12,2026-01``) and may send ``{"months": [...]}`` to
+change them. Every write to one of those months is pushed as
+``{"type": "changed", "months": [...]}``, the client then catches up with
+``/events/changes`` or refetches the months.
+
+Changes come from Django's ``NOTIFY`` on ``EVENT_NOTIFY_CHANNEL`` when the
+gateway is given a Postgres DSN to LISTEN with (``listen``), which also
+sees the writes of the model service and of other gateway replicas.
+Without one the gateway publishes the writes it forwards itself.
+
+Backpressure: a subscriber has no message queue, only the set of its
+months changed since its last message. A slow client gets one message
+naming every month that changed meanwhile, so the memory of a socket is
+bounded by the months it watches however many writes it misses. A client
+that does not take a message within ``send_timeout`` seconds is closed
+with 1013 (try again later), as is every connection above ``max_sockets``.
+"""
+
+import asyncio
+import json
+import logging
+import re
+from collections import defaultdict
+
+from cache import months_between
+from telemetry import log
+
+MONTH_RE = re.compile(r"^(\d{4})-(0[1-9]|1[0-2])$")
+TRY_AGAIN_LATER = 1013
+
+
+def month_name(year: int, month: int) -> str:
+    return f"{year:04d}-{month:02d}"
+
+
+def parse_months(values, limit: int) -> frozenset:
+    """Validated "YYYY-MM" months, raises ValueError."""
+    if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+        raise ValueError("months must be a list of YYYY-MM strings")
+    months = frozenset(value.strip() for value in values if value.strip())
+    for month in months:
+        if not MONTH_RE.match(month):
+            raise ValueError(f"There is no month {month!r}, use YYYY-MM")
+    if len(months) > limit:
+        raise ValueError(f"At most {limit} months can be watched")
+    return months
+
+
+def touched_months(touched):
+    """The months of Django's "touched" ranges, None for any month."""
+    if touched is None:
+        return None
+    try:
+        return {
+            month_name(year, month)
+            for start, end in touched
+            for year, month in months_between(start, end)
+        }
+    except (TypeError, ValueError):
+        return None
+
+
+def notify_months(payload: str):
+    """The months of a NOTIFY payload of Django, None for any month."""
+    try:
+        months = json.loads(payload)["months"]
+        return None if months is None else set(parse_months(months, len(months)))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class Subscriber:
+    """One socket: the months it watches and those changed since its last message."""
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.months = frozenset()
+        self.pending = set()
+        self.wakeup = asyncio.Event()
+
+    def notify(self, months) -> bool:
+        """Add changed months; True if they joined a message not sent yet."""
+        coalesced = bool(self.pending)
+        self.pending |= months
+        self.wakeup.set()
+        return coalesced
+
+    async def next_message(self) -> dict:
+        while not self.pending:
+            self.wakeup.clear()
+            await self.wakeup.wait()
+        months, self.pending = self.pending, set()
+        return {"type": "changed", "months": sorted(months)}
+
+
+class Broker:
+    """Fans changed months out to the subscribers that watch them."""
+
+    def __init__(self, max_sockets: int = 10000, max_months: int = 24, send_timeout: float = 10):
+        self.max_sockets = max_sockets
+        self.max_months = max_months
+        self.send_timeout = send_timeout
+        self.subscribers = set()
+        self._by_month = defaultdict(set)
+        self.published = 0
+        self.delivered = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.slow_closed = 0
+
+    def add(self, subscriber: Subscriber) -> bool:
+        if len(self.subscribers) >= self.max_sockets:
+            self.rejected += 1
+            return False
+        self.subscribers.add(subscriber)
+        return True
+
+    def remove(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+        self.subscribe(subscriber, frozenset())
+
+    def subscribe(self, subscriber: Subscriber, months: frozenset):
+        for month in subscriber.months - months:
+            watchers = self._by_month[month]
+            watchers.discard(subscriber)
+            if not watchers:
+                del self._by_month[month]
+        for month in months - subscriber.months:
+            self._by_month[month].add(subscriber)
+        subscriber.months = months
+        subscriber.pending &= months
+
+    def publish(self, months):
+        """Notify the watchers of the changed months; None notifies everyone."""
+        self.published += 1
+        if months is None:
+            matched = ((subscriber, subscriber.months) for subscriber in self.subscribers)
+        else:
+            months = frozenset(months)
+            watchers = set().union(*(self._by_month.get(month, ()) for month in months))
+            matched = ((subscriber, subscriber.months & months) for subscriber in watchers)
+        for subscriber, changed in matched:
+            if changed:
+                self.coalesced += subscriber.notify(changed)
+
+    async def send(self, subscriber: Subscriber):
+        while True:
+            message = await subscriber.next_message()
+            try:
+                # not wait_for(), which starts a task per message
+                async with asyncio.timeout(self.send_timeout):
+                    await subscriber.websocket.send_json(message)
+            except TimeoutError:
+                self.slow_closed += 1
+                log("live_slow_client", logging.WARNING, months=len(message["months"]))
+                # the close frame waits behind the unsent data too
+                try:
+                    async with asyncio.timeout(self.send_timeout):
+                        await subscriber.websocket.close(code=TRY_AGAIN_LATER)
+                except TimeoutError:
+                    pass
+                return
+            self.delivered += 1
+
+    async def receive(self, subscriber: Subscriber):
+        while True:
+            try:
+                try:
+                    data = await subscriber.websocket.receive_json()
+                except json.JSONDecodeError:
+                    raise ValueError("Invalid dictionary")
+                values = data.get("months") if isinstance(data, dict) else None
+                months = parse_months(values, self.max_months)
+            except ValueError as e:
+                await subscriber.websocket.send_json({"type": "error", "message": f"{e}"})
+                continue
+            self.subscribe(subscriber, months)
+
+    async def serve(self, subscriber: Subscriber):
+        """Send and receive until the socket closes or is too slow."""
+        tasks = [
+            asyncio.create_task(self.send(subscriber)),
+            asyncio.create_task(self.receive(subscriber)),
+        ]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "sockets": len(self.subscribers),
+            "watched_months": len(self._by_month),
+            "published": self.published,
+            "delivered": self.delivered,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "slow_closed": self.slow_closed,
+        }
+
+
+async def listen(dsn: str, channel: str, handle, retry: float = 5):
+    """Call handle(months) for every NOTIFY on the channel, reconnecting forever.
+
+    Changes made while the connection was down are unknown, so every
+    (re)connect is handled as a change of every month.
+    """
+    import psycopg
+    from psycopg import sql
+
+    while True:
+        try:
+            async with await psycopg.AsyncConnection.connect(dsn, autocommit=True) as connection:
+                await connection.execute(sql.SQL("LISTEN {}").format(sql.Identifier(channel)))
+                handle(None)
+                async for notify in connection.notifies():
+                    handle(notify_months(notify.payload))
+        except psycopg.Error as e:
+            log("live_listen_failed", logging.WARNING, error=repr(e))
+        await asyncio.sleep(retry)
@@ -1,15 +1,121 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 import httpx
-import requests
-from fastapi import FastAPI, HTTPException, Request, status
+from cache import MemoryBackend, MonthCache, load_backend
+from fastapi import (
+    FastAPI,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+    status,
+)
 from fastapi.middleware.cors import CORSMiddleware
+from live import TRY_AGAIN_LATER, Broker, Subscriber, listen, parse_months, touched_months
 from pydantic import BaseModel, Field
+from telemetry import (
+    DJANGO_SECONDS,
+    TelemetryMiddleware,
+    metrics_response,
+    propagate_request_id,
+)
+
+DJANGO_BACKEND_URL = os.getenv("DJANGO_BACKEND_URL", "http://django-app:8000/api")
+
+# connection pool of the shared Django client
+HTTP_MAX_CONNECTIONS = int(os.getenv("GATEWAY_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("GATEWAY_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("GATEWAY_KEEPALIVE_EXPIRY", "30"))
+
+# timeouts (seconds) of the shared Django client
+HTTP_CONNECT_TIMEOUT = float(os.getenv("GATEWAY_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("GATEWAY_READ_TIMEOUT", "30"))
+HTTP_POOL_TIMEOUT = float(os.getenv("GATEWAY_POOL_TIMEOUT", "10"))
+
+# HTTP/2 needs the optional `h2` package (pip install "httpx[http2]")
+HTTP2 = os.getenv("GATEWAY_HTTP2") == "True"
+
+# month-view cache; CACHE_BACKEND is a "module:Class" path of a CacheBackend
+CACHE_TTL = float(os.getenv("GATEWAY_CACHE_TTL", "60"))
+CACHE_SIZE = int(os.getenv("GATEWAY_CACHE_SIZE", "256"))
+CACHE_BACKEND = os.getenv("GATEWAY_CACHE_BACKEND")
+
+# live updates on /ws/events (see live.py); with a Postgres DSN the gateway
+# LISTENs for Django's NOTIFY instead of publishing the writes it forwards
+LIVE_NOTIFY_DSN = os.getenv("GATEWAY_NOTIFY_DSN")
+LIVE_NOTIFY_CHANNEL = os.getenv("EVENT_NOTIFY_CHANNEL", "calendar_events")
+LIVE_MAX_SOCKETS = int(os.getenv("GATEWAY_LIVE_MAX_SOCKETS", "10000"))
+LIVE_MAX_MONTHS = int(os.getenv("GATEWAY_LIVE_MAX_MONTHS", "24"))
+LIVE_SEND_TIMEOUT = float(os.getenv("GATEWAY_LIVE_SEND_TIMEOUT", "10"))
+
+# action types of /exec-sql/ that never modify the event table
+READ_ACTIONS = {"select", "recommendation"}
+
+
+def build_client() -> httpx.AsyncClient:
+    http2 = HTTP2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            http2 = False
+
+    return httpx.AsyncClient(
+        base_url=DJANGO_BACKEND_URL,
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            HTTP_READ_TIMEOUT,
+            connect=HTTP_CONNECT_TIMEOUT,
+            pool=HTTP_POOL_TIMEOUT,
+        ),
+        event_hooks={"request": [propagate_request_id]},
+    )
+
+
+def build_cache() -> MonthCache:
+    if CACHE_BACKEND:
+        backend = load_backend(CACHE_BACKEND)
+    else:
+        backend = MemoryBackend(max_entries=CACHE_SIZE)
+    return MonthCache(backend, ttl=CACHE_TTL)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # one client (and one connection pool) for the whole app lifetime
+    app.state.client = build_client()
+    app.state.cache = build_cache()
+    app.state.broker = Broker(
+        max_sockets=LIVE_MAX_SOCKETS,
+        max_months=LIVE_MAX_MONTHS,
+        send_timeout=LIVE_SEND_TIMEOUT,
+    )
+    listener = None
+    if LIVE_NOTIFY_DSN:
+        listener = asyncio.create_task(
+            listen(LIVE_NOTIFY_DSN, LIVE_NOTIFY_CHANNEL, months_changed)
+        )
+    try:
+        yield
+    finally:
+        if listener is not None:
+            listener.cancel()
+        await app.state.client.aclose()
 
-app = FastAPI()
 
-DJANGO_BACKEND_URL = "http://django-app:8000/api"
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,7 +123,75 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "ETag"],
 )
+# outermost, so its timings include CORS handling
+app.add_middleware(TelemetryMiddleware)
+
+
+async def forward_raw(method: str, path: str, **kwargs) -> httpx.Response:
+    """Send a request to Django over the shared client."""
+    start = time.perf_counter()
+    try:
+        response = await app.state.client.request(method, path, **kwargs)
+    except httpx.TimeoutException:
+        DJANGO_SECONDS.labels(method, path, "timeout").observe(time.perf_counter() - start)
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="The Django backend did not respond in time.",
+        )
+    except httpx.TransportError:
+        DJANGO_SECONDS.labels(method, path, "unavailable").observe(time.perf_counter() - start)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Could not connect to the Django backend.",
+        )
+    DJANGO_SECONDS.labels(method, path, response.status_code).observe(
+        time.perf_counter() - start
+    )
+
+    # 304 only answers a request that was sent with If-None-Match
+    if response.status_code not in (200, 304):
+        raise HTTPException(
+            status_code=response.status_code,
+            detail=f"Django Error: {response.text}",
+        )
+
+    return response
+
+
+async def forward(method: str, path: str, **kwargs):
+    """Send a request to Django and return its JSON."""
+    response = await forward_raw(method, path, **kwargs)
+    return response.json()
+
+
+def months_changed(months):
+    """Drop changed "YYYY-MM" months (None: all) from the cache and push them."""
+    cache = app.state.cache
+    if months is None:
+        cache.clear()
+    else:
+        for name in months:
+            year, month = name.split("-")
+            cache.invalidate(int(year), int(month))
+    app.state.broker.publish(months)
+
+
+async def forward_write(method: str, path: str, **kwargs):
+    """Send a write to Django and drop the cached months it touched.
+
+    Django lists the date ranges of the rows it changed under "touched";
+    a missing or null value means it could not tell, so the whole month
+    cache is dropped. Without a NOTIFY listener the months are pushed to
+    the live clients from here.
+    """
+    result = await forward(method, path, **kwargs)
+    touched = result.get("touched")
+    app.state.cache.invalidate_touched(touched)
+    if not LIVE_NOTIFY_DSN and touched != []:
+        app.state.broker.publish(touched_months(touched))
+    return result
 
 
 # class Event(BaseModel):
@@ -28,109 +202,119 @@ app.add_middleware(
 #     description: str
 
 
-@app.get("/event/get/{id}")
-async def get_event(id: int):
-    django_url = f"{DJANGO_BACKEND_URL}/get_event/"
-    params = {"id": id}
+def opaque_tag(etag: str) -> str:
+    return etag.strip().removeprefix("W/")
 
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(django_url, params=params)
 
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"Django Error: {response.text}",
-            )
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of If-None-Match with an ETag, as for GET."""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return opaque_tag(etag) in {opaque_tag(tag) for tag in if_none_match.split(",")}
 
-        return response.json()
 
-    except httpx.ConnectError:
-        raise HTTPException(
-            status_code=503,
-            detail="Could not connect to the Django backend.",
-        )
+def tagged_response(content: bytes, etag: str, if_none_match: Optional[str]) -> Response:
+    """The JSON content, or 304 if the client already has this version."""
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"} if etag else None
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+@app.get("/event/get/{id}")
+async def get_event(id: int, if_none_match: Optional[str] = Header(None)):
+    headers = {"If-None-Match": if_none_match} if if_none_match else None
+    response = await forward_raw("GET", "/get_event/", params={"id": id}, headers=headers)
+    return tagged_response(response.content, response.headers.get("ETag", ""), if_none_match)
 
 
 @app.delete("/event/delete/{id}")
 async def delete_event(id: int):
-    django_url = f"{DJANGO_BACKEND_URL}/delete_event/"
-    params = {"id": id}
+    return await forward_write("DELETE", "/delete_event/", params={"id": id})
 
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(django_url, params=params)
 
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"Django Error: {response.text}",
-            )
+def conflict_params(check_conflicts: bool) -> dict:
+    # Django answers 409 with the overlapping events instead of writing
+    return {"check_conflicts": "true"} if check_conflicts else {}
 
-        return response.json()
 
-    except httpx.ConnectError:
-        raise HTTPException(
-            status_code=503,
-            detail="Could not connect to the Django backend.",
-        )
+@app.post("/event/create/")
+async def create_event(request: Request, check_conflicts: bool = False):
+    body = await request.body()
+    return await forward_write(
+        "POST", "/create_event/", params=conflict_params(check_conflicts), content=body
+    )
 
 
-@app.post("/event/create/")
-async def create_event(request: Request):
-    django_url = f"{DJANGO_BACKEND_URL}/create_event/"
+@app.patch("/event/update/{id}")
+async def update_event(id: int, request: Request, check_conflicts: bool = False):
+    body = await request.json()
+    return await forward_write(
+        "PATCH",
+        "/update_event/",
+        params={"id": id, **conflict_params(check_conflicts)},
+        json=body,
+    )
 
-    try:
-        body = await request.body()
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                django_url,
-                content=body,
-            )
+# recurring events: the event fields plus "rrule" (FREQ=DAILY|WEEKLY|MONTHLY,
+# INTERVAL, BYDAY, UNTIL or COUNT) and "exdates"; their occurrences are
+# returned by /events/ and /events/range/
+@app.post("/series/create/")
+async def create_series(request: Request):
+    body = await request.body()
+    return await forward_write("POST", "/create_series/", content=body)
 
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"Django Error: {response.text}",
-            )
 
-        return response.json()
+@app.patch("/series/update/{id}")
+async def update_series(id: int, request: Request):
+    body = await request.body()
+    return await forward_write(
+        "PATCH", "/update_series/", params={"id": id}, content=body
+    )
 
-    except requests.exceptions.ConnectionError:
-        raise HTTPException(
-            status_code=503,
-            detail="Could not connect to the Django backend.",
-        )
 
+@app.delete("/series/delete/{id}")
+async def delete_series(id: int):
+    return await forward_write("DELETE", "/delete_series/", params={"id": id})
 
-@app.patch("/event/update/{id}")
-async def update_event(id: int, request: Request):
-    django_url = f"{DJANGO_BACKEND_URL}/update_event/"
 
-    try:
-        body = await request.json()
+# batches: {"events": [...]} or {"ids": [...]}, plus an optional "mode"
+# ("atomic" or "best_effort"); Django answers with one result per item
+@app.post("/events/bulk/create/")
+async def bulk_create_events(request: Request, check_conflicts: bool = False):
+    body = await request.body()
+    return await forward_write(
+        "POST", "/bulk_create_events/", params=conflict_params(check_conflicts), content=body
+    )
 
-        async with httpx.AsyncClient() as client:
-            response = await client.patch(django_url, params={"id": id}, json=body)
 
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"Django Error: {response.text}",
-            )
+@app.patch("/events/bulk/update/")
+async def bulk_update_events(request: Request, check_conflicts: bool = False):
+    body = await request.body()
+    return await forward_write(
+        "PATCH", "/bulk_update_events/", params=conflict_params(check_conflicts), content=body
+    )
 
-        return response.json()
 
-    except requests.exceptions.ConnectionError:
-        raise HTTPException(
-            status_code=503,
-            detail="Could not connect to the Django backend.",
-        )
+@app.post("/events/bulk/delete/")
+async def bulk_delete_events(request: Request):
+    body = await request.body()
+    return await forward_write("POST", "/bulk_delete_events/", content=body)
+
+
+@app.post("/events/conflicts/")
+async def check_conflicts(request: Request):
+    # {"events": [{"start_date", "end_date", "id"?}, ...]}
+    body = await request.body()
+    return await forward("POST", "/check_conflicts/", content=body)
 
 
 # structure for a single SQL action
 class SQLAction(BaseModel):
+    id: Optional[str] = Field(None, description="action_1, action_2, ...")
     type: str = Field(..., description="select, insert, update, or delete")
     sql: str = Field(..., description="The raw SQL query")
 
@@ -138,48 +322,150 @@ class SQLAction(BaseModel):
 # the body structure that Django expects
 class SQLRequest(BaseModel):
     actions: List[SQLAction]
+    mode: str = Field("atomic", description="atomic or best_effort")
 
 
 @app.get("/events/")
-def get_events(year: int, month: int):
-    django_url = f"{DJANGO_BACKEND_URL}/get_events/"
-    params = {"year": year, "month": month}
-
-    try:
-        response = requests.get(django_url, params=params)
-
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"Django Error: {response.text}",
-            )
-
-        return response.json()
-
-    except requests.exceptions.ConnectionError:
-        raise HTTPException(
-            status_code=503,
-            detail="Could not connect to the Django.",
+async def get_events(year: int, month: int, if_none_match: Optional[str] = Header(None)):
+    cache = app.state.cache
+    entry = cache.get(year, month)
+    if entry is None:
+        generation = cache.generation(year, month)
+        # no If-None-Match: the cache needs the content even if the client has it
+        response = await forward_raw(
+            "GET", "/get_events/", params={"year": year, "month": month}
         )
+        content, etag = response.content, response.headers.get("ETag", "")
+        cache.set(year, month, content, generation, etag=etag)
+    else:
+        content, etag = entry
+
+    return tagged_response(content, etag, if_none_match)
+
+
+@app.get("/events/changes")
+async def event_changes(
+    since: int = Query(..., ge=0, description="version of the last sync, 0 for the first"),
+):
+    # only the events changed or deleted since, or "reset": true
+    response = await forward_raw("GET", "/event_changes/", params={"since": since})
+    return Response(content=response.content, media_type="application/json")
+
+
+@app.get("/events/range/")
+async def get_events_range(
+    start: datetime = Query(..., alias="from"),
+    end: datetime = Query(..., alias="to"),
+):
+    # events overlapping [from, to), including multi-day ones
+    response = await forward_raw(
+        "GET",
+        "/get_events_range/",
+        params={"from": start.isoformat(), "to": end.isoformat()},
+    )
+    return Response(content=response.content, media_type="application/json")
+
+
+@app.get("/events/list/")
+async def list_events(
+    limit: int = Query(100, gt=0, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    category: Optional[str] = Query(None, description="comma separated categories"),
+    q: Optional[str] = Query(None, description="text in name or description"),
+    fields: Optional[str] = Query(None, description="comma separated event fields"),
+    view: Optional[str] = Query(None, description="grid leaves the description out"),
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+):
+    params = {"limit": limit}
+    for name, value in (
+        ("cursor", cursor), ("category", category), ("q", q),
+        ("fields", fields), ("view", view),
+    ):
+        if value:
+            params[name] = value
+    if start is not None:
+        params["from"] = start.isoformat()
+    if end is not None:
+        params["to"] = end.isoformat()
+    response = await forward_raw("GET", "/list_events/", params=params)
+    return Response(content=response.content, media_type="application/json")
+
+
+@app.get("/slots/free/")
+async def find_free_slots(
+    start: datetime = Query(..., alias="from"),
+    end: datetime = Query(..., alias="to"),
+    duration: int = Query(60, gt=0, description="slot length in minutes"),
+    count: int = Query(5, gt=0, le=100),
+    step: int = Query(15, gt=0, description="slots start on multiples of it, in minutes"),
+    day_start: str = "09:00",
+    day_end: str = "18:00",
+    weekdays: str = Query("0,1,2,3,4", description="0 is Monday"),
+    tz: Optional[str] = None,
+):
+    params = {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "duration": duration,
+        "count": count,
+        "step": step,
+        "day_start": day_start,
+        "day_end": day_end,
+        "weekdays": weekdays,
+    }
+    if tz:
+        params["tz"] = tz
+    return await forward("GET", "/free_slots/", params=params)
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return app.state.cache.stats()
+
+
+@app.get("/live/stats")
+async def live_stats():
+    return app.state.broker.stats()
+
+
+@app.websocket("/ws/events")
+async def live_events(websocket: WebSocket, months: str = ""):
+    # months: comma separated YYYY-MM, changed later with {"months": [...]}
+    broker = app.state.broker
+    await websocket.accept()
+    subscriber = Subscriber(websocket)
+    if not broker.add(subscriber):
+        await websocket.close(code=TRY_AGAIN_LATER)
+        return
+    try:
+        try:
+            broker.subscribe(subscriber, parse_months(months.split(","), broker.max_months))
+        except ValueError as e:
+            await websocket.send_json({"type": "error", "message": f"{e}"})
+        await broker.serve(subscriber)
+    finally:
+        broker.remove(subscriber)
 
 
-@app.post("/exec-sql/")
-def execute_sql(payload: SQLRequest):
-    django_url = f"{DJANGO_BACKEND_URL}/exec_sql_request/"
+@app.get("/db/stats")
+async def db_stats():
+    # Django's connection settings and pool usage
+    return await forward("GET", "/db_stats/")
 
-    try:
-        response = requests.post(django_url, json=payload.dict())
 
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"Django Error: {response.text}",
-            )
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return metrics_response()
 
-        return response.json()
 
-    except requests.exceptions.ConnectionError:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Could not connect to the Django Backend.",
+@app.post("/exec-sql/")
+async def execute_sql(payload: SQLRequest):
+    if all(action.type in READ_ACTIONS for action in payload.actions):
+        return await forward(
+            "POST", "/exec_sql_request/", json=payload.model_dump()
         )
+
+    return await forward_write(
+        "POST", "/exec_sql_request/", json=payload.model_dump()
+    )
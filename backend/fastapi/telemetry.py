@@ -0,0 +1,130 @@
+"""Prometheus metrics, request IDs and sampled JSON logs of the gateway.
+
+Every request carries an ``X-Request-ID``: the caller's, or a new one. It
+is echoed on the response and sent along on every call to Django, so one
+id ties the gateway's and Django's log lines of a request together.
+
+Logs are one JSON object per line. Below WARNING only a LOG_SAMPLE_RATE
+share of them is written; warnings and errors always are. The metrics are
+served by ``/metrics`` in the Prometheus text format.
+"""
+
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from contextvars import ContextVar
+
+from fastapi import Response
+from prometheus_client import CONTENT_TYPE_LATEST, Histogram, generate_latest
+
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# longer ids (or none) are replaced, they end up in every log line
+MAX_REQUEST_ID = 128
+
+request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+REQUEST_SECONDS = Histogram(
+    "gateway_request_seconds",
+    "Time to answer a request, body included",
+    ["method", "route", "status"],
+)
+DJANGO_SECONDS = Histogram(
+    "gateway_django_seconds",
+    "Time of one call to the Django backend",
+    ["method", "path", "status"],
+)
+
+logger = logging.getLogger("gateway")
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+
+
+def log(event: str, level: int = logging.INFO, **fields):
+    """Write one JSON log line, sampled below WARNING."""
+    if level < logging.WARNING and random.random() >= LOG_SAMPLE_RATE:
+        return
+    if not logger.isEnabledFor(level):
+        return
+    record = {"event": event, "request_id": request_id.get(), **fields}
+    logger.log(level, json.dumps(record, default=str, ensure_ascii=False))
+
+
+def incoming_request_id(headers) -> str:
+    for name, value in headers:
+        if name == b"x-request-id":
+            value = value.decode("latin-1")
+            if 0 < len(value) <= MAX_REQUEST_ID and value.isprintable():
+                return value
+            break
+    return uuid.uuid4().hex
+
+
+class TelemetryMiddleware:
+    """Set the request id and time every HTTP request by route.
+
+    A plain ASGI middleware rather than ``@app.middleware("http")``: it
+    sees the end of streamed bodies and adds no extra task per request.
+    Requests that match no route share the "unmatched" label, so unknown
+    paths cannot blow up the number of series.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        current = incoming_request_id(scope["headers"])
+        token = request_id.set(current)
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (b"x-request-id", current.encode("latin-1")),
+                ]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            elapsed = time.perf_counter() - start
+            # the router stores the matched route in the shared scope
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.labels(scope["method"], route, status).observe(elapsed)
+            log(
+                "request",
+                logging.WARNING if status >= 500 else logging.INFO,
+                method=scope["method"],
+                route=route,
+                status=status,
+                ms=round(elapsed * 1000, 2),
+            )
+            request_id.reset(token)
+
+
+async def propagate_request_id(request):
+    """httpx request hook: send the current request id along."""
+    current = request_id.get()
+    if current is not None:
+        request.headers[REQUEST_ID_HEADER] = current
+
+
+def metrics_response() -> Response:
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
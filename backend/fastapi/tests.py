@@ -0,0 +1,109 @@
+"""Tests of the gateway month cache.
+
+Run from this folder: ``python -m unittest tests``.
+"""
+
+import unittest
+from datetime import datetime, timezone
+
+from cache import MemoryBackend, MonthCache, months_between, pack_entry, unpack_entry
+
+CONTENT = b'[{"model": "db.event", "pk": 1}]'
+
+
+class EntryTests(unittest.TestCase):
+    def test_round_trip(self):
+        self.assertEqual(unpack_entry(pack_entry(CONTENT, '"abc123"')), (CONTENT, '"abc123"'))
+
+    def test_without_an_etag(self):
+        self.assertEqual(unpack_entry(pack_entry(CONTENT, "")), (CONTENT, ""))
+
+    def test_content_with_line_breaks(self):
+        content = b'[\n  {"description": "one\\ntwo"}\n]\n'
+        self.assertEqual(unpack_entry(pack_entry(content, 'W/"7"')), (content, 'W/"7"'))
+
+    def test_the_etag_is_kept_through_the_cache(self):
+        cache = MonthCache(MemoryBackend())
+        cache.set(2025, 12, CONTENT, cache.generation(2025, 12), etag='"abc123"')
+        self.assertEqual(cache.get(2025, 12), (CONTENT, '"abc123"'))
+
+
+class MonthCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.backend = MemoryBackend()
+        self.cache = MonthCache(self.backend)
+
+    def fill(self, cache, year, month):
+        return cache.set(year, month, CONTENT, cache.generation(year, month))
+
+    def test_a_write_drops_its_months(self):
+        for month in (11, 12):
+            self.fill(self.cache, 2025, month)
+        self.fill(self.cache, 2026, 1)
+        self.cache.invalidate_touched([("2025-11-30T23:00:00", "2025-12-01T01:00:00")])
+        self.assertIsNone(self.cache.get(2025, 11))
+        self.assertIsNone(self.cache.get(2025, 12))
+        self.assertIsNotNone(self.cache.get(2026, 1))
+        self.assertEqual(self.cache.invalidations, 2)
+
+    def test_unknown_ranges_drop_everything(self):
+        self.fill(self.cache, 2025, 12)
+        self.fill(self.cache, 2026, 1)
+        self.cache.invalidate_touched(None)
+        self.assertIsNone(self.cache.get(2025, 12))
+        self.assertIsNone(self.cache.get(2026, 1))
+
+    def test_a_read_older_than_the_invalidation_is_not_stored(self):
+        generation = self.cache.generation(2025, 12)
+        self.cache.invalidate(2025, 12)
+        self.assertFalse(self.cache.set(2025, 12, CONTENT, generation))
+        self.assertIsNone(self.cache.get(2025, 12))
+        self.assertTrue(self.fill(self.cache, 2025, 12))
+
+    def test_a_read_older_than_a_clear_is_not_stored(self):
+        generation = self.cache.generation(2025, 12)
+        self.cache.clear()
+        self.assertFalse(self.cache.set(2025, 12, CONTENT, generation))
+        self.assertIsNone(self.cache.get(2025, 12))
+
+    def test_other_months_are_not_guarded(self):
+        generation = self.cache.generation(2025, 12)
+        self.cache.invalidate(2026, 1)
+        self.assertTrue(self.cache.set(2025, 12, CONTENT, generation))
+
+    def test_gateways_sharing_a_backend(self):
+        # a write forwarded by one gateway while another is reading the month
+        reader, writer = self.cache, MonthCache(self.backend)
+        generation = reader.generation(2025, 12)
+        writer.invalidate(2025, 12)
+        self.assertFalse(reader.set(2025, 12, CONTENT, generation))
+        self.assertIsNone(writer.get(2025, 12))
+
+        generation = reader.generation(2025, 12)
+        writer.clear()
+        self.assertFalse(reader.set(2025, 12, CONTENT, generation))
+
+    def test_clearing_the_backend_keeps_the_counters(self):
+        generation = self.cache.generation(2025, 12)
+        self.cache.invalidate(2025, 12)
+        self.backend.clear()
+        self.assertNotEqual(self.cache.generation(2025, 12), generation)
+
+
+class MonthsBetweenTests(unittest.TestCase):
+    def test_across_a_year(self):
+        self.assertEqual(
+            list(months_between("2025-11-15 10:00", "2026-02-01")),
+            [(2025, 11), (2025, 12), (2026, 1), (2026, 2)],
+        )
+
+    def test_reversed_range(self):
+        self.assertEqual(list(months_between("2026-01-01", "2025-12-31")), [(2025, 12), (2026, 1)])
+
+    def test_offsets_are_moved_to_utc(self):
+        start = datetime(2026, 1, 1, 0, 30, tzinfo=timezone.utc)
+        self.assertEqual(list(months_between("2026-01-01T01:30:00+02:00", start)), [(2025, 12), (2026, 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,310 @@
+"""Cache of question -> actions translations in front of generate_actions.
+
+Questions are normalized before lookup: relative dates ("tomorrow",
+"next friday", "завтра", ...) are resolved against the current date and
+replaced by numbered slots, then the text is lowercased and stripped of
+punctuation. The cached value is an action *template*: the dates the
+question resolved to are replaced by the same slots, so "what do I have
+tomorrow" asked on another day reuses the entry with the new date filled
+in. Answers that contain any other absolute date are not cached, since
+they would go stale.
+
+Near-duplicates (same numbers, token overlap above a threshold) of
+read-only questions are also served from the cache, and an optional
+Embedder can be plugged in for embedding similarity. Writes are only
+served for the same normalized question: "gym at 7am" and "gym at 7pm",
+or a meeting with Anna and one with Boris, are near-duplicates whose
+actions must not be swapped. Entries expire after a TTL, the least
+recently used ones are dropped beyond ``max_entries``, and the cache is
+persisted to a JSON file so it survives restarts.
+"""
+
+import asyncio
+import json
+import math
+import os
+import re
+import tempfile
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+WEEKDAYS = {
+    "monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3,
+    "friday": 4, "saturday": 5, "sunday": 6,
+    "понеділок": 0, "понеділка": 0,
+    "вівторок": 1, "вівторка": 1,
+    "середа": 2, "середу": 2, "середи": 2,
+    "четвер": 3, "четверга": 3,
+    "пятниця": 4, "пятницю": 4, "пятниці": 4,
+    "субота": 5, "суботу": 5, "суботи": 5,
+    "неділя": 6, "неділю": 6, "неділі": 6,
+}
+RELATIVE_DAYS = {
+    "day after tomorrow": 2,
+    "today": 0, "tonight": 0, "tomorrow": 1, "yesterday": -1,
+    "післязавтра": 2, "сьогодні": 0, "завтра": 1, "вчора": -1,
+}
+NEXT_WORDS = ("next", "наступний", "наступну", "наступного", "наступної")
+
+DAY_RE = re.compile(
+    r"\b(" + "|".join(sorted(map(re.escape, RELATIVE_DAYS), key=len, reverse=True)) + r")\b"
+)
+WEEKDAY_RE = re.compile(
+    r"\b(?:(" + "|".join(NEXT_WORDS) + r")\s+)?(" + "|".join(WEEKDAYS) + r")\b"
+)
+APOSTROPHES_RE = re.compile(r"['’ʼ`]")
+PUNCTUATION_RE = re.compile(r"[^\w\s@]")
+NUMBER_RE = re.compile(r"\d+")
+ISO_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+# actions that only read; other plans are never served to a near-duplicate
+READ_ACTIONS = {"select", "recommendation"}
+
+
+def slot(index: int) -> str:
+    return f"@@date_{index}@@"
+
+
+def normalize_question(question: str, today: date):
+    """Return (normalized text with date slots, resolved dates)."""
+    text = APOSTROPHES_RE.sub("", question.lower())
+    dates = []
+
+    def resolve(day: date) -> str:
+        if day not in dates:
+            dates.append(day)
+        return f" {slot(dates.index(day) + 1)} "
+
+    text = DAY_RE.sub(
+        lambda m: resolve(today + timedelta(days=RELATIVE_DAYS[m[1]])), text
+    )
+
+    def weekday(m):
+        ahead = (WEEKDAYS[m[2]] - today.weekday()) % 7
+        if m[1] and ahead == 0:
+            ahead = 7
+        return resolve(today + timedelta(days=ahead))
+
+    text = WEEKDAY_RE.sub(weekday, text)
+    text = PUNCTUATION_RE.sub(" ", text)
+    return " ".join(text.split()), dates
+
+
+def to_template(actions: dict, dates):
+    """Replace the resolved dates in the actions by slots, None if unsafe."""
+    text = json.dumps(actions, ensure_ascii=False)
+    for index, day in enumerate(dates, start=1):
+        text = text.replace(day.isoformat(), slot(index))
+    if ISO_DATE_RE.search(text):
+        return None
+    return text
+
+
+def is_read_only(actions) -> bool:
+    try:
+        return all(action["type"] in READ_ACTIONS for action in actions["actions"])
+    except (KeyError, TypeError):
+        return False
+
+
+def from_template(template: str, dates) -> dict:
+    for index, day in enumerate(dates, start=1):
+        template = template.replace(slot(index), day.isoformat())
+    return json.loads(template)
+
+
+def jaccard(first, second) -> float:
+    first, second = set(first), set(second)
+    if not first and not second:
+        return 1.0
+    return len(first & second) / len(first | second)
+
+
+def cosine(first, second) -> float:
+    dot = sum(a * b for a, b in zip(first, second))
+    norm = math.sqrt(sum(a * a for a in first)) * math.sqrt(sum(b * b for b in second))
+    return dot / norm if norm else 0.0
+
+
+async def _call(fn, *args):
+    return fn(*args)
+
+
+class Embedder:
+    """Turns normalized questions into vectors for similarity lookups."""
+
+    def embed(self, text: str) -> list:
+        raise NotImplementedError
+
+
+class OpenAIEmbedder(Embedder):
+    def __init__(self, client, model: str = "text-embedding-3-small"):
+        self.client = client
+        self.model = model
+
+    def embed(self, text):
+        return self.client.embeddings.create(model=self.model, input=text).data[0].embedding
+
+
+class ActionCache:
+    def __init__(
+        self,
+        path=None,
+        ttl: float = 7 * 24 * 3600,
+        max_entries: int = 1000,
+        similarity: float = 0.85,
+        embedder: Embedder = None,
+        embedding_similarity: float = 0.95,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self.embedder = embedder
+        self.embedding_similarity = embedding_similarity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._save_lock = asyncio.Lock()
+        self.load()
+
+    def lookup(self, question: str, today: date = None):
+        """Cached actions for the question, or None."""
+        today = today or datetime.now().date()
+        key, dates = normalize_question(question, today)
+        now = time.time()
+
+        entry = self.entries.get(key)
+        near = entry is None or entry["created"] + self.ttl <= now
+        if near:
+            entry = self.find_similar(key, len(dates), now)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if near:
+            self.near_hits += 1
+        else:
+            self.hits += 1
+        self.entries.move_to_end(entry["key"])
+        return from_template(entry["template"], dates)
+
+    def find_similar(self, key: str, slots: int, now: float):
+        tokens = key.split()
+        numbers = NUMBER_RE.findall(key)
+        vector = None
+        best, best_score = None, 0.0
+        for entry in reversed(self.entries.values()):
+            if not entry["read_only"]:
+                continue
+            if entry["slots"] != slots or entry["numbers"] != numbers:
+                continue
+            if entry["created"] + self.ttl <= now:
+                continue
+            score = jaccard(tokens, entry["key"].split())
+            if score >= self.similarity and score > best_score:
+                best, best_score = entry, score
+            elif self.embedder is not None and entry.get("embedding"):
+                if vector is None:
+                    vector = self.embedder.embed(key)
+                score = cosine(vector, entry["embedding"])
+                if score >= self.embedding_similarity and score > best_score:
+                    best, best_score = entry, score
+        return best
+
+    def store(self, question: str, actions: dict, today: date = None, save: bool = True) -> bool:
+        today = today or datetime.now().date()
+        key, dates = normalize_question(question, today)
+        template = to_template(actions, dates)
+        if template is None:
+            return False
+
+        read_only = is_read_only(actions)
+        self.entries[key] = {
+            "key": key,
+            "template": template,
+            "slots": len(dates),
+            "numbers": NUMBER_RE.findall(key),
+            "read_only": read_only,
+            "created": time.time(),
+            # only read-only entries are looked up by similarity
+            "embedding": self.embedder.embed(key) if self.embedder and read_only else None,
+        }
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        if save:
+            self.save()
+        return True
+
+    def get_or_generate(self, question: str, generate, today: date = None) -> dict:
+        actions = self.lookup(question, today)
+        if actions is None:
+            actions = generate(question)
+            self.store(question, actions, today)
+        return actions
+
+    async def aget_or_generate(self, question: str, generate, today: date = None) -> dict:
+        """Async get_or_generate; `generate` is a coroutine function."""
+        # embedding lookups block on the network, keep them off the event loop
+        run = asyncio.to_thread if self.embedder is not None else _call
+        actions = await run(self.lookup, question, today)
+        if actions is None:
+            actions = await generate(question)
+            if await run(self.store, question, actions, today, False):
+                await self.asave()
+        return actions
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for entry in entries:
+            if entry["created"] + self.ttl > now:
+                # files saved before the flag existed
+                if "read_only" not in entry:
+                    entry["read_only"] = is_read_only(json.loads(entry["template"]))
+                self.entries[entry["key"]] = entry
+
+    def save(self):
+        self.write(list(self.entries.values()))
+
+    async def asave(self):
+        """save() with the file written in a thread, off the event loop."""
+        if not self.path:
+            return
+        # a snapshot, later questions change the entries while it is written;
+        # the lock keeps the files in snapshot order
+        entries = list(self.entries.values())
+        async with self._save_lock:
+            await asyncio.to_thread(self.write, entries)
+
+    def write(self, entries):
+        if not self.path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        # write to a temporary file first so a crash never leaves half a file
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.near_hits + self.misses
+        return {
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.near_hits) / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "size": len(self.entries),
+        }
@@ -0,0 +1,161 @@
+"""Audio uploads handed to transcription without a round trip through disk.
+
+The spooled buffer Starlette parses the upload into (in memory up to
+1 MB, an anonymous temporary file beyond that) is passed to the
+transcription API as-is, so there are no named files to collide or clean
+up. Uploads above ``max_bytes`` are rejected. Only files the API would not
+take (unknown format, or above its 25 MB limit) are transcoded: they are
+piped through ffmpeg in chunks and come back as a mono 16 kHz MP3 in
+another spooled buffer. At most ``concurrency`` transcription jobs run at
+a time, the others wait for a slot.
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+
+# formats and size accepted by the transcription API
+API_FORMATS = {"flac", "m4a", "mp3", "mp4", "mpeg", "mpga", "oga", "ogg", "wav", "webm"}
+API_MAX_BYTES = 25 * 1024 * 1024
+
+CHUNK_SIZE = 64 * 1024
+SPOOL_SIZE = 1024 * 1024
+
+
+class AudioError(Exception):
+    status_code = 400
+
+
+class AudioTooLarge(AudioError):
+    status_code = 413
+
+
+class UnsupportedAudio(AudioError):
+    status_code = 415
+
+
+def extension(filename: str) -> str:
+    return os.path.splitext(filename or "")[1].lstrip(".").lower()
+
+
+def size_of(file) -> int:
+    position = file.tell()
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    file.seek(position)
+    return size
+
+
+def needs_transcoding(filename: str, size: int) -> bool:
+    return extension(filename) not in API_FORMATS or size > API_MAX_BYTES
+
+
+async def transcode(file, ffmpeg: str = "ffmpeg"):
+    """Downsample `file` to mono 16 kHz MP3, streaming it through ffmpeg."""
+    process = await asyncio.create_subprocess_exec(
+        ffmpeg, "-loglevel", "error", "-i", "pipe:0",
+        "-ac", "1", "-ar", "16000", "-b:a", "32k", "-f", "mp3", "pipe:1",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+    )
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+
+    async def feed():
+        try:
+            while chunk := file.read(CHUNK_SIZE):
+                process.stdin.write(chunk)
+                await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # ffmpeg gave up on the input, its exit code tells why
+            pass
+        finally:
+            process.stdin.close()
+
+    async def collect():
+        while chunk := await process.stdout.read(CHUNK_SIZE):
+            output.write(chunk)
+
+    try:
+        await asyncio.gather(feed(), collect())
+        returncode = await process.wait()
+    except BaseException:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        output.close()
+        raise
+    if returncode != 0:
+        output.close()
+        raise UnsupportedAudio("Could not decode the audio file")
+    output.seek(0)
+    return output
+
+
+class AudioIngest:
+    def __init__(
+        self,
+        transcribe,
+        max_bytes: int = 50 * 1024 * 1024,
+        concurrency: int = 4,
+        ffmpeg: str = None,
+    ):
+        self.transcribe = transcribe
+        self.max_bytes = max_bytes
+        self.slots = asyncio.Semaphore(concurrency)
+        self.ffmpeg = ffmpeg or shutil.which("ffmpeg")
+        self.active = 0
+        self.waiting = 0
+        self.passed_through = 0
+        self.transcoded = 0
+        self.rejected = 0
+
+    def check(self, file, filename: str) -> int:
+        size = size_of(file)
+        if size == 0:
+            self.rejected += 1
+            raise AudioError("Empty audio file")
+        if size > self.max_bytes:
+            self.rejected += 1
+            raise AudioTooLarge(f"Audio file is larger than {self.max_bytes} bytes")
+        if needs_transcoding(filename, size) and not self.ffmpeg:
+            self.rejected += 1
+            raise UnsupportedAudio(f"Unsupported audio format: {filename}")
+        return size
+
+    async def transcribe_upload(self, file, filename: str) -> str:
+        """Transcribe an open binary upload; `filename` only names the format."""
+        file.seek(0)
+        size = self.check(file, filename)
+        # never forward the client's path, only its base name
+        filename = os.path.basename(filename or "") or "audio"
+
+        self.waiting += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            if not needs_transcoding(filename, size):
+                self.passed_through += 1
+                return await self.transcribe(file, filename)
+
+            converted = await transcode(file, self.ffmpeg)
+            try:
+                self.transcoded += 1
+                return await self.transcribe(converted, "audio.mp3")
+            finally:
+                converted.close()
+        finally:
+            self.active -= 1
+            self.slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "passed_through": self.passed_through,
+            "transcoded": self.transcoded,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,233 @@
+"""Compact text of the database results for the answer prompt.
+
+The answer prompt used to inline ``json.dumps(result, indent=2)``: every
+column of every fetched row, descriptions in full, and the write
+bookkeeping ("touched", "mode") the model has no use for. A busy month
+came to thousands of tokens. ``build_context`` writes the same results
+as short lines:
+
+* only the columns the question needs: ``description`` and ``id`` are
+  left out unless it asks for them, any other column the SELECT returned
+  is kept,
+* whitespace is collapsed and long text cut at ``max_text`` characters,
+  a text repeated on several rows (a recurring event's description) is
+  written once and identical rows are merged with a count,
+* rows with a start date are grouped under one line per day,
+* the whole text stays within ``budget`` tokens: once a day no longer
+  fits, it and the rest of that action's rows are replaced by one summary
+  line with the number of events, the days they span and a count per
+  category.
+
+``count_tokens`` is an estimate that needs no tokenizer, so the budget is
+approximate, but the same results always give the same text.
+"""
+
+import json
+import re
+from collections import Counter
+from datetime import datetime
+
+DEFAULT_BUDGET = 1500
+DEFAULT_MAX_TEXT = 160
+
+# columns left out unless the question matches the pattern
+ON_REQUEST = {
+    "description": re.compile(
+        r"\b(descr|detail|about|note|agenda|опис|детал|подроб|нотат|про що)", re.IGNORECASE
+    ),
+    "id": re.compile(r"\b(ids?|number|номер)\b", re.IGNORECASE),
+}
+START_KEYS = ("start_date", "start")
+END_KEYS = ("end_date", "end")
+# a text this long is written once per action, later rows point back to it
+REPEAT_MIN = 40
+# tokens kept free for the summary line of an action that overflows
+SUMMARY_TOKENS = 40
+
+WORD_PIECE_RE = re.compile(r"\w{1,4}|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    """Roughly the number of BPE tokens: ~4 characters of a word, or a symbol."""
+    return len(WORD_PIECE_RE.findall(text))
+
+
+def dropped_columns(question: str) -> set:
+    return {column for column, pattern in ON_REQUEST.items() if not pattern.search(question)}
+
+
+def parse_moment(value):
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def first_of(row: dict, keys):
+    for key in keys:
+        if key in row:
+            return key
+    return None
+
+
+def clip(value, max_text: int) -> str:
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, ensure_ascii=False, default=str)
+    text = " ".join(str(value).split())
+    if len(text) > max_text:
+        text = text[: max_text - 1].rstrip() + "…"
+    return text
+
+
+def weather_line(weather) -> str:
+    if isinstance(weather, dict) and "temp" in weather:
+        line = f"weather: {weather['temp']}°C, {weather.get('weather', '')}"
+        if weather.get("datetime"):
+            line += f" at {weather['datetime']}"
+        return line
+    return f"weather: {clip(weather, DEFAULT_MAX_TEXT)}"
+
+
+class Block:
+    """Lines of one day (or one undated row) and the events behind them."""
+
+    def __init__(self, day):
+        self.day = day
+        self.lines = []
+        self.categories = []
+
+    def text(self) -> str:
+        lines = []
+        for line, count in Counter(self.lines).items():
+            lines.append(f"  {line} ×{count}" if count > 1 else f"  {line}")
+        if self.day is not None:
+            lines.insert(0, f"{self.day:%Y-%m-%d %a}")
+        return "\n".join(lines)
+
+
+class ActionContext:
+    def __init__(self, action: dict, dropped: set, max_text: int):
+        self.dropped = dropped
+        self.max_text = max_text
+        self.seen = set()
+        rows = action.get("fetched_data")
+        self.header = self.action_header(action, rows)
+        self.blocks = self.row_blocks(rows or [])
+
+    def action_header(self, action, rows) -> str:
+        header = f"{action.get('id') or 'action'} {action.get('type', '')}: {action.get('status', '')}"
+        for key in ("message", "error"):
+            if action.get(key):
+                header += f", {clip(action[key], self.max_text)}"
+        if rows is not None:
+            header += f", {len(rows)} rows"
+        if action.get("weather_info"):
+            header += f"\n  {weather_line(action['weather_info'])}"
+        return header
+
+    def text(self, value) -> str:
+        text = clip(value, self.max_text)
+        if len(text) >= REPEAT_MIN:
+            if text in self.seen:
+                return "(as above)"
+            self.seen.add(text)
+        return text
+
+    def row_line(self, row: dict, start, end_key) -> str:
+        head = []
+        if start is not None:
+            end = parse_moment(row.get(end_key)) if end_key else None
+            if end is None:
+                head.append(f"{start:%H:%M}")
+            elif end.date() == start.date():
+                head.append(f"{start:%H:%M}-{end:%H:%M}")
+            else:
+                head.append(f"{start:%H:%M}-{end:%Y-%m-%d %H:%M}")
+        skip = {*START_KEYS, *END_KEYS} if start is not None else set()
+        if row.get("name") and "name" not in self.dropped:
+            head.append(self.text(row["name"]))
+            skip.add("name")
+        if row.get("category") and "category" not in self.dropped:
+            head.append(f"({self.text(row['category'])})")
+            skip.add("category")
+        extras = [
+            f"{key}={self.text(value)}"
+            for key, value in row.items()
+            if key not in skip and key not in self.dropped and value not in (None, "")
+        ]
+        return " | ".join([" ".join(head), *extras] if head else extras)
+
+    def row_blocks(self, rows) -> list:
+        days = {}
+        undated = []
+        for row in rows:
+            start_key = first_of(row, START_KEYS)
+            start = parse_moment(row.get(start_key)) if start_key else None
+            if start is None:
+                block = Block(None)
+                undated.append(block)
+            else:
+                block = days.get(start.date())
+                if block is None:
+                    block = days[start.date()] = Block(start.date())
+            block.lines.append(self.row_line(row, start, first_of(row, END_KEYS)))
+            block.categories.append(row.get("category"))
+        return [days[day] for day in sorted(days)] + undated
+
+
+def summary_line(blocks) -> str:
+    events = sum(len(block.lines) for block in blocks)
+    days = [block.day for block in blocks if block.day is not None]
+    line = f"  + {events} more {'event' if events == 1 else 'events'}"
+    if days:
+        span = f"{days[0]:%Y-%m-%d}" if len(days) == 1 else f"{days[0]:%Y-%m-%d} to {days[-1]:%Y-%m-%d}"
+        line += f" on {len(days)} {'day' if len(days) == 1 else 'days'} ({span})"
+    categories = Counter(c for block in blocks for c in block.categories if c)
+    if categories:
+        line += ": " + ", ".join(f"{name} {count}" for name, count in categories.most_common())
+    return line
+
+
+def build_context(
+    result: dict,
+    question: str,
+    budget: int = DEFAULT_BUDGET,
+    max_text: int = DEFAULT_MAX_TEXT,
+) -> str:
+    """The results of exec_sql_request (plus weather) as compact text."""
+    if not isinstance(result, dict):
+        return clip(result, max_text)
+
+    dropped = dropped_columns(question)
+    actions = [ActionContext(action, dropped, max_text) for action in result.get("results", [])]
+
+    lines = []
+    if "results" not in result:
+        # an error answer of Django, or something unexpected
+        lines.extend(
+            f"{key}: {clip(value, max_text)}" for key, value in result.items() if key != "touched"
+        )
+    if result.get("weather"):
+        lines.append(weather_line(result["weather"]))
+
+    # the headers are always written, the rows share what is left
+    used = sum(count_tokens(line) for line in lines)
+    used += sum(count_tokens(action.header) for action in actions)
+    for action in actions:
+        lines.append(action.header)
+        overflow = []
+        for block in action.blocks:
+            text = block.text()
+            cost = count_tokens(text)
+            if overflow or used + cost + SUMMARY_TOKENS > budget:
+                overflow.append(block)
+                continue
+            lines.append(text)
+            used += cost
+        if overflow:
+            line = summary_line(overflow)
+            lines.append(line)
+            used += count_tokens(line)
+    return "\n".join(lines)
@@ -0,0 +1,302 @@
+"""Rule-based fast path in front of generate_actions.
+
+The most frequent questions need no model to turn them into SQL:
+
+* "agenda": what is on a day or in a period, "what do I have tomorrow",
+  "що в мене в п'ятницю", "show my events next week", "що в мене у грудні", ...
+* "show": one event by id, "show event 42", "покажи подію 42",
+* "delete": one event by id, "delete event 42", "видали подію #42",
+* "next": the next upcoming event, "what's my next event".
+
+Dates are resolved against the current day with the English and Ukrainian
+vocabulary of action_cache, plus weeks, weekends, months and explicit
+dates ("5 December", "5 грудня", "2025-12-05").
+
+A question is parsed only when the grammar accounts for it: every word has
+to be a date, an id, a cue of the intent or a filler word. The share of
+words accounted for is the confidence; below ``min_confidence`` (all of
+them by default) the question goes to the model, so "what do I have
+tomorrow with Anna" or "schedule a call tomorrow" are never answered here.
+The result has the same ``{"actions": [...]}`` shape the model returns.
+"""
+
+import re
+import time
+from collections import Counter, deque
+from datetime import date, datetime, timedelta
+from typing import NamedTuple, Optional
+
+from action_cache import APOSTROPHES_RE, NEXT_WORDS, PUNCTUATION_RE, RELATIVE_DAYS, WEEKDAYS
+
+MONTHS = {
+    "january": 1, "february": 2, "march": 3, "april": 4, "may": 5, "june": 6,
+    "july": 7, "august": 8, "september": 9, "october": 10, "november": 11, "december": 12,
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "jun": 6, "jul": 7, "aug": 8,
+    "sep": 9, "sept": 9, "oct": 10, "nov": 11, "dec": 12,
+    # genitive, "5 грудня"
+    "січня": 1, "лютого": 2, "березня": 3, "квітня": 4, "травня": 5, "червня": 6,
+    "липня": 7, "серпня": 8, "вересня": 9, "жовтня": 10, "листопада": 11, "грудня": 12,
+}
+# locative, "у грудні"
+MONTHS_IN = {
+    "січні": 1, "лютому": 2, "березні": 3, "квітні": 4, "травні": 5, "червні": 6,
+    "липні": 7, "серпні": 8, "вересні": 9, "жовтні": 10, "листопаді": 11, "грудні": 12,
+}
+THIS_WORDS = ("this", "цього", "цей", "цю", "цьому", "ці", "цих")
+
+
+def alternatives(words) -> str:
+    return "|".join(sorted(map(re.escape, words), key=len, reverse=True))
+
+
+PERIOD_WORDS = {
+    "week": ("week", "тижня", "тиждень", "тижні"),
+    "month": ("month", "місяця", "місяць", "місяці"),
+    "weekend": ("weekend", "вихідні", "вихідних"),
+}
+RELATIVE = alternatives(THIS_WORDS + NEXT_WORDS + ("наступні", "наступних"))
+
+DATE_PATTERNS = [
+    ("iso", re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")),
+    ("day_month", re.compile(
+        r"\b(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?(" + alternatives(MONTHS) + r")\b"
+    )),
+    ("month_day", re.compile(
+        r"\b(" + alternatives(MONTHS) + r")\s+(\d{1,2})(?:st|nd|rd|th)?\b"
+    )),
+    ("period", re.compile(
+        r"\b(?:(" + RELATIVE + r")\s+)?("
+        + alternatives(word for words in PERIOD_WORDS.values() for word in words)
+        + r")\b"
+    )),
+    ("in_month", re.compile(
+        r"\b(?:in\s+(" + alternatives(list(MONTHS)[:12]) + r")|(?:в|у)\s+("
+        + alternatives(MONTHS_IN) + r"))\b"
+    )),
+    ("relative", re.compile(r"\b(" + alternatives(RELATIVE_DAYS) + r")\b")),
+    ("weekday", re.compile(
+        r"\b(?:(" + RELATIVE + r")\s+)?(" + alternatives(WEEKDAYS) + r")\b"
+    )),
+]
+ID_RE = re.compile(
+    r"(?:\b(?:event|id|подію|подія|події|номер)\s*(?:#|no|number|id|номер)?\s*|#)(\d+)\b"
+)
+
+AGENDA_CUES = {
+    "what", "whats", "show", "list", "any", "anything", "agenda", "schedule", "plans",
+    "events", "calendar", "happening", "planned", "how",
+    "що", "щось", "покажи", "покажіть", "які", "розклад", "плани", "події", "справи",
+    "заплановано",
+}
+DELETE_WORDS = {
+    "delete", "remove", "cancel", "erase",
+    "видали", "видалити", "видаліть", "скасуй", "скасувати", "прибери",
+}
+NEXT_EVENT_WORDS = {"next", "upcoming", "наступна", "наступну", "найближча", "найближчу"}
+EVENT_NOUNS = {"event", "events", "подія", "подію", "події"}
+FILLER = {
+    "i", "im", "ive", "do", "does", "did", "have", "had", "got", "has", "is", "are", "am", "will", "be",
+    "what", "whats", "which", "show", "list", "tell", "give", "get", "see", "check", "me",
+    "my", "the", "a", "an", "on", "for", "in", "at", "of", "about", "please", "there",
+    "any", "anything", "calendar", "schedule", "agenda", "events", "event", "plans",
+    "planned", "going", "happening", "how", "many", "can", "could", "you", "to", "all",
+    "що", "в", "у", "мене", "мені", "є", "на", "які", "який", "яка", "яке", "події",
+    "подія", "подій", "подію", "плани", "планів", "покажи", "покажіть", "розклад",
+    "скажи", "будь", "ласка", "заплановано", "справи", "календар", "календарі", "мої",
+    "моя", "мій", "моє", "моїх", "маю", "буде", "чи", "щось", "для", "про", "всі", "усі",
+}
+# never answered here, even with a lower min_confidence
+CREATE_WORDS = {
+    "add", "create", "make", "book", "plan", "set", "move", "change", "rename", "update",
+    "reschedule", "replace", "swap", "postpone", "invite", "remind",
+    "додай", "додати", "створи", "створити", "заплануй", "запланувати", "перенеси",
+    "перенести", "зміни", "змінити", "запиши", "записати", "постав", "нагадай",
+}
+
+EVENT_COLUMNS = "id, name, start_date, end_date, description, category"
+LATENCY_WINDOW = 1024
+
+
+class Intent(NamedTuple):
+    name: str
+    actions: dict
+    confidence: float
+    # (start, end) of an agenda, the id of show/delete
+    params: tuple = ()
+
+
+def month_range(year: int, month: int):
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def nearest_year(today: date, month: int, day: int) -> date:
+    """The date in this year, or the next one if it is half a year past."""
+    moment = date(today.year, month, day)
+    if moment < today - timedelta(days=183):
+        moment = date(today.year + 1, month, day)
+    return moment
+
+
+def is_next(word: Optional[str]) -> bool:
+    return bool(word) and word not in THIS_WORDS
+
+
+def period_kind(word: str) -> str:
+    for kind, words in PERIOD_WORDS.items():
+        if word in words:
+            return kind
+    raise KeyError(word)
+
+
+def resolve(kind: str, match, today: date):
+    """(start, end) days of a matched date expression, end exclusive."""
+    if kind == "iso":
+        start = date(int(match[1]), int(match[2]), int(match[3]))
+    elif kind == "day_month":
+        start = nearest_year(today, MONTHS[match[2]], int(match[1]))
+    elif kind == "month_day":
+        start = nearest_year(today, MONTHS[match[1]], int(match[2]))
+    elif kind == "relative":
+        start = today + timedelta(days=RELATIVE_DAYS[match[1]])
+    elif kind == "weekday":
+        ahead = (WEEKDAYS[match[2]] - today.weekday()) % 7
+        if is_next(match[1]) and ahead == 0:
+            ahead = 7
+        start = today + timedelta(days=ahead)
+    elif kind == "in_month":
+        month = MONTHS[match[1]] if match[1] else MONTHS_IN[match[2]]
+        year = today.year + 1 if month < today.month - 6 else today.year
+        return month_range(year, month)
+    else:
+        period = period_kind(match[2])
+        if period == "month":
+            year, month = today.year, today.month
+            if is_next(match[1]):
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+            return month_range(year, month)
+        if period == "week":
+            start = today - timedelta(days=today.weekday())
+            if is_next(match[1]):
+                start += timedelta(days=7)
+            return start, start + timedelta(days=7)
+        # the coming (or current) Saturday and Sunday
+        start = today + timedelta(days=(5 - today.weekday()) % 7)
+        if today.weekday() == 6:
+            start = today - timedelta(days=1)
+        if is_next(match[1]):
+            start += timedelta(days=7)
+        return start, start + timedelta(days=2)
+    return start, start + timedelta(days=1)
+
+
+def find_dates(text: str, today: date):
+    """Date ranges in the text and the text without them."""
+    ranges = []
+    for kind, pattern in DATE_PATTERNS:
+        def replace(match, kind=kind):
+            try:
+                ranges.append(resolve(kind, match, today))
+            except ValueError:
+                # "31 лютого" is not a date, keep the words unexplained
+                return match[0]
+            return " "
+
+        text = pattern.sub(replace, text)
+    return ranges, text
+
+
+def select(condition: str) -> str:
+    return f"SELECT {EVENT_COLUMNS} FROM event WHERE {condition};"
+
+
+def to_actions(action_type: str, sql: str) -> dict:
+    return {"actions": [{"id": "action_1", "type": action_type, "sql": sql, "weather": False}]}
+
+
+class IntentParser:
+    def __init__(self, min_confidence: float = 1.0):
+        self.min_confidence = min_confidence
+        self.hits = Counter()
+        self.misses = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def match(self, question: str, today: date = None) -> Optional[Intent]:
+        """The intent of the question with its confidence, or None."""
+        today = today or datetime.now().date()
+        text = APOSTROPHES_RE.sub("", question.lower())
+        total = len(PUNCTUATION_RE.sub(" ", text).split())
+        if not total:
+            return None
+
+        ranges, text = find_dates(text, today)
+        ids = ID_RE.findall(text)
+        text = ID_RE.sub(" ", text)
+        words = PUNCTUATION_RE.sub(" ", text).split()
+        if len(ranges) > 1 or len(ids) > 1 or CREATE_WORDS.intersection(words):
+            return None
+        if words and words[0] == "schedule":
+            # "schedule a call tomorrow", not "my schedule tomorrow"
+            return None
+
+        present = set(words)
+        delete = bool(DELETE_WORDS & present)
+        unexplained = [
+            word for word in words
+            if word not in FILLER and word not in DELETE_WORDS and word not in NEXT_EVENT_WORDS
+        ]
+        confidence = 1 - len(unexplained) / total
+
+        if ids and not ranges:
+            id = int(ids[0])
+            if delete:
+                sql = f"DELETE FROM event WHERE id = {id};"
+                return Intent("delete", to_actions("delete", sql), confidence, (id,))
+            return Intent("show", to_actions("select", select(f"id = {id}")), confidence, (id,))
+        if delete or ids:
+            # deleting by name or date is left to the model
+            return None
+        if ranges and AGENDA_CUES & present:
+            start, end = ranges[0]
+            sql = select(
+                f"start_date < '{end.isoformat()} 00:00:00+00' "
+                f"AND end_date > '{start.isoformat()} 00:00:00+00' ORDER BY start_date"
+            )
+            return Intent("agenda", to_actions("select", sql), confidence, (start, end))
+        if not ranges and NEXT_EVENT_WORDS & present and EVENT_NOUNS & present:
+            sql = select("start_date >= NOW() ORDER BY start_date LIMIT 1")
+            return Intent("next", to_actions("select", sql), confidence)
+        return None
+
+    def parse(self, question: str, today: date = None) -> Optional[dict]:
+        """Actions for the question, None when the model has to do it."""
+        start = time.perf_counter()
+        intent = self.match(question, today)
+        if intent is not None and intent.confidence < self.min_confidence:
+            intent = None
+        self.latencies.append(time.perf_counter() - start)
+        if intent is None:
+            self.misses += 1
+            return None
+        self.hits[intent.name] += 1
+        return intent.actions
+
+    def stats(self) -> dict:
+        hits = sum(self.hits.values())
+        lookups = hits + self.misses
+        latencies = sorted(self.latencies)
+
+        def percentile(pct):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(pct / 100 * len(latencies)))] * 1e6
+
+        return {
+            "hits": hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "intents": dict(self.hits),
+            "p50_us": percentile(50),
+            "p99_us": percentile(99),
+        }
@@ -1,11 +1,45 @@
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-import requests, shutil
-from datetime import datetime
+import os, httpx, json, logging
+from contextlib import asynccontextmanager
 import model
+from audio import AudioError, AudioIngest
+from pipeline import Pipeline, StageTimeout, cancel_on_disconnect
+from telemetry import TelemetryMiddleware, log, metrics_response, propagate_request_id, timed_stage
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI()
+DJANGO_URL = os.getenv("DJANGO_URL", "http://10.10.91.219:8000/api/exec_sql_request/")
+AUDIO_MAX_BYTES = int(os.getenv("AUDIO_MAX_BYTES", 50 * 1024 * 1024))
+TRANSCRIBE_CONCURRENCY = int(os.getenv("TRANSCRIBE_CONCURRENCY", 4))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # one pooled client to Django for the whole app lifetime
+    app.state.http = httpx.AsyncClient(
+        timeout=httpx.Timeout(30, connect=5),
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        event_hooks={"request": [propagate_request_id]},
+    )
+    app.state.pipeline = Pipeline(
+        generate_actions=model.generate_actions,
+        generate_answer=model.generate_answer,
+        get_weather=model.get_weather,
+        http=app.state.http,
+        django_url=DJANGO_URL,
+        stream_answer=model.stream_answer,
+    )
+    app.state.audio = AudioIngest(
+        model.transcribe_audio,
+        max_bytes=AUDIO_MAX_BYTES,
+        concurrency=TRANSCRIBE_CONCURRENCY,
+    )
+    try:
+        yield
+    finally:
+        await app.state.http.aclose()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,7 +47,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
+# outermost, so its timings include the other middleware
+app.add_middleware(TelemetryMiddleware)
+
+@app.middleware("http")
+async def limit_audio_size(request: Request, call_next):
+    # reject oversized uploads before the multipart body is read
+    if request.url.path == "/ask_audio":
+        length = request.headers.get("content-length")
+        if length and length.isdigit() and int(length) > AUDIO_MAX_BYTES + 64 * 1024:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"Audio file is larger than {AUDIO_MAX_BYTES} bytes"},
+            )
+    return await call_next(request)
 
 class Question_text(BaseModel):
     question: str
@@ -21,38 +70,73 @@ class Question_text(BaseModel):
 class Answer(BaseModel):
     answer: str
 
-DJANGO_URL = "http://10.10.91.219:8000/api/exec_sql_request/"
+async def answer_question(request: Request, question: str) -> Answer:
+    log("question", question=question)
+    try:
+        answer = await cancel_on_disconnect(request, app.state.pipeline.ask(question))
+    except StageTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"Django Error: {e}")
+    if answer is None:
+        # the client went away, nobody is waiting for the answer
+        raise HTTPException(status_code=499, detail="Client disconnected")
+    log("answer", answer=answer)
+    return Answer(answer=answer)
 
 @app.post("/ask_text", response_model=Answer)
-def ask_text(q: Question_text):
-    print("Received question:", q.question)
-    actions = model.generate_actions(q.question)
-    print("Generated actions:", actions)
-    response = requests.post(DJANGO_URL, json=actions)
-    db_results = response.json()
-    for action in actions["actions"]:
-        if action.get("weather") and action["weather"] != False:
-            weather_info = model.get_weather("Košice", datetime.fromisoformat(action["weather"]))
-            db_results["weather"] = weather_info
-    print("DB Results:", db_results)
-    # db_results = {}
-    answer = model.generate_answer(db_results, q.question)
-    print("Generated answer:", answer)
-    return Answer(answer=answer)
+async def ask_text(q: Question_text, request: Request):
+    return await answer_question(request, q.question)
 
-@app.post("/ask_audio")
-def ask_audio(audio: UploadFile = File(...)):
+def sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str, ensure_ascii=False)}\n\n"
+
+@app.post("/ask_text/stream")
+async def ask_text_stream(q: Question_text):
+    """Server-Sent Events: "actions" with the database results first, then
+    "token" events with pieces of the answer and a final "done"."""
+    log("question", question=q.question, stream=True)
+
+    async def events():
+        try:
+            async for event, data in app.state.pipeline.ask_stream(q.question):
+                yield sse(event, data)
+        except StageTimeout as e:
+            yield sse("error", {"status": 504, "detail": str(e)})
+        except httpx.HTTPError as e:
+            yield sse("error", {"status": 502, "detail": f"Django Error: {e}"})
+
+    # StreamingResponse stops the generator when the client disconnects
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/ask_audio", response_model=Answer)
+async def ask_audio(request: Request, audio: UploadFile = File(...)):
+    log("audio", filename=audio.filename, content_type=audio.content_type, size=audio.size)
     try:
-        print(audio)
-    except Exception as e:
-        print("Error printing audio file info:", e)
-    print("Received request for /ask_audio")
-    print("audio =", audio)
-    print("filename =", getattr(audio, "filename", None))
-    print("content_type =", getattr(audio, "content_type", None))
-    filepath = f"temp/{audio.filename}"
-    with open(filepath, "wb") as buffer:
-        shutil.copyfileobj(audio.file, buffer)
-    question = model.transcribe_audio(filepath)
-    print("Transcribed question:", question)
-    return ask_text(Question_text(question=question))
+        with timed_stage("transcription"):
+            question = await app.state.audio.transcribe_upload(audio.file, audio.filename)
+    except AudioError as e:
+        log("audio_rejected", logging.WARNING, status=e.status_code, error=str(e))
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    finally:
+        await audio.close()
+    return await answer_question(request, question)
+
+@app.get("/audio/stats")
+async def audio_stats():
+    return app.state.audio.stats()
+
+@app.get("/intents/stats")
+async def intents_stats():
+    # hit rate and parse latency of the rule-based fast path
+    if model.intent_parser is None:
+        return {"enabled": False}
+    return {"enabled": True, **model.intent_parser.stats()}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return metrics_response()
@@ -1,7 +1,11 @@
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 from dotenv import load_dotenv
-import os, json, openai, requests
+import os, json, openai, asyncio
 from datetime import datetime
+from action_cache import ActionCache, OpenAIEmbedder
+from context import build_context
+from intents import IntentParser
+from weather import FORECAST_URL, ForecastCache, make_fetcher
 
 load_dotenv()
 KEY = os.getenv("KEY")
@@ -9,7 +13,7 @@ OPENWHEATHER_KEY = os.getenv("OPENWEATHER_KEY")
 
 if not KEY:
     raise RuntimeError("OPENAI_API_KEY is not in environment")
-client = OpenAI(api_key=KEY)
+client = AsyncOpenAI(api_key=KEY)
 
 def load_prompt(path):
     with open(path, "r", encoding='utf-8') as f:
@@ -18,11 +22,33 @@ def load_prompt(path):
 ACTIONS_PROMPT = load_prompt("prompts/to_actions.txt")
 ANSWER_PROMPT = load_prompt("prompts/to_answer.txt")
 
-def get_weather(city: str, date: datetime) -> dict:
-    url = f"http://api.openweathermap.org/data/2.5/forecast?q={city}&appid={OPENWHEATHER_KEY}&units=metric"
-    data = requests.get(url).json()
+# size of the database results in the answer prompt, see context.py
+ANSWER_CONTEXT_TOKENS = int(os.getenv("ANSWER_CONTEXT_TOKENS", 1500))
+ANSWER_CONTEXT_TEXT = int(os.getenv("ANSWER_CONTEXT_TEXT", 160))
+
+action_cache = ActionCache(
+    path=os.getenv("ACTION_CACHE_PATH", "temp/action_cache.json"),
+    ttl=float(os.getenv("ACTION_CACHE_TTL", 7 * 24 * 3600)),
+    max_entries=int(os.getenv("ACTION_CACHE_SIZE", 1000)),
+    embedder=OpenAIEmbedder(OpenAI(api_key=KEY)) if os.getenv("ACTION_CACHE_EMBEDDINGS") == "True" else None,
+)
+
+# common questions ("what do I have tomorrow", "delete event 42") skip the model
+intent_parser = IntentParser(
+    min_confidence=float(os.getenv("FAST_PATH_CONFIDENCE", 1.0)),
+) if os.getenv("FAST_PATH", "True") == "True" else None
+
+forecast_cache = ForecastCache(
+    make_fetcher(
+        OPENWHEATHER_KEY,
+        url=os.getenv("OPENWEATHER_URL", FORECAST_URL),
+        timeout=float(os.getenv("OPENWEATHER_TIMEOUT", 5)),
+    )
+)
+
+async def get_weather(city: str, date: datetime) -> dict:
     target_timestamp = int(date.timestamp())
-    closest = min(data['list'], key=lambda x: abs(x['dt'] - target_timestamp))
+    closest = await forecast_cache.closest(city, target_timestamp)
     return {
         "temp": closest["main"]["temp"],
         "weather": closest["weather"][0]["description"],
@@ -30,19 +56,28 @@ def get_weather(city: str, date: datetime) -> dict:
     }
 
 
-def transcribe_audio(file_path: str) -> str:
-    with open(file_path, "rb") as audio_file:
-        transcript = client.audio.transcriptions.create(
-            model="whisper-1",
-            file=audio_file
-        )
+async def transcribe_audio(audio_file, filename: str = "audio.mp3") -> str:
+    # the open file is streamed to the API as-is, `filename` tells it the format
+    transcript = await client.audio.transcriptions.create(
+        model="whisper-1",
+        file=(filename, audio_file)
+    )
     return transcript.text
 
-def generate_actions(user_input: str) -> dict:
-    response = client.responses.create(
+async def generate_actions(user_input: str) -> dict:
+    if intent_parser is not None:
+        actions = intent_parser.parse(user_input)
+        if actions is not None:
+            return actions
+    return await action_cache.aget_or_generate(user_input, request_actions)
+
+async def request_actions(user_input: str) -> dict:
+    response = await client.responses.create(
     model="gpt-5.1",
     input=[
         {"role": "system", "content": ACTIONS_PROMPT},
+        # relative dates are resolved by the model and by action_cache against the same day
+        {"role": "system", "content": f"Current date: {datetime.now():%Y-%m-%d (%A)}"},
         {"role": "user", "content": user_input}
     ],
     temperature=0,
@@ -51,42 +86,62 @@ def generate_actions(user_input: str) -> dict:
     actions_dict = json.loads(response.output_text)
     return actions_dict
 
-def generate_answer(result: dict, user_input: str) -> str:
-    prompt = f"""{ANSWER_PROMPT}
-    User Input: {user_input}
-    Database Results:
-    {json.dumps(result, indent=2)}
-    """
-    response = client.responses.create(
-    model="gpt-5.1",
-    input=[
-        {"role": "system", "content": prompt},
+def answer_input(result: dict, user_input: str) -> list:
+    context = build_context(
+        result, user_input, budget=ANSWER_CONTEXT_TOKENS, max_text=ANSWER_CONTEXT_TEXT
+    )
+    return [
+        # nothing per request in the first message, so its tokens are a
+        # prefix the provider can cache across calls
+        {"role": "system", "content": ANSWER_PROMPT},
+        {"role": "system", "content": f"User Input: {user_input}\nDatabase Results:\n{context}"},
         {"role": "user", "content": "Please generate a friendly response for the user."}
-    ],
+    ]
+
+async def generate_answer(result: dict, user_input: str) -> str:
+    response = await client.responses.create(
+    model="gpt-5.1",
+    input=answer_input(result, user_input),
     temperature=0.3,
     max_output_tokens=500
     )
     return response.output_text
 
-if __name__ == "__main__":
+async def stream_answer(result: dict, user_input: str):
+    """Yield the answer text piece by piece as the model produces it."""
+    stream = await client.responses.create(
+    model="gpt-5.1",
+    input=answer_input(result, user_input),
+    temperature=0.3,
+    max_output_tokens=500,
+    stream=True
+    )
+    async for event in stream:
+        if event.type == "response.output_text.delta":
+            yield event.delta
+
+async def chat():
     while True:
-        # question = transcribe_audio("input_ua.mp3")
+        # question = await transcribe_audio("input_ua.mp3")
         # print(question)
         question = input("Введіть ваше питання (або 'exit' для виходу): ")
         if question.lower() == 'exit':
             break
-        actions = generate_actions(question)
+        actions = await generate_actions(question)
         print(f"Згенеровані дії: {actions}")
         result = {}
         for action in actions["actions"]:
             if action.get("weather") and action["weather"] != False:
-                weather_info = get_weather("Košice", datetime.fromisoformat(action["weather"]))
+                weather_info = await get_weather("Košice", datetime.fromisoformat(action["weather"]))
                 result["weather"] = weather_info['weather']
         print(f"Отримані результати: {result}")
-        answer = generate_answer(result, question)
+        answer = await generate_answer(result, question)
         print(f"Answer: {answer}")
         # city = input("Enter city name for weather forecast (or 'exit' to quit): ")
         # if city.lower() == 'exit':
         #     break
-        # weather_info = get_weather(city, datetime.now())
-        # print(f"Weather Info: {weather_info}")
\ No newline at end of file
+        # weather_info = await get_weather(city, datetime.now())
+        # print(f"Weather Info: {weather_info}")
+
+if __name__ == "__main__":
+    asyncio.run(chat())
\ No newline at end of file
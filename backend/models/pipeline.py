@@ -0,0 +1,145 @@
+"""The async question -> answer pipeline behind /ask_text.
+
+1. the model turns the question into SQL actions,
+2. the actions run on Django while the weather for every action with a
+   ``weather`` flag is looked up concurrently,
+3. the model writes the answer from the combined results, either in one
+   piece (``ask``) or streamed token by token after an early event with
+   the action results (``ask_stream``).
+
+Every stage has its own timeout. A slow weather lookup is dropped from the
+results, any other stage that times out fails the request with
+StageTimeout. Every stage is timed into ``model_stage_seconds``. The
+backends are passed in, so the same pipeline runs with
+the real OpenAI/Django/OpenWeatherMap clients or with stubs.
+"""
+
+import asyncio
+import logging
+import os
+from contextlib import nullcontext
+from datetime import datetime
+
+from telemetry import log, timed_stage
+
+STAGE_TIMEOUTS = {
+    "actions": float(os.getenv("ACTIONS_TIMEOUT", 30)),
+    "database": float(os.getenv("DATABASE_TIMEOUT", 15)),
+    "weather": float(os.getenv("WEATHER_TIMEOUT", 5)),
+    "answer": float(os.getenv("ANSWER_TIMEOUT", 30)),
+}
+
+WEATHER_CITY = "Košice"
+
+
+class StageTimeout(TimeoutError):
+    def __init__(self, stage: str):
+        super().__init__(f"Stage '{stage}' timed out")
+        self.stage = stage
+
+
+async def stage(name: str, awaitable, timed: bool = True):
+    with timed_stage(name) if timed else nullcontext():
+        try:
+            async with asyncio.timeout(STAGE_TIMEOUTS[name]):
+                return await awaitable
+        except TimeoutError:
+            raise StageTimeout(name)
+
+
+class Pipeline:
+    def __init__(
+        self,
+        generate_actions,
+        generate_answer,
+        get_weather,
+        http,
+        django_url,
+        stream_answer=None,
+    ):
+        self.generate_actions = generate_actions
+        self.generate_answer = generate_answer
+        self.stream_answer = stream_answer
+        self.get_weather = get_weather
+        self.http = http
+        self.django_url = django_url
+
+    async def execute(self, actions: dict) -> dict:
+        response = await self.http.post(self.django_url, json=actions)
+        response.raise_for_status()
+        return response.json()
+
+    async def weather(self, action: dict):
+        try:
+            return await stage(
+                "weather",
+                self.get_weather(WEATHER_CITY, datetime.fromisoformat(action["weather"])),
+            )
+        except Exception as e:
+            # the answer is still useful without the forecast
+            log("weather_failed", logging.WARNING, error=repr(e))
+            return None
+
+    async def run(self, question: str) -> dict:
+        """Actions, database results (with weather) for a question."""
+        actions = await stage("actions", self.generate_actions(question))
+        weather_actions = [
+            action for action in actions["actions"] if action.get("weather")
+        ]
+
+        db_results, *forecasts = await asyncio.gather(
+            stage("database", self.execute(actions)),
+            *(self.weather(action) for action in weather_actions),
+        )
+
+        results = {result.get("id"): result for result in db_results.get("results", [])}
+        for action, weather_info in zip(weather_actions, forecasts):
+            if weather_info is None:
+                continue
+            if action.get("id") in results:
+                results[action["id"]]["weather_info"] = weather_info
+            else:
+                db_results["weather"] = weather_info
+        return db_results
+
+    async def ask(self, question: str) -> str:
+        db_results = await self.run(question)
+        return await stage("answer", self.generate_answer(db_results, question))
+
+    async def ask_stream(self, question: str):
+        """Yield ("actions", results), then ("token", ...) events and ("done", ...)."""
+        db_results = await self.run(question)
+        yield "actions", db_results
+
+        parts = []
+        tokens = self.stream_answer(db_results, question).__aiter__()
+        # one "answer" observation for the whole stream, not one per token
+        with timed_stage("answer"):
+            while True:
+                try:
+                    # the answer timeout applies to the gap between two tokens
+                    token = await stage("answer", anext(tokens), timed=False)
+                except StopAsyncIteration:
+                    break
+                parts.append(token)
+                yield "token", {"text": token}
+        yield "done", {"answer": "".join(parts)}
+
+
+async def cancel_on_disconnect(request, awaitable, poll: float = 0.5):
+    """Await `awaitable`, cancelling it if the HTTP client goes away.
+
+    Returns None when the client disconnected first.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                return None
+    finally:
+        if not task.done():
+            task.cancel()
@@ -0,0 +1,639 @@
+"""Tests of the model service, with stubs in place of OpenAI and Django.
+
+Run from this folder: ``python -m unittest tests``.
+"""
+
+import asyncio
+import io
+import json
+import os
+import stat
+import sys
+import tempfile
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+
+import httpx
+from fastapi.testclient import TestClient
+
+# model.py refuses to load without a key; no test reaches OpenAI
+os.environ.setdefault("KEY", "test")
+# the sampled INFO lines would land in the test report
+os.environ.setdefault("LOG_SAMPLE_RATE", "0")
+
+import main
+from action_cache import ActionCache, Embedder
+from audio import AudioError, AudioIngest, AudioTooLarge, UnsupportedAudio, transcode
+from pipeline import STAGE_TIMEOUTS, Pipeline, StageTimeout
+from weather import Forecast, ForecastCache
+
+TODAY = date(2025, 12, 1)
+
+
+def plan(action_type, sql):
+    return {"actions": [{"id": "action_1", "type": action_type, "sql": sql, "weather": False}]}
+
+
+class SameVector(Embedder):
+    """Every question looks alike, so any entry would be an embedding hit."""
+
+    def embed(self, text):
+        return [1.0, 0.0]
+
+
+class FakeLLM:
+    """generate_actions of a model that resolves "tomorrow" and counts its calls."""
+
+    def __init__(self, today=TODAY):
+        self.today = today
+        self.calls = 0
+
+    def answer(self, question):
+        day = (self.today + timedelta(days=1)).isoformat()
+        if question.lower().startswith("add"):
+            return plan("create", f"INSERT INTO event (name, start_date) VALUES ('{question}', '{day}');")
+        return plan("select", f"SELECT * FROM event WHERE start_date::date = '{day}';")
+
+    def generate(self, question):
+        self.calls += 1
+        return self.answer(question)
+
+    async def agenerate(self, question):
+        self.calls += 1
+        await asyncio.sleep(0)
+        return self.answer(question)
+
+
+class GetOrGenerateTests(unittest.TestCase):
+    def test_a_hit_does_not_call_the_model(self):
+        llm, cache = FakeLLM(), ActionCache()
+        first = cache.get_or_generate("What do I have tomorrow?", llm.generate, TODAY)
+        second = cache.get_or_generate("what do i have tomorrow", llm.generate, TODAY)
+        self.assertEqual(llm.calls, 1)
+        self.assertEqual(first, second)
+
+    def test_a_hit_on_another_day_fills_in_that_date(self):
+        llm, cache = FakeLLM(), ActionCache()
+        cache.get_or_generate("What do I have tomorrow?", llm.generate, TODAY)
+        llm.today = TODAY + timedelta(days=3)
+        actions = cache.get_or_generate("What do I have tomorrow?", llm.generate, llm.today)
+        self.assertEqual(llm.calls, 1)
+        self.assertEqual(actions, llm.answer("What do I have tomorrow?"))
+
+    def test_a_miss_calls_the_model_once_and_stores(self):
+        llm, cache = FakeLLM(), ActionCache()
+        cache.get_or_generate("What do I have tomorrow?", llm.generate, TODAY)
+        cache.get_or_generate("Show my meetings tomorrow", llm.generate, TODAY)
+        self.assertEqual(llm.calls, 2)
+        self.assertEqual(cache.stats()["size"], 2)
+
+    def test_a_write_plan_is_generated_for_a_near_duplicate(self):
+        llm, cache = FakeLLM(), ActionCache(similarity=0.5)
+        cache.get_or_generate("add gym tomorrow at 7am", llm.generate, TODAY)
+        actions = cache.get_or_generate("add gym tomorrow at 7pm", llm.generate, TODAY)
+        self.assertEqual(llm.calls, 2)
+        self.assertIn("7pm", actions["actions"][0]["sql"])
+        cache.get_or_generate("Add gym tomorrow at 7pm!", llm.generate, TODAY)
+        self.assertEqual(llm.calls, 2)
+
+
+class AsyncGetOrGenerateTests(unittest.IsolatedAsyncioTestCase):
+    async def test_hit_miss_and_write_plan(self):
+        path = os.path.join(tempfile.mkdtemp(), "action_cache.json")
+        llm, cache = FakeLLM(), ActionCache(path=path, similarity=0.5)
+        await cache.aget_or_generate("What do I have tomorrow?", llm.agenerate, TODAY)
+        await cache.aget_or_generate("what do i have tomorrow", llm.agenerate, TODAY)
+        self.assertEqual(llm.calls, 1)
+        await cache.aget_or_generate("add gym tomorrow at 7am", llm.agenerate, TODAY)
+        await cache.aget_or_generate("add gym tomorrow at 7pm", llm.agenerate, TODAY)
+        self.assertEqual(llm.calls, 3)
+        # saved from a thread, a restart sees every entry
+        self.assertEqual(ActionCache(path=path).stats()["size"], 3)
+
+    async def test_the_file_is_not_written_on_the_event_loop(self):
+        path = os.path.join(tempfile.mkdtemp(), "action_cache.json")
+        cache = ActionCache(path=path)
+        on_loop = []
+        write = cache.write
+
+        def spy(entries):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            write(entries)
+
+        cache.write = spy
+        await cache.aget_or_generate("What do I have tomorrow?", FakeLLM().agenerate, TODAY)
+        self.assertEqual(on_loop, [False])
+
+
+class ActionCacheTests(unittest.TestCase):
+    def test_near_duplicate_reads_are_served(self):
+        cache = ActionCache()
+        select = plan("select", "SELECT * FROM event WHERE start_date::date = '2025-12-02';")
+        cache.store("what do I have tomorrow at work", select, TODAY)
+        self.assertEqual(cache.lookup("what do i have tomorrow at work please", TODAY), select)
+        self.assertEqual(cache.near_hits, 1)
+
+    def test_near_duplicate_writes_are_not_served(self):
+        cache = ActionCache(similarity=0.5, embedder=SameVector(), embedding_similarity=0.5)
+        cache.store(
+            "add a gym session tomorrow at 7am for one hour",
+            plan("create", "INSERT INTO event (name) VALUES ('gym 7am');"),
+            TODAY,
+        )
+        cache.store(
+            "schedule a meeting with anna tomorrow",
+            plan("create", "INSERT INTO event (name) VALUES ('Meeting with Anna');"),
+            TODAY,
+        )
+        self.assertIsNone(cache.lookup("add a gym session tomorrow at 7pm for one hour", TODAY))
+        self.assertIsNone(cache.lookup("schedule a meeting with boris tomorrow", TODAY))
+        self.assertEqual(cache.near_hits, 0)
+
+    def test_exact_writes_are_served(self):
+        cache = ActionCache()
+        delete = plan("delete", "DELETE FROM event WHERE id = 42;")
+        cache.store("Delete event 42", delete, TODAY)
+        self.assertEqual(cache.lookup("delete event 42!", TODAY), delete)
+
+    def test_entries_saved_without_the_read_only_flag(self):
+        path = os.path.join(tempfile.mkdtemp(), "action_cache.json")
+        cache = ActionCache(path=path, similarity=0.5)
+        cache.store("schedule a meeting with anna", plan("create", "INSERT INTO event (name) VALUES ('Anna');"))
+        with open(path, encoding="utf-8") as f:
+            entries = json.load(f)
+        for entry in entries:
+            del entry["read_only"]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+        self.assertIsNone(ActionCache(path=path, similarity=0.5).lookup("schedule a meeting with boris"))
+
+
+def points(*timestamps):
+    return [{"dt": dt, "main": {"temp": dt / 100}} for dt in timestamps]
+
+
+class FakeFetcher:
+    """Forecast fetcher that waits for `release` and counts its calls."""
+
+    def __init__(self, error=None):
+        self.calls = 0
+        self.error = error
+        self.release = asyncio.Event()
+
+    async def __call__(self, city):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return points(300, 100, 200)
+
+
+class ForecastTests(unittest.TestCase):
+    def setUp(self):
+        self.forecast = Forecast(points(300, 100, 200), expires_at=0)
+
+    def test_entries_are_sorted(self):
+        self.assertEqual(self.forecast.timestamps, [100, 200, 300])
+
+    def test_before_the_first_point(self):
+        self.assertEqual(self.forecast.closest(5)["dt"], 100)
+
+    def test_after_the_last_point(self):
+        self.assertEqual(self.forecast.closest(10_000)["dt"], 300)
+
+    def test_exact_match(self):
+        self.assertEqual(self.forecast.closest(100)["dt"], 100)
+        self.assertEqual(self.forecast.closest(200)["dt"], 200)
+        self.assertEqual(self.forecast.closest(300)["dt"], 300)
+
+    def test_between_points_the_nearer_one_wins(self):
+        self.assertEqual(self.forecast.closest(140)["dt"], 100)
+        self.assertEqual(self.forecast.closest(160)["dt"], 200)
+        # a tie goes to the earlier point
+        self.assertEqual(self.forecast.closest(150)["dt"], 100)
+
+
+class ForecastCacheTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.now = 1000.0
+
+    def clock(self):
+        return self.now
+
+    async def test_concurrent_callers_share_one_fetch(self):
+        fetch = FakeFetcher()
+        cache = ForecastCache(fetch, slot=3600, clock=self.clock)
+        callers = [asyncio.ensure_future(cache.get("Kyiv")) for _ in range(20)]
+        await asyncio.sleep(0)
+        fetch.release.set()
+        forecasts = await asyncio.gather(*callers)
+        self.assertEqual(fetch.calls, 1)
+        self.assertTrue(all(forecast is forecasts[0] for forecast in forecasts))
+        self.assertEqual(cache.in_flight, {})
+
+    async def test_other_cities_are_fetched_separately(self):
+        fetch = FakeFetcher()
+        fetch.release.set()
+        cache = ForecastCache(fetch, slot=3600, clock=self.clock)
+        await asyncio.gather(cache.get("Kyiv"), cache.get("Lviv"), cache.get("Kyiv"))
+        self.assertEqual(fetch.calls, 2)
+
+    async def test_a_cancelled_caller_does_not_cancel_the_fetch(self):
+        fetch = FakeFetcher()
+        cache = ForecastCache(fetch, slot=3600, clock=self.clock)
+        first = asyncio.ensure_future(cache.get("Kyiv"))
+        second = asyncio.ensure_future(cache.get("Kyiv"))
+        await asyncio.sleep(0)
+        first.cancel()
+        fetch.release.set()
+        forecast = await second
+        self.assertEqual(forecast.timestamps, [100, 200, 300])
+        self.assertEqual(fetch.calls, 1)
+
+    async def test_forecast_expires_with_the_slot(self):
+        fetch = FakeFetcher()
+        fetch.release.set()
+        cache = ForecastCache(fetch, slot=3600, clock=self.clock)
+        forecast = await cache.get("Kyiv")
+        self.assertEqual(forecast.expires_at, 3600)
+
+        self.now = 3599.0
+        self.assertIs(await cache.get("Kyiv"), forecast)
+        self.assertEqual((fetch.calls, cache.hits), (1, 1))
+
+        self.now = 3600.0
+        refreshed = await cache.get("Kyiv")
+        self.assertIsNot(refreshed, forecast)
+        self.assertEqual(refreshed.expires_at, 7200)
+        self.assertEqual(fetch.calls, 2)
+
+    async def test_a_failed_fetch_is_retried_by_the_next_call(self):
+        fetch = FakeFetcher(error=RuntimeError("upstream down"))
+        fetch.release.set()
+        cache = ForecastCache(fetch, slot=3600, clock=self.clock)
+        results = await asyncio.gather(cache.get("Kyiv"), cache.get("Kyiv"), return_exceptions=True)
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+        self.assertEqual(fetch.calls, 1)
+
+        fetch.error = None
+        await cache.get("Kyiv")
+        self.assertEqual(fetch.calls, 2)
+
+
+WEATHER_PLAN = {
+    "actions": [
+        {"id": "action_1", "type": "select", "sql": "SELECT 1;", "weather": "2025-12-02T10:00:00"},
+        {"id": "action_2", "type": "select", "sql": "SELECT 2;", "weather": False},
+    ]
+}
+DB_RESULTS = {"results": [{"id": "action_1", "rows": [{"name": "Hike"}]}, {"id": "action_2", "rows": []}]}
+FORECAST = {"temp": 3.5, "weather": "light snow"}
+
+
+class StubResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return json.loads(json.dumps(self.payload))
+
+
+class StubStages:
+    """The backends of a Pipeline; each stage waits for its `delay`."""
+
+    def __init__(self, plan=WEATHER_PLAN, delays=None):
+        self.plan = plan
+        self.delays = delays or {}
+        self.started = {name: asyncio.Event() for name in ("database", "weather")}
+        self.answered_with = None
+
+    async def wait(self, name):
+        delay = self.delays.get(name, 0)
+        if delay is None:
+            # never finishes, only its timeout ends it
+            await asyncio.Event().wait()
+        await asyncio.sleep(delay)
+
+    async def generate_actions(self, question):
+        await self.wait("actions")
+        return self.plan
+
+    async def post(self, url, json):
+        self.started["database"].set()
+        await self.wait("database")
+        return StubResponse(DB_RESULTS)
+
+    async def get_weather(self, city, moment):
+        self.started["weather"].set()
+        await self.wait("weather")
+        return FORECAST
+
+    async def generate_answer(self, db_results, question):
+        await self.wait("answer")
+        self.answered_with = db_results
+        return "with weather" if "weather_info" in db_results["results"][0] else "without weather"
+
+    async def stream_answer(self, db_results, question):
+        for token in ("You ", "have ", "a hike"):
+            await self.wait("answer")
+            yield token
+
+    def pipeline(self):
+        return Pipeline(
+            generate_actions=self.generate_actions,
+            generate_answer=self.generate_answer,
+            get_weather=self.get_weather,
+            http=self,
+            django_url="http://django/api/exec_sql_request/",
+            stream_answer=self.stream_answer,
+        )
+
+
+class ConcurrentStages(StubStages):
+    """Database and weather stubs that only finish once both have started."""
+
+    async def post(self, url, json):
+        self.started["database"].set()
+        await self.started["weather"].wait()
+        return StubResponse(DB_RESULTS)
+
+    async def get_weather(self, city, moment):
+        self.started["weather"].set()
+        await self.started["database"].wait()
+        return FORECAST
+
+
+@mock.patch.dict(STAGE_TIMEOUTS, {"actions": 0.5, "database": 0.5, "weather": 0.05, "answer": 0.5})
+class PipelineTests(unittest.IsolatedAsyncioTestCase):
+    async def test_the_forecast_goes_with_its_action(self):
+        stages = StubStages()
+        self.assertEqual(await stages.pipeline().ask("Do I hike tomorrow?"), "with weather")
+        results = stages.answered_with["results"]
+        self.assertEqual(results[0]["weather_info"], FORECAST)
+        self.assertNotIn("weather_info", results[1])
+
+    async def test_database_and_weather_run_concurrently(self):
+        # run one after the other, each stub would wait for the other one
+        # until the database timeout
+        stages = ConcurrentStages()
+        self.assertEqual(await stages.pipeline().ask("Do I hike tomorrow?"), "with weather")
+
+    async def test_a_slow_forecast_is_dropped(self):
+        stages = StubStages(delays={"weather": None})
+        with self.assertLogs("models", "WARNING") as logs:
+            self.assertEqual(await stages.pipeline().ask("Do I hike tomorrow?"), "without weather")
+        self.assertIn("weather_failed", logs.output[0])
+        self.assertEqual(stages.answered_with, DB_RESULTS)
+
+    async def test_a_failed_forecast_is_dropped(self):
+        stages = StubStages()
+
+        async def get_weather(city, moment):
+            raise RuntimeError("upstream down")
+
+        stages.get_weather = get_weather
+        with self.assertLogs("models", "WARNING"):
+            self.assertEqual(await stages.pipeline().ask("Do I hike tomorrow?"), "without weather")
+
+    async def test_a_slow_database_fails_the_question(self):
+        stages = StubStages(delays={"database": None})
+        with self.assertRaises(StageTimeout) as raised:
+            await stages.pipeline().ask("Do I hike tomorrow?")
+        self.assertEqual(raised.exception.stage, "database")
+        self.assertIsNone(stages.answered_with)
+
+    async def test_slow_actions_fail_before_the_database_is_asked(self):
+        stages = StubStages(delays={"actions": None})
+        with self.assertRaises(StageTimeout) as raised:
+            await stages.pipeline().ask("Do I hike tomorrow?")
+        self.assertEqual(raised.exception.stage, "actions")
+        self.assertFalse(stages.started["database"].is_set())
+
+    async def test_stream(self):
+        events = [event async for event in StubStages().pipeline().ask_stream("Do I hike tomorrow?")]
+        self.assertEqual([name for name, _ in events], ["actions", "token", "token", "token", "done"])
+        self.assertEqual(events[0][1]["results"][0]["weather_info"], FORECAST)
+        self.assertEqual(events[-1][1], {"answer": "You have a hike"})
+
+    async def test_the_answer_timeout_is_per_token(self):
+        # 0.3 s per token, 0.9 s in all: longer than the 0.5 s answer timeout
+        events = [
+            name async for name, _ in StubStages(delays={"answer": 0.3}).pipeline().ask_stream("Do I hike?")
+        ]
+        self.assertEqual(events[-1], "done")
+
+    async def test_a_stalled_stream_fails(self):
+        events = []
+        with self.assertRaises(StageTimeout) as raised:
+            async for name, _ in StubStages(delays={"answer": None}).pipeline().ask_stream("Do I hike?"):
+                events.append(name)
+        self.assertEqual(raised.exception.stage, "answer")
+        self.assertEqual(events, ["actions"])
+
+
+def parse_sse(body: str) -> list:
+    """(event, data) of every Server-Sent Event of a response body."""
+    events = []
+    for block in body.split("\n\n"):
+        if not block:
+            continue
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        assert set(fields) == {"event", "data"}, block
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+@mock.patch.dict(STAGE_TIMEOUTS, {"actions": 0.5, "database": 0.5, "weather": 0.05, "answer": 0.5})
+class AskTextStreamTests(unittest.TestCase):
+    def setUp(self):
+        self.client = self.enterContext(TestClient(main.app))
+
+    def stream(self, stages):
+        self.client.app.state.pipeline = stages.pipeline()
+        return self.client.post("/ask_text/stream", json={"question": "Do I hike tomorrow?"})
+
+    def test_events(self):
+        response = self.stream(StubStages())
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/event-stream"))
+        self.assertEqual(response.headers["cache-control"], "no-cache")
+        # every event is "event: ...\ndata: <one line of JSON>\n\n"
+        self.assertTrue(response.text.startswith("event: actions\ndata: {"))
+        self.assertTrue(response.text.endswith("\n\n"))
+
+        events = parse_sse(response.text)
+        self.assertEqual([name for name, _ in events], ["actions", "token", "token", "token", "done"])
+        self.assertEqual(events[0][1]["results"][0]["weather_info"], FORECAST)
+        self.assertEqual([data["text"] for name, data in events if name == "token"], ["You ", "have ", "a hike"])
+        self.assertEqual(events[-1], ("done", {"answer": "You have a hike"}))
+
+    def test_a_timeout_ends_with_an_error_event(self):
+        events = parse_sse(self.stream(StubStages(delays={"answer": None})).text)
+        self.assertEqual([name for name, _ in events], ["actions", "error"])
+        self.assertEqual(events[-1][1], {"status": 504, "detail": "Stage 'answer' timed out"})
+
+    def test_a_django_error_ends_with_an_error_event(self):
+        stages = StubStages()
+
+        async def post(url, json):
+            raise httpx.ConnectError("connection refused")
+
+        stages.post = post
+        response = self.stream(stages)
+        # the status line was sent before the error, it stays 200
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            parse_sse(response.text),
+            [("error", {"status": 502, "detail": "Django Error: connection refused"})],
+        )
+
+
+class FakeTranscriber:
+    """transcribe of the API: records its calls, waits for `release` if set."""
+
+    def __init__(self):
+        self.calls = []
+        self.release = None
+        self.running = 0
+        self.most_running = 0
+
+    async def __call__(self, file, filename):
+        self.calls.append((file, filename, file.read()))
+        self.running += 1
+        self.most_running = max(self.most_running, self.running)
+        try:
+            if self.release is not None:
+                await self.release.wait()
+        finally:
+            self.running -= 1
+        return f"transcript of {filename}"
+
+
+def fake_ffmpeg(returncode=0) -> str:
+    """An executable that copies stdin to stdout like a lossless ffmpeg."""
+    path = os.path.join(tempfile.mkdtemp(), "ffmpeg")
+    with open(path, "w") as f:
+        f.write(
+            f"#!{sys.executable}\n"
+            "import shutil, sys\n"
+            "shutil.copyfileobj(sys.stdin.buffer, sys.stdout.buffer)\n"
+            f"sys.exit({returncode})\n"
+        )
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    return path
+
+
+# no ffmpeg on the PATH, whether or not this machine has one
+@mock.patch("audio.shutil.which", return_value=None)
+class AudioIngestTests(unittest.IsolatedAsyncioTestCase):
+    async def test_a_supported_file_is_passed_through(self, which):
+        transcribe = FakeTranscriber()
+        ingest = AudioIngest(transcribe)
+        upload = io.BytesIO(b"ID3 audio")
+        upload.seek(4)
+        text = await ingest.transcribe_upload(upload, "../../uploads/Note.MP3")
+        self.assertEqual(text, "transcript of Note.MP3")
+        # the same buffer from its start, under the base name only
+        self.assertEqual(transcribe.calls, [(upload, "Note.MP3", b"ID3 audio")])
+        self.assertEqual(ingest.stats()["passed_through"], 1)
+
+    async def test_too_large(self, which):
+        transcribe = FakeTranscriber()
+        ingest = AudioIngest(transcribe, max_bytes=8)
+        with self.assertRaises(AudioTooLarge) as raised:
+            await ingest.transcribe_upload(io.BytesIO(b"123456789"), "note.mp3")
+        self.assertEqual(raised.exception.status_code, 413)
+        self.assertEqual((transcribe.calls, ingest.stats()["rejected"]), ([], 1))
+
+    async def test_unsupported_format_without_ffmpeg(self, which):
+        transcribe = FakeTranscriber()
+        ingest = AudioIngest(transcribe)
+        with self.assertRaises(UnsupportedAudio) as raised:
+            await ingest.transcribe_upload(io.BytesIO(b"#!AMR audio"), "note.amr")
+        self.assertEqual(raised.exception.status_code, 415)
+        self.assertEqual((transcribe.calls, ingest.stats()["rejected"]), ([], 1))
+
+    async def test_empty_upload(self, which):
+        transcribe = FakeTranscriber()
+        ingest = AudioIngest(transcribe)
+        with self.assertRaises(AudioError) as raised:
+            await ingest.transcribe_upload(io.BytesIO(), "note.mp3")
+        self.assertEqual(raised.exception.status_code, 400)
+        self.assertEqual((transcribe.calls, ingest.stats()["rejected"]), ([], 1))
+
+    async def test_at_most_concurrency_transcriptions_run(self, which):
+        transcribe = FakeTranscriber()
+        transcribe.release = asyncio.Event()
+        ingest = AudioIngest(transcribe, concurrency=2)
+        uploads = [
+            asyncio.ensure_future(ingest.transcribe_upload(io.BytesIO(b"audio"), f"{i}.mp3"))
+            for i in range(5)
+        ]
+        for _ in range(3):
+            await asyncio.sleep(0)
+        self.assertEqual(ingest.stats()["active"], 2)
+        self.assertEqual(ingest.stats()["waiting"], 3)
+
+        transcribe.release.set()
+        await asyncio.gather(*uploads)
+        self.assertEqual(transcribe.most_running, 2)
+        self.assertEqual(len(transcribe.calls), 5)
+        self.assertEqual((ingest.stats()["active"], ingest.stats()["waiting"]), (0, 0))
+
+    async def test_a_cancelled_upload_frees_its_slot(self, which):
+        transcribe = FakeTranscriber()
+        transcribe.release = asyncio.Event()
+        ingest = AudioIngest(transcribe, concurrency=1)
+        first = asyncio.ensure_future(ingest.transcribe_upload(io.BytesIO(b"audio"), "1.mp3"))
+        await asyncio.sleep(0)
+        first.cancel()
+        transcribe.release.set()
+        self.assertEqual(await ingest.transcribe_upload(io.BytesIO(b"audio"), "2.mp3"), "transcript of 2.mp3")
+        self.assertEqual(ingest.stats()["active"], 0)
+
+    async def test_unsupported_format_is_transcoded(self, which):
+        transcribe = FakeTranscriber()
+        ingest = AudioIngest(transcribe, ffmpeg=fake_ffmpeg())
+        audio = os.urandom(200_000)
+        self.assertEqual(await ingest.transcribe_upload(io.BytesIO(audio), "note.amr"), "transcript of audio.mp3")
+        (converted, filename, content), = transcribe.calls
+        self.assertEqual((filename, content), ("audio.mp3", audio))
+        self.assertTrue(converted.closed)
+        self.assertEqual(ingest.stats()["transcoded"], 1)
+
+
+class TranscodeTests(unittest.IsolatedAsyncioTestCase):
+    async def test_undecodable_audio(self):
+        with self.assertRaises(UnsupportedAudio) as raised:
+            await transcode(io.BytesIO(b"not audio"), fake_ffmpeg(returncode=1))
+        self.assertEqual(raised.exception.status_code, 415)
+
+
+class AskAudioTests(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(mock.patch("audio.shutil.which", return_value=None))
+        self.client = self.enterContext(TestClient(main.app))
+        self.client.app.state.audio = AudioIngest(FakeTranscriber(), max_bytes=8)
+
+    def upload(self, filename, content):
+        return self.client.post("/ask_audio", files={"audio": (filename, content, "application/octet-stream")})
+
+    def test_rejected_uploads(self):
+        with self.assertLogs("models", "WARNING") as logs:
+            self.assertEqual(self.upload("note.mp3", b"").status_code, 400)
+            self.assertEqual(self.upload("note.mp3", b"123456789").status_code, 413)
+            self.assertEqual(self.upload("note.amr", b"audio").status_code, 415)
+        self.assertEqual(len(logs.output), 3)
+        self.assertEqual(self.client.get("/audio/stats").json()["rejected"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
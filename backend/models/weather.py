@@ -0,0 +1,85 @@
+"""Cached OpenWeatherMap 5-day forecast lookups.
+
+The provider refreshes the forecast every 3 hours, so a city's forecast
+is fetched once per 3-hour slot and kept until the slot ends. Concurrent
+callers for the same city share a single in-flight request, and the entry
+closest to a timestamp is found with a bisect over the sorted ``list``.
+"""
+
+import asyncio
+import time
+from bisect import bisect_left
+
+import httpx
+
+FORECAST_URL = "http://api.openweathermap.org/data/2.5/forecast"
+# the provider publishes a new forecast every 3 hours
+REFRESH_SLOT = 3 * 3600
+
+
+class Forecast:
+    def __init__(self, entries, expires_at: float):
+        self.entries = sorted(entries, key=lambda entry: entry["dt"])
+        self.timestamps = [entry["dt"] for entry in self.entries]
+        self.expires_at = expires_at
+
+    def closest(self, timestamp: int) -> dict:
+        index = bisect_left(self.timestamps, timestamp)
+        if index == 0:
+            return self.entries[0]
+        if index == len(self.entries):
+            return self.entries[-1]
+        before, after = self.entries[index - 1], self.entries[index]
+        return before if timestamp - before["dt"] <= after["dt"] - timestamp else after
+
+
+class ForecastCache:
+    def __init__(self, fetch, slot: float = REFRESH_SLOT, clock=time.time):
+        self.fetch = fetch
+        self.slot = slot
+        self.clock = clock
+        self.forecasts = {}
+        self.in_flight = {}
+        self.hits = 0
+        self.fetches = 0
+
+    def expiry(self, now: float) -> float:
+        # end of the provider's current refresh slot
+        return (now // self.slot + 1) * self.slot
+
+    async def refresh(self, city: str) -> Forecast:
+        self.fetches += 1
+        forecast = Forecast(await self.fetch(city), self.expiry(self.clock()))
+        self.forecasts[city] = forecast
+        return forecast
+
+    async def get(self, city: str) -> Forecast:
+        forecast = self.forecasts.get(city)
+        if forecast is not None and forecast.expires_at > self.clock():
+            self.hits += 1
+            return forecast
+
+        task = self.in_flight.get(city)
+        if task is None:
+            task = asyncio.ensure_future(self.refresh(city))
+            self.in_flight[city] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(city, None))
+        # a cancelled caller must not cancel the fetch the others wait for
+        return await asyncio.shield(task)
+
+    async def closest(self, city: str, timestamp: int) -> dict:
+        return (await self.get(city)).closest(timestamp)
+
+
+def make_fetcher(api_key: str, url: str = FORECAST_URL, timeout: float = 5, client=None):
+    """Forecast fetcher that reuses one HTTP client (and its connections)."""
+    client = client or httpx.AsyncClient(timeout=timeout)
+
+    async def fetch(city: str) -> list:
+        response = await client.get(
+            url, params={"q": city, "appid": api_key, "units": "metric"}
+        )
+        response.raise_for_status()
+        return response.json()["list"]
+
+    return fetch